@@ -181,25 +181,18 @@ class User(AbstractUser):
         help_text="پلاک‌هایی که این کاربر به آن‌ها دسترسی دارد"
     )
     def has_pelak_access(self, pelak_number: str) -> bool:
-        """Check if user has access to a specific pelak"""
-        # Check if user is superuser - return True immediately
-        if self.is_superuser:
-            return True
-        # Check if user has a company and company is supernazer - return True immediately
-        if self.company and self.company.is_supernazer:
-            return True
-        # For everything else, check specific pelak access
-        return self.pelaks.filter(number=pelak_number).exists()
+        """Check if user has access to a specific pelak (cached access snapshot, no query on a hit)"""
+        from landreg.services.access_service import AccessSnapshot
+        return AccessSnapshot.for_user(self).has_pelak(pelak_number)
     
     def get_accessible_pelaks(self):
         """Get all pelaks this user has access to"""
         from landreg.models.pelak import Pelak
-        if self.is_superuser:
+        from landreg.services.access_service import AccessSnapshot
+        snapshot = AccessSnapshot.for_user(self)
+        if snapshot.is_full:
             return Pelak.objects.all()
-        # Check if user has a company and company is supernazer - return True immediately
-        if self.company and self.company.is_supernazer:
-            return Pelak.objects.all()
-        return self.pelaks.all()
+        return Pelak.objects.filter(number__in=snapshot.pelak_numbers)
     
     def grant_pelak_access(self, pelak):
         """Grant access to a pelak for this user"""
@@ -1,11 +1,11 @@
 from rest_framework.permissions import BasePermission
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.request import Request
-from django.core.cache import cache
 from django.http import HttpRequest
 from django.utils.functional import cached_property
-from typing import Optional, Set, Tuple, Union
+from typing import FrozenSet, Optional, Tuple, Union
 from accounts.models import User 
+from accounts.services.permission_cache import role_permission_cache
 
 from rest_framework.permissions import SAFE_METHODS
 
@@ -24,7 +24,7 @@ class HasDynamicPermission(BasePermission):
     Custom permission:
     - Deny anonymous users.
     - Allow superusers.
-    - For regular users: check role-based API access using cached permissions.
+    - For regular users: check role-based API access using the cached permissions of their role.
     """
 
     def get_base_url(self, request: Union[Request, HttpRequest]) -> Optional[str]:
@@ -37,23 +37,15 @@ class HasDynamicPermission(BasePermission):
             return '/' + route.route.split('<')[0].rstrip('/') + '/'
         return None
 
-    def get_cached_permissions(self, user: User) -> Set[Tuple[str, str]]:
+    def get_cached_permissions(self, user: User) -> FrozenSet[Tuple[str, str]]:
         """
-        Fetches allowed (method, url) tuples for the user’s role from cache or DB.
+        Allowed (method, url) tuples of the user’s role, shared by all users of the role
+        (see role_permission_cache: per worker copy checked against a global generation).
         """
-        role = getattr(user, "roles", None)
-        if not role:
-            return set()
-
-        cache_key = f"user:{user.id}:role:{role.id}:allowed_apis"
-        allowed: Optional[Set[Tuple[str, str]]] = cache.get(cache_key)
-        if allowed is None:
-            allowed = set(
-                role.apis.values_list("method", "url")
-            )
-            cache.set(cache_key, allowed, timeout=3600)  # Cache for 1 hour
-
-        return allowed
+        role_id = getattr(user, "roles_id", None)
+        if not role_id:
+            return frozenset()
+        return role_permission_cache.get(role_id)
 
     def has_permission(self, request: Request, view) -> bool:
         user: User = request.user
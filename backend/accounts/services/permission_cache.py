@@ -0,0 +1,76 @@
+import threading
+import time
+import uuid
+from typing import Dict, FrozenSet, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import Apis
+
+# (method, url) pairs a role may call
+AllowedApis = FrozenSet[Tuple[str, str]]
+
+GENERATION_KEY = "role_permissions:generation"
+
+
+def role_permissions_key(role_id: int, generation: str) -> str:
+    return f"role_permissions:{role_id}:{generation}"
+
+
+class RolePermissionCache:
+    """
+    Allowed (method, url) set of each role, shared by every user of the role.
+
+    - Every set is tagged with a global generation; any change to Apis / Tools / Roles (or the
+      role <-> api links) sets a new generation, old sets are never read again and expire
+    - L1: per worker copy of the set, checked against the generation with one cheap GET,
+      at most once per CHECK_INTERVAL seconds
+    - L2: shared Redis copy per (role, generation) -> one worker's query serves the others
+    """
+
+    def __init__(self) -> None:
+        # role id -> (generation, allowed apis, expires at)
+        self._local: Dict[int, Tuple[str, AllowedApis, float]] = {}
+        self._generation: Optional[str] = None
+        self._generation_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def generation(self) -> str:
+        now = time.monotonic()
+        with self._lock:
+            if self._generation is not None and now - self._generation_checked_at < settings.PERMISSION_CACHE["CHECK_INTERVAL"]:
+                return self._generation
+        # Missing key (never bumped / Redis flushed or down) is generation "0"
+        generation = cache.get(GENERATION_KEY) or "0"
+        with self._lock:
+            self._generation = generation
+            self._generation_checked_at = now
+        return generation
+
+    def get(self, role_id: int) -> AllowedApis:
+        generation = self.generation()
+        now = time.monotonic()
+        with self._lock:
+            item = self._local.get(role_id)
+        if item is not None and item[0] == generation and item[2] > now:
+            return item[1]
+
+        shared_key = role_permissions_key(role_id, generation)
+        allowed: Optional[AllowedApis] = cache.get(shared_key)
+        if allowed is None:
+            allowed = frozenset(Apis.objects.filter(rolesapis=role_id).values_list("method", "url"))
+            cache.set(shared_key, allowed, timeout=settings.PERMISSION_CACHE["SHARED_TTL"])
+        with self._lock:
+            # A worker that never sees a new generation (Redis down) still reloads now and then
+            self._local[role_id] = (generation, allowed, now + settings.PERMISSION_CACHE["LOCAL_TTL"])
+        return allowed
+
+    def bump_generation(self) -> None:
+        """Every role set is stale (one SET, no key scan)"""
+        cache.set(GENERATION_KEY, uuid.uuid4().hex[:12], timeout=None)
+        with self._lock:
+            self._local.clear()
+            self._generation = None
+
+
+role_permission_cache = RolePermissionCache()
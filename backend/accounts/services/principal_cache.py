@@ -0,0 +1,145 @@
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import User
+from common.services.commit_services import OnCommitCollector
+
+
+def principal_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def principal_version_key(user_id: int) -> str:
+    return f"principal_version:{user_id}"
+
+
+def _new_version() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+class PrincipalCache:
+    """
+    Two level cache of the authenticated user (JWTAuthentication), loaded with its company
+    and role (select_related) so permissions / views do not query them again.
+
+    - L1: in-process LRU with a short TTL -> an authenticated request costs no query nor network call
+    - L2: shared Redis copy (django cache) -> one worker's lookup serves the others
+    - Entries are pickled users: every request gets its own instance (views may modify request.user).
+      The password hash is deferred: it never lands in Redis (loaded on use, e.g. check_password)
+    - An L2 entry is stored with the version of the user read BEFORE the query; invalidate() sets a
+      new version, so a row read before a commit and cached after its invalidation is never served
+    - invalidate() drops both levels; L1 copies of OTHER processes expire within the local TTL
+    """
+
+    def __init__(
+        self,
+        local_ttl: Optional[float] = None,
+        shared_ttl: Optional[int] = None,
+        maxsize: Optional[int] = None,
+    ) -> None:
+        self._local_ttl = local_ttl
+        self._shared_ttl = shared_ttl
+        self._maxsize = maxsize
+        self._local: "OrderedDict[int, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def local_ttl(self) -> float:
+        return self._local_ttl if self._local_ttl is not None else settings.PRINCIPAL_CACHE.get("LOCAL_TTL", 5)
+
+    @property
+    def shared_ttl(self) -> int:
+        return self._shared_ttl if self._shared_ttl is not None else settings.PRINCIPAL_CACHE.get("SHARED_TTL", 300)
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize if self._maxsize is not None else settings.PRINCIPAL_CACHE.get("MAXSIZE", 2048)
+
+    def _get_local(self, user_id: int) -> Optional[bytes]:
+        with self._lock:
+            item = self._local.get(user_id)
+            if item is None:
+                return None
+            expires_at, data = item
+            if expires_at < time.monotonic():
+                del self._local[user_id]
+                return None
+            self._local.move_to_end(user_id)
+            return data
+
+    def _set_local(self, user_id: int, data: bytes) -> None:
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.local_ttl, data)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def get_user(self, user_id: int) -> User:
+        """
+        The user with its company and role loaded.
+
+        Raises:
+            User.DoesNotExist
+        """
+        data = self._get_local(user_id)
+        if data is None:
+            version_key = principal_version_key(user_id)
+            values = cache.get_many([version_key, principal_key(user_id)])
+            version = self._current_version(version_key, values.get(version_key))
+            entry = values.get(principal_key(user_id))
+            if entry is not None and entry[0] == version:
+                data = entry[1]
+            else:
+                user = User.objects.select_related('company', 'roles').defer('password').get(pk=user_id)
+                data = pickle.dumps(user, protocol=pickle.HIGHEST_PROTOCOL)
+                cache.set(principal_key(user_id), (version, data), self.shared_ttl)
+            self._set_local(user_id, data)
+        return pickle.loads(data)
+
+    def _current_version(self, version_key: str, version: Optional[str]) -> str:
+        """A missing (never set / evicted) version is seeded with a random token"""
+        if version is not None:
+            return version
+        token = _new_version()
+        if cache.add(version_key, token, timeout=None):
+            return token
+        return cache.get(version_key) or token
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+        cache.set_many({principal_version_key(user_id): _new_version() for user_id in user_ids}, timeout=None)
+        cache.delete_many([principal_key(user_id) for user_id in user_ids])
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def _invalidate_collected(user_ids: list) -> None:
+    principal_cache.invalidate(set(user_ids))
+
+
+principal_invalidation_collector = OnCommitCollector(handler=_invalidate_collected, name="principal_cache")
+
+
+def invalidate_principals_on_commit(user_ids: Iterable[int]) -> None:
+    """
+    Drop the cached principals after commit: invalidating earlier would let a concurrent
+    request cache the old row again before the change is visible.
+    """
+    for user_id in user_ids:
+        principal_invalidation_collector.add(user_id)
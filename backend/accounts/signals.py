@@ -1,22 +1,37 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import Apis, Tools, Roles
+from common.models import Company
+from .models import Apis, Tools, Roles, User
+from .services.permission_cache import role_permission_cache
+from .services.principal_cache import invalidate_principals_on_commit
 
 @receiver([post_save, post_delete], sender=Apis)
 @receiver([post_save, post_delete], sender=Tools)
 @receiver([post_save, post_delete], sender=Roles)
+@receiver(m2m_changed, sender=Roles.apis.through)
+@receiver(m2m_changed, sender=Roles.tools.through)
 def clear_allowed_api_cache(sender, instance, **kwargs):
     """
-    Delete all caches matching user:*:role:*:allowed_apis
-    whenever Apis, Tools, or Roles change.
+    Apis, Tools, Roles or the role <-> api links changed: start a new permission generation
+    after commit (cached role sets of the old generation are never read again).
     """
-    try:
-        # Works only if you're using django-redis
-        redis_client = cache.client.get_client()
-        keys = redis_client.keys("*user:*:role:*:allowed_apis")
-        if keys:
-            redis_client.delete(*keys)
-            print(f"Deleted {len(keys)} cache keys matching allowed_apis")
-    except Exception as e:
-        print(f"Cache clear failed: {e}")
\ No newline at end of file
+    if kwargs['signal'] is m2m_changed and not kwargs['action'].startswith('post_'):
+        return
+    transaction.on_commit(role_permission_cache.bump_generation)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_principal_on_user_change(sender, instance, **kwargs):
+    """The cached principal (JWTAuthentication) of a saved / deleted user is dropped after commit"""
+    invalidate_principals_on_commit([instance.pk])
+
+# pre_delete: deleting a company / role sets the FK of its users to NULL without signals
+@receiver([post_save, pre_delete], sender=Company)
+def invalidate_principals_on_company_change(sender, instance, **kwargs):
+    """Cached principals carry the company flags (is_nazer / is_supernazer / is_moshaver)"""
+    invalidate_principals_on_commit(User.objects.filter(company=instance).values_list('id', flat=True))
+
+@receiver([post_save, pre_delete], sender=Roles)
+def invalidate_principals_on_role_change(sender, instance, **kwargs):
+    """Cached principals carry their role"""
+    invalidate_principals_on_commit(User.objects.filter(roles=instance).values_list('id', flat=True))
@@ -1,10 +1,17 @@
+import pickle
+
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework import status
 from django.urls import reverse
 from django.utils.timezone import now
 
-from accounts.tokenization import create_access_token,create_refresh_token
+from accounts.models import Apis, Roles
+from accounts.services.permission_cache import role_permission_cache
+from accounts.services.principal_cache import principal_cache, principal_key
+from accounts.tokenization import JWTAuthentication, create_access_token,create_refresh_token
 
 User = get_user_model()
 
@@ -104,4 +111,88 @@ class LogoutTests(APITestCase):
     def test_logout_without_authenticate(self):
         self.client.cookies['refresh_token'] = self.refresh_token
         response = self.client.post(self.refresh_url)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class PrincipalCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        principal_cache.clear_local()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        access_token = create_access_token(user_id=self.user.id, expires_in_seconds=90)
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def tearDown(self):
+        cache.clear()
+        principal_cache.clear_local()
+
+    def test_cached_principal_costs_no_query(self):
+        JWTAuthentication().authenticate(self.request)
+        with self.assertNumQueries(0):
+            user, _ = JWTAuthentication().authenticate(self.request)
+            self.assertIsNone(user.company)
+            self.assertIsNone(user.roles)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_each_request_gets_its_own_instance(self):
+        first, _ = JWTAuthentication().authenticate(self.request)
+        first.first_name_fa = 'changed'
+        second, _ = JWTAuthentication().authenticate(self.request)
+        self.assertIsNone(second.first_name_fa)
+
+    def test_password_not_cached(self):
+        JWTAuthentication().authenticate(self.request)
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cache.get(principal_key(self.user.id))))
+        user, _ = JWTAuthentication().authenticate(self.request)
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_row_read_before_invalidation_is_not_served(self):
+        """A reader that loaded the old row and stores it after the on-commit invalidation"""
+        old_user = principal_cache.get_user(self.user.id)
+        stale_entry = cache.get(principal_key(self.user.id))
+        User.objects.filter(pk=self.user.pk).update(first_name_fa='علی')
+        principal_cache.invalidate([self.user.id])
+        cache.set(principal_key(self.user.id), stale_entry)
+        principal_cache.clear_local()
+
+        user = principal_cache.get_user(self.user.id)
+        self.assertIsNone(old_user.first_name_fa)
+        self.assertEqual(user.first_name_fa, 'علی')
+
+    def test_user_save_invalidates_principal(self):
+        JWTAuthentication().authenticate(self.request)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name_fa = 'علی'
+            self.user.save()
+        user, _ = JWTAuthentication().authenticate(self.request)
+        self.assertEqual(user.first_name_fa, 'علی')
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PERMISSION_CACHE={"CHECK_INTERVAL": 0, "LOCAL_TTL": 300, "SHARED_TTL": 3600},
+)
+class RolePermissionCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_permission_cache.bump_generation()
+        self.api = Apis.objects.create(method='GET', url='/api/landreg/pelak/')
+        self.role = Roles.objects.create(title='viewer')
+        self.role.apis.add(self.api)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_role_set_is_reused(self):
+        self.assertIn(('GET', '/api/landreg/pelak/'), role_permission_cache.get(self.role.id))
+        # only the generation is read again
+        with self.assertNumQueries(0):
+            role_permission_cache.get(self.role.id)
+
+    def test_link_change_starts_new_generation(self):
+        role_permission_cache.get(self.role.id)
+        other_api = Apis.objects.create(method='POST', url='/api/landreg/pelak/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.apis.add(other_api)
+        self.assertIn(('POST', '/api/landreg/pelak/'), role_permission_cache.get(self.role.id))
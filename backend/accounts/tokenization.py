@@ -8,6 +8,7 @@ from rest_framework.authentication import BaseAuthentication, get_authorization_
 from rest_framework.request import Request
 
 from accounts.models import User
+from accounts.services.principal_cache import principal_cache
 
 
 class JWTAuthentication(BaseAuthentication):
@@ -42,7 +43,8 @@ class JWTAuthentication(BaseAuthentication):
         try:
             token = auth_header[1].decode('utf-8')
             user_id = decode_access_token(token)
-            user = User.objects.get(pk=user_id)
+            # Cached with its company / role, no query per request (see principal_cache)
+            user = principal_cache.get_user(user_id)
             return (user, token)
         except User.DoesNotExist:
             raise exceptions.AuthenticationFailed('کاربر یافت نشد')
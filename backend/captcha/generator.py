@@ -1,13 +1,34 @@
 # services/captcha_service.py
 import random
 import string
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont , ImageFilter
 import io
-import math
 import base64
+import numpy as np
 from django.conf import settings
 import os
-from django.conf import settings
+
+FONT_FILES = ("dejavu-sans.bold.ttf", "tomnr.ttf", "ARIAL.TTF")
+FONT_SIZES = range(38, 45)
+
+
+@lru_cache(maxsize=len(FONT_FILES) * len(FONT_SIZES))
+def load_font(font_path: str, font_size: int):
+    """Fonts are read from disk once per process (font path, size)"""
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def wave_distort(image: Image, amplitude: int, frequency: float) -> Image:
+    """Shift every row horizontally by amplitude * sin(y * frequency) pixels (edge pixels repeated)"""
+    pixels = np.asarray(image)
+    height, width = pixels.shape[:2]
+    offsets = (amplitude * np.sin(np.arange(height) * frequency)).astype(np.intp)
+    source_x = np.clip(np.arange(width)[None, :] + offsets[:, None], 0, width - 1)
+    return Image.fromarray(pixels[np.arange(height)[:, None], source_x])
 
 class CaptchaGenerator:
     def __init__(self):
@@ -28,11 +49,7 @@ class CaptchaGenerator:
         draw = ImageDraw.Draw(image)
 
         # Try to load a font, fallback to default if not found
-        font_paths = [
-            os.path.join(settings.BASE_DIR, "fonts", "dejavu-sans.bold.ttf"),
-            os.path.join(settings.BASE_DIR, "fonts", "tomnr.ttf"),
-            os.path.join(settings.BASE_DIR, "fonts", "ARIAL.TTF"),
-        ]
+        font_paths = [os.path.join(settings.BASE_DIR, "fonts", font_file) for font_file in FONT_FILES]
 
         # Add more background noise dots with random colors
         for _ in range(200):
@@ -83,13 +100,8 @@ class CaptchaGenerator:
                 random.randint(0, 100)
             )
 
-            font_path = random.choice(font_paths)
-            try:
-                # Slight font size variation
-                font_size = random.randint(38, 44)
-                font = ImageFont.truetype(font_path, font_size)
-            except:
-                font = ImageFont.load_default()
+            # Slight font size variation
+            font = load_font(random.choice(font_paths), random.choice(FONT_SIZES))
 
             char_draw.text((5, 5), char, font=font, fill=color)
 
@@ -112,27 +124,12 @@ class CaptchaGenerator:
                 random.randint(50, 150)
             ), width=random.randint(1, 3))
 
-        # Slight blur to make OCR harder but still readable
-        image = image.filter(ImageFilter.GaussianBlur(radius=0.8))
-
         # Very mild wave distortion - barely noticeable
-        pixels = image.load()
-        distorted = Image.new('RGB', (self.width, self.height), 'white')
-        distorted_pixels = distorted.load()
-        
         wave_amplitude = random.randint(1, 2)  # Much smaller waves
-        wave_frequency = 0.02
-        
-        for y in range(self.height):
-            for x in range(self.width):
-                offset_x = int(wave_amplitude * math.sin(y * wave_frequency))
-                source_x = max(0, min(self.width - 1, x + offset_x))
-                distorted_pixels[x, y] = pixels[source_x, source_y if 'source_y' in locals() else y]
-        
-        image = distorted
+        image = wave_distort(image, wave_amplitude, frequency=0.02)
 
-        # Light blur - just enough to break pixel-perfect OCR
-        image = image.filter(ImageFilter.GaussianBlur(radius=0.6))
+        # One blur (radius 1.0 ~ the former 0.8 then 0.6 blurs) to break pixel-perfect OCR
+        image = image.filter(ImageFilter.GaussianBlur(radius=1.0))
 
         return image
 
@@ -0,0 +1,68 @@
+import math
+import random
+import time
+from typing import Callable, List
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from captcha.generator import CaptchaGenerator, wave_distort
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _wave_distort_per_pixel(image: Image, amplitude: int, frequency: float) -> Image:
+    """The former pixel by pixel distortion, kept as the benchmark baseline"""
+    width, height = image.size
+    pixels = image.load()
+    distorted = Image.new('RGB', (width, height), 'white')
+    distorted_pixels = distorted.load()
+    for y in range(height):
+        for x in range(width):
+            offset_x = int(amplitude * math.sin(y * frequency))
+            source_x = max(0, min(width - 1, x + offset_x))
+            distorted_pixels[x, y] = pixels[source_x, y]
+    return distorted
+
+
+class Command(BaseCommand):
+    help = "Measure captcha image latency: full generation, PNG encoding and the wave distortion (per pixel vs vectorized)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=200)
+
+    def handle(self, *args, **options):
+        generator = CaptchaGenerator()
+        texts = [generator.generate_text() for _ in range(options["images"])]
+        images = [generator.generate_image(text) for text in texts[:10]]
+        amplitude = random.randint(1, 2)
+
+        self._bench("generate_image", lambda i: generator.generate_image(texts[i]), options["images"])
+        self._bench("image_to_base64", lambda i: generator.image_to_base64(images[i % len(images)]), options["images"])
+        self._bench(
+            "wave distortion per pixel (before)",
+            lambda i: _wave_distort_per_pixel(images[i % len(images)], amplitude, 0.02),
+            options["images"],
+        )
+        self._bench(
+            "wave distortion vectorized (after)",
+            lambda i: wave_distort(images[i % len(images)], amplitude, 0.02),
+            options["images"],
+        )
+
+    def _bench(self, name: str, call: Callable[[int], object], count: int) -> None:
+        durations = []
+        for i in range(count):
+            started = time.perf_counter()
+            call(i)
+            durations.append(time.perf_counter() - started)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(
+            f"  {count} images -> {count / sum(durations):.0f} images/s, "
+            f"p50 {_percentile(durations, 0.50) * 1000:.2f}ms "
+            f"p95 {_percentile(durations, 0.95) * 1000:.2f}ms "
+            f"max {max(durations) * 1000:.2f}ms"
+        )
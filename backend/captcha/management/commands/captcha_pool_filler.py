@@ -0,0 +1,66 @@
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from captcha.pool import captcha_pool
+
+# Log the pool metrics once per this many seconds
+STATS_INTERVAL_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = "Keep the captcha pool topped up with pre-rendered captchas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Fill the pool up to its size and exit",
+        )
+        parser.add_argument(
+            "--rate",
+            type=int,
+            default=settings.CAPTCHA_POOL["REFILL_RATE"],
+            help="Captchas rendered per second at most",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.CAPTCHA_POOL["POLL_INTERVAL"],
+            help="Seconds to sleep when the pool is full",
+        )
+
+    def handle(self, *args, **options):
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        rate = max(1, options["rate"])
+        last_stats = time.monotonic()
+        self.stdout.write(self.style.SUCCESS("Captcha pool filler started"))
+
+        while not self._stop:
+            started = time.monotonic()
+            try:
+                pushed = captcha_pool.fill(limit=rate)
+            except Exception as e:
+                pushed = 0
+                self.stderr.write(self.style.ERROR(f"Captcha pool fill failed: {e}"))
+
+            if time.monotonic() - last_stats > STATS_INTERVAL_SECONDS:
+                self.stdout.write(f"Captcha pool: {captcha_pool.stats()}")
+                last_stats = time.monotonic()
+
+            if options["once"] and pushed == 0:
+                break
+            if pushed:
+                # At most `rate` renders per second
+                time.sleep(max(0.0, pushed / rate - (time.monotonic() - started)))
+            else:
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Captcha pool filler stopped"))
+
+    def _request_stop(self, signum, frame):
+        self._stop = True
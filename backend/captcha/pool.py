@@ -0,0 +1,109 @@
+"""
+Pool of pre-rendered captchas (image + answer) kept in a Redis list.
+
+- `manage.py captcha_pool_filler` keeps the pool topped up to CAPTCHA_POOL['SIZE'], rendering at
+  most CAPTCHA_POOL['REFILL_RATE'] images per second
+- The views pop one captcha atomically (LPOP + hit / miss counter in one Lua call) and only
+  render on the request path when the pool is empty or Redis is unavailable
+- The answers never leave the server: a popped captcha gets its key and stored answer
+  like a freshly rendered one (CaptchaService.store_captcha_data)
+"""
+import json
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+
+from captcha.generator import CaptchaGenerator
+from captcha.services import get_raw_redis
+
+POOL_KEY = "captcha:pool"
+HITS_KEY = "captcha:pool:hits"
+MISSES_KEY = "captcha:pool:misses"
+
+# KEYS: pool list, hits counter, misses counter
+POP_SCRIPT = """
+local item = redis.call('LPOP', KEYS[1])
+if item then
+    redis.call('INCR', KEYS[2])
+else
+    redis.call('INCR', KEYS[3])
+end
+return item
+"""
+
+
+def render_captcha() -> Dict[str, str]:
+    """{'response': answer, 'image_data': base64 PNG} of a new captcha"""
+    generator = CaptchaGenerator()
+    text: str = generator.generate_text()
+    image = generator.generate_image(text)
+    return {'response': text, 'image_data': generator.image_to_base64(image)}
+
+
+class CaptchaPool:
+    def __init__(self) -> None:
+        self._pop_script = None
+
+    def pop(self) -> Optional[Dict[str, str]]:
+        """A ready captcha, None when the pool is empty (miss)"""
+        redis_conn = get_raw_redis()
+        if redis_conn is None:
+            return None
+        if self._pop_script is None:
+            self._pop_script = redis_conn.register_script(POP_SCRIPT)
+        try:
+            item = self._pop_script(
+                keys=[cache.make_key(POOL_KEY), cache.make_key(HITS_KEY), cache.make_key(MISSES_KEY)]
+            )
+        except Exception as e:
+            print(f"Error popping captcha from pool: {e}")
+            return None
+        return json.loads(item) if item else None
+
+    def get_or_render(self) -> Dict[str, str]:
+        """Pooled captcha, rendered on the spot when the pool is empty"""
+        return self.pop() or render_captcha()
+
+    def fill(self, limit: int) -> int:
+        """Render and push up to `limit` captchas, without going over the pool size. Returns the number pushed"""
+        redis_conn = get_raw_redis()
+        if redis_conn is None:
+            return 0
+        pool_key = cache.make_key(POOL_KEY)
+        size = settings.CAPTCHA_POOL['SIZE']
+        missing = min(limit, size - redis_conn.llen(pool_key))
+        if missing <= 0:
+            return 0
+
+        items: List[str] = [json.dumps(render_captcha()) for _ in range(missing)]
+        pipe = redis_conn.pipeline()
+        pipe.rpush(pool_key, *items)
+        # Several fillers may race, keep the freshest `size` captchas
+        pipe.ltrim(pool_key, -size, -1)
+        pipe.execute()
+        return len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, hits / misses since the counters were reset and the hit rate"""
+        redis_conn = get_raw_redis()
+        if redis_conn is None:
+            return {'size': 0, 'capacity': settings.CAPTCHA_POOL['SIZE'], 'hits': 0, 'misses': 0, 'hit_rate': None}
+        pipe = redis_conn.pipeline()
+        pipe.llen(cache.make_key(POOL_KEY))
+        pipe.get(cache.make_key(HITS_KEY))
+        pipe.get(cache.make_key(MISSES_KEY))
+        size, hits, misses = pipe.execute()
+        hits, misses = int(hits or 0), int(misses or 0)
+        return {
+            'size': size,
+            'capacity': settings.CAPTCHA_POOL['SIZE'],
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    def reset_stats(self) -> None:
+        cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+captcha_pool = CaptchaPool()
@@ -5,9 +5,33 @@ from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 
+# KEYS: captcha key; ARGV: stored value as read, encoded "used" data
+# Replaces the captcha by the used marker (same TTL) only if it did not change since it was read:
+# of two requests that read the same unused captcha only one gets 1
+MARK_USED_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+    return 1
+end
+return 0
+"""
+
+
+def get_raw_redis():
+    """Raw connection of the default cache, None when the cache is not django-redis"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+
+
 class CaptchaService:
     REDIS_PREFIX = "captcha"
     DEFAULT_EXPIRY = 600  # 10 minutes
+    # What is left of a captcha once used (the answer is gone)
+    USED_DATA = {'is_used': True}
+    _mark_used_script = None
     
     @staticmethod
     def generate_key() -> str:
@@ -49,11 +73,45 @@ class CaptchaService:
             print(f"Error getting captcha: {e}")
             return None
     
+    @classmethod
+    def _read_stored(cls, key: str) -> tuple[object, dict | None]:
+        """(value as stored, decoded CAPTCHA data)"""
+        redis_key = cls._get_redis_key(key)
+        redis_conn = get_raw_redis()
+        if redis_conn is None:
+            raw = cache.get(redis_key)
+            return raw, json.loads(raw) if raw else None
+        raw = redis_conn.get(cache.make_key(redis_key))
+        # Values go through the cache serializer, like cache.set / cache.get
+        return raw, json.loads(cache.client.decode(raw)) if raw else None
+
+    @classmethod
+    def _mark_used_if_unchanged(cls, key: str, raw: object) -> bool:
+        """Replace the CAPTCHA read as `raw` by the used marker, False when someone else changed it first"""
+        redis_key = cls._get_redis_key(key)
+        redis_conn = get_raw_redis()
+        if redis_conn is None:
+            # Local memory cache (tests): not atomic
+            if cache.get(redis_key) != raw:
+                return False
+            cache.set(redis_key, json.dumps(cls.USED_DATA), timeout=cls.DEFAULT_EXPIRY)
+            return True
+
+        if cls._mark_used_script is None:
+            cls._mark_used_script = redis_conn.register_script(MARK_USED_SCRIPT)
+        return bool(cls._mark_used_script(
+            keys=[cache.make_key(redis_key)],
+            args=[raw, cache.client.encode(json.dumps(cls.USED_DATA))],
+        ))
+
     @classmethod
     def validate_captcha(cls, key: str, user_response: str) -> tuple[bool, str]:
-        """Validate CAPTCHA response"""
+        """
+        Validate CAPTCHA response. A right answer uses the captcha up atomically (two concurrent
+        requests can not both pass with it), a wrong one leaves it as is.
+        """
         try:
-            data = cls.fetch_captcha_data(key)
+            raw, data = cls._read_stored(key)
             
             if not data:
                 return False, "کپچا نامعتبر یا منقضی شده است"
@@ -65,8 +123,9 @@ class CaptchaService:
             if data['response'].upper() != user_response.upper():
                 return False, "پاسخ کپچا نادرست است"
             
-            # Mark as used
-            cls.mark_as_used(key)
+            if not cls._mark_used_if_unchanged(key, raw):
+                return False, "این کپچا قبلاً استفاده شده است"
+            
             return True, "کپچا معتبر است"
             
         except Exception as e:
@@ -75,30 +134,12 @@ class CaptchaService:
     
     @classmethod
     def mark_as_used(cls, key: str) -> bool:
-        """Mark CAPTCHA as used"""
+        """Mark CAPTCHA as used, False when it was missing or already used (atomic)"""
         try:
-            data = cls.fetch_captcha_data(key)
-            if data:
-                data['is_used'] = True
-                redis_key = cls._get_redis_key(key)
-                
-                # Get remaining TTL and preserve it
-                try:
-                    # For django-redis, we can access the raw client
-                    from django_redis import get_redis_connection
-                    redis_conn = get_redis_connection("default")
-                    remaining_ttl = redis_conn.ttl(redis_key)
-                    
-                    if remaining_ttl > 0:
-                        cache.set(redis_key, json.dumps(data), timeout=remaining_ttl)
-                    else:
-                        cache.set(redis_key, json.dumps(data), timeout=cls.DEFAULT_EXPIRY)
-                except:
-                    # Fallback if we can't get TTL
-                    cache.set(redis_key, json.dumps(data), timeout=cls.DEFAULT_EXPIRY)
-                
-                return True
-            return False
+            raw, data = cls._read_stored(key)
+            if not data or data.get('is_used', False):
+                return False
+            return cls._mark_used_if_unchanged(key, raw)
         except Exception as e:
             print(f"Error marking captcha as used: {e}")
             return False
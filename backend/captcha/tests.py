@@ -1,7 +1,7 @@
 import uuid
 import json
 from unittest.mock import patch, Mock
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 from rest_framework.test import APITestCase
@@ -9,7 +9,15 @@ from rest_framework import status
 from PIL import Image
 
 from captcha.services import CaptchaService
-from captcha.generator import CaptchaGenerator
+from captcha.generator import CaptchaGenerator, load_font, wave_distort
+from captcha.pool import CaptchaPool, captcha_pool
+
+
+LOCMEM_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
 
 
 class CaptchaServiceTests(TestCase):
@@ -72,6 +80,45 @@ class CaptchaServiceTests(TestCase):
         self.assertFalse(is_valid)
         self.assertEqual(message, "پاسخ کپچا نادرست است")
     
+    def test_validate_captcha_wrong_response_keeps_it(self):
+        """Test a wrong answer (typo) leaves the captcha usable"""
+        key = "test-key-123"
+        CaptchaService.store_captcha_data(key, "ABC123")
+        
+        CaptchaService.validate_captcha(key, "XYZ789")
+        is_valid, message = CaptchaService.validate_captcha(key, "ABC123")
+        
+        self.assertTrue(is_valid)
+        self.assertEqual(message, "کپچا معتبر است")
+    
+    def test_validate_captcha_right_response_uses_it_up(self):
+        """Test a captcha passes only once"""
+        key = "test-key-123"
+        CaptchaService.store_captcha_data(key, "ABC123")
+        
+        CaptchaService.validate_captcha(key, "ABC123")
+        is_valid, message = CaptchaService.validate_captcha(key, "ABC123")
+        
+        self.assertFalse(is_valid)
+        self.assertEqual(message, "این کپچا قبلاً استفاده شده است")
+    
+    def test_validate_captcha_used_concurrently(self):
+        """Test the captcha used by another request between read and mark is refused"""
+        key = "test-key-123"
+        CaptchaService.store_captcha_data(key, "ABC123")
+        read_stored = CaptchaService._read_stored
+        
+        def read_then_used_elsewhere(captcha_key):
+            stored = read_stored(captcha_key)
+            CaptchaService._mark_used_if_unchanged(captcha_key, stored[0])
+            return stored
+        
+        with patch.object(CaptchaService, '_read_stored', side_effect=read_then_used_elsewhere):
+            is_valid, message = CaptchaService.validate_captcha(key, "ABC123")
+        
+        self.assertFalse(is_valid)
+        self.assertEqual(message, "این کپچا قبلاً استفاده شده است")
+    
     def test_validate_captcha_expired_or_invalid_key(self):
         """Test validation with invalid/expired key"""
         is_valid, message = CaptchaService.validate_captcha("invalid-key", "ABC123")
@@ -157,6 +204,25 @@ class CaptchaGeneratorTests(TestCase):
         except Exception:
             self.fail("Invalid base64 string generated")
 
+    def test_wave_distort_shifts_rows(self):
+        """Test the vectorized distortion matches the per pixel row shift"""
+        import math
+        import random
+        image = Image.new('RGB', (200, 80))
+        image.putdata([tuple(random.randint(0, 255) for _ in range(3)) for _ in range(200 * 80)])
+
+        distorted = wave_distort(image, amplitude=2, frequency=0.02)
+
+        for y in range(80):
+            offset_x = int(2 * math.sin(y * 0.02))
+            for x in range(200):
+                source_x = max(0, min(199, x + offset_x))
+                self.assertEqual(distorted.getpixel((x, y)), image.getpixel((source_x, y)))
+
+    def test_fonts_loaded_once(self):
+        """Test fonts are cached per (path, size)"""
+        self.assertIs(load_font("missing-font.ttf", 40), load_font("missing-font.ttf", 40))
+
 
 class CaptchaAPITests(APITestCase):
     """Test cases for CAPTCHA API endpoints"""
@@ -286,6 +352,31 @@ class CaptchaAPITests(APITestCase):
         old_data = CaptchaService.fetch_captcha_data(old_key)
         self.assertTrue(old_data['is_used'])
     
+    def test_captcha_refresh_after_wrong_answer(self):
+        """Test a user who mistyped the answer can still refresh the captcha"""
+        old_key = CaptchaService.generate_key()
+        CaptchaService.store_captcha_data(old_key, "ABC123")
+        CaptchaService.validate_captcha(old_key, "ABC12")
+        
+        response = self.client.get(self.refresh_url, {'old_captcha': old_key})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(CaptchaService.fetch_captcha_data(old_key)['is_used'])
+        new_data = CaptchaService.fetch_captcha_data(response.json()['key'])
+        self.assertFalse(new_data['is_used'])
+    
+    def test_captcha_refresh_invalid_old_drops_new_captcha(self):
+        """Test the captcha stored for a refresh of a used one is deleted"""
+        key = CaptchaService.generate_key()
+        CaptchaService.store_captcha_data(key, "ABC123")
+        CaptchaService.mark_as_used(key)
+        
+        with patch('captcha.services.CaptchaService.delete_captcha') as mock_delete:
+            response = self.client.get(self.refresh_url, {'old_captcha': key})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delete.assert_called_once()
+    
     def test_captcha_refresh_new_generation_fails(self):
         """Test that old captcha remains valid when new generation fails"""
         # Create a valid old captcha
@@ -342,4 +433,108 @@ class CaptchaIntegrationTests(APITestCase):
             captcha_data['response']
         )
         self.assertFalse(is_valid)
-        self.assertIn('قبلاً استفاده شده', message)
\ No newline at end of file
+        self.assertIn('قبلاً استفاده شده', message)
+
+
+class FakeRedis:
+    """The few list / counter commands the captcha pool uses, in memory"""
+
+    def __init__(self):
+        self.data = {}
+
+    def register_script(self, script):
+        def pop(keys):
+            item = self.lpop(keys[0])
+            self.incr(keys[1] if item is not None else keys[2])
+            return item
+        return pop
+
+    def lpop(self, key):
+        items = self.data.get(key) or []
+        return items.pop(0) if items else None
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def llen(self, key):
+        return len(self.data.get(key) or [])
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def rpush(self, key, *items):
+        self.data.setdefault(key, []).extend(item.encode() for item in items)
+
+    def ltrim(self, key, start, end):
+        items = self.data.get(key) or []
+        self.data[key] = items[start:len(items) + end + 1 if end < 0 else end + 1]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis_conn):
+        self.redis_conn = redis_conn
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis_conn, name)(*args) for name, args in self.calls]
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CaptchaPoolTests(TestCase):
+    """Test cases for the captcha pool (local memory cache: no Redis list)"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_empty_pool_renders_on_the_spot(self):
+        """Test a miss still returns a captcha"""
+        self.assertIsNone(captcha_pool.pop())
+        captcha = captcha_pool.get_or_render()
+        self.assertEqual(len(captcha['response']), 5)
+        self.assertTrue(len(captcha['image_data']) > 0)
+
+    def test_stats_without_redis(self):
+        """Test metrics shape when the pool is unavailable"""
+        stats = captcha_pool.stats()
+        self.assertEqual(stats['size'], 0)
+        self.assertIsNone(stats['hit_rate'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CAPTCHA_POOL={'SIZE': 3, 'REFILL_RATE': 50, 'POLL_INTERVAL': 1.0})
+class CaptchaPoolRedisTests(TestCase):
+    """Test cases for the captcha pool on a fake Redis connection"""
+
+    def setUp(self):
+        self.redis_conn = FakeRedis()
+        patcher = patch('captcha.pool.get_raw_redis', return_value=self.redis_conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = CaptchaPool()
+
+    def test_fill_stops_at_pool_size(self):
+        self.assertEqual(self.pool.fill(limit=2), 2)
+        self.assertEqual(self.pool.fill(limit=10), 1)
+        self.assertEqual(self.pool.fill(limit=10), 0)
+        self.assertEqual(self.pool.stats()['size'], 3)
+
+    def test_pop_returns_pooled_captcha_once(self):
+        self.pool.fill(limit=1)
+        captcha = self.pool.pop()
+        self.assertEqual(len(captcha['response']), 5)
+        self.assertTrue(len(captcha['image_data']) > 0)
+        self.assertIsNone(self.pool.pop())
+
+    def test_hits_and_misses_are_counted(self):
+        self.pool.fill(limit=1)
+        self.pool.get_or_render()
+        self.pool.get_or_render()
+        stats = self.pool.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
@@ -1,6 +1,9 @@
 from rest_framework.throttling import SimpleRateThrottle
 
-class CaptchaRateThrottle(SimpleRateThrottle):
+from common.throttles import SlidingWindowThrottleMixin
+
+
+class CaptchaRateThrottle(SlidingWindowThrottleMixin, SimpleRateThrottle):
     scope = 'captcha'
 
     def get_cache_key(self, request, view):
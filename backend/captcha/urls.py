@@ -2,9 +2,11 @@ from django.urls import path, include
 
 from captcha.views import (
     CaptchaGenerateView,
+    CaptchaPoolStatsView,
     CaptchaRefreshView,
 )
 urlpatterns = [
     path('generate/' , CaptchaGenerateView.as_view() ,name="captcha-generate"),
     path('refresh/' , CaptchaRefreshView.as_view() ,name="captcha-refresh"),
+    path('pool/stats/' , CaptchaPoolStatsView.as_view() ,name="captcha-pool-stats"),
 ]
\ No newline at end of file
@@ -4,10 +4,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from captcha.generator import CaptchaGenerator
+from captcha.pool import captcha_pool
 from captcha.services import CaptchaService
 import uuid
-from PIL import Image
 from .throttles import CaptchaRateThrottle
 
 class CaptchaGenerateView(APIView):
@@ -19,10 +18,10 @@ class CaptchaGenerateView(APIView):
     
     def get(self, request : Request) -> Response:
         try:
-            generator = CaptchaGenerator()
-            text : str = generator.generate_text() #This is right answer and also text in the picture
-            image : Image = generator.generate_image(text)
-            image_data : str = generator.image_to_base64(image) #as base64
+            # Pre-rendered by captcha_pool_filler, rendered here only when the pool is empty
+            captcha = captcha_pool.get_or_render()
+            text : str = captcha['response'] #This is right answer and also text in the picture
+            image_data : str = captcha['image_data'] #as base64
             
             # Generate key and store in Redis
             captcha_key = CaptchaService.generate_key()
@@ -50,6 +49,16 @@ class CaptchaGenerateView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
+class CaptchaPoolStatsView(APIView):
+    #permission is dynamic
+    """
+        Captcha pool metrics: ready captchas, hits / misses and hit rate
+    """
+
+    def get(self, request : Request) -> Response:
+        return Response(captcha_pool.stats(), status=status.HTTP_200_OK)
+
+
 class CaptchaRefreshView(APIView):
     """
         Invoke the old captch 
@@ -70,20 +79,12 @@ class CaptchaRefreshView(APIView):
         except ValueError:
             return Response({"detail": "فرمت آیدی کپچا نامعتبر است"}, status=status.HTTP_400_BAD_REQUEST)
         
-        #Fetch the old captcha data and invoke it
-        old_captcha_data = CaptchaService.fetch_captcha_data(key = old_captcha)
-        if not old_captcha_data or old_captcha_data['is_used'] == True:
-            return Response(
-                {"detail":"کپچا قبلی معتبر نیست"},
-                status=status.HTTP_400_BAD_REQUEST
-            )        
-
         #Generate The New Captcha
         try:
-            generator = CaptchaGenerator()
-            text : str = generator.generate_text() #This is right answer and also text in the picture
-            image : Image = generator.generate_image(text)
-            image_data : str = generator.image_to_base64(image) #as base64
+            # Pre-rendered by captcha_pool_filler, rendered here only when the pool is empty
+            captcha = captcha_pool.get_or_render()
+            text : str = captcha['response'] #This is right answer and also text in the picture
+            image_data : str = captcha['image_data'] #as base64
             
             # Generate key and store in Redis
             captcha_key = CaptchaService.generate_key()
@@ -98,8 +99,14 @@ class CaptchaRefreshView(APIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
             
-            # Only mark old captcha as used AFTER new one is successfully created
-            old_captcha_invoke_result = CaptchaService.mark_as_used(key = old_captcha)
+            # Only mark old captcha as used AFTER new one is successfully created.
+            # One atomic call: a concurrent refresh / login that used it first wins
+            if not CaptchaService.mark_as_used(key = old_captcha):
+                CaptchaService.delete_captcha(key = captcha_key)
+                return Response(
+                    {"detail":"کپچا قبلی معتبر نیست"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response({
                 'key': captcha_key,
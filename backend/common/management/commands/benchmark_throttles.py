@@ -0,0 +1,100 @@
+import time
+from types import SimpleNamespace
+from typing import List
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import throttling
+
+from common import throttles
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's UserRateThrottle (timestamp list per client) with the Redis sliding window "
+        "throttle: latency per check and cache memory per client, for clients with a long history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=100)
+        parser.add_argument("--checks", type=int, default=5000, help="Throttle checks per throttle class")
+        parser.add_argument("--history", type=int, default=5000, help="Requests already made by each client")
+        parser.add_argument("--rate", type=str, default="10000/hour")
+
+    def handle(self, *args, **options):
+        if throttles._redis_script() is None:
+            raise CommandError("The default cache is not django-redis")
+
+        for name, base in (
+            ("DRF UserRateThrottle", throttling.UserRateThrottle),
+            ("Sliding window UserRateThrottle", throttles.UserRateThrottle),
+        ):
+            # Own scope and rate, the real throttle keys are left alone
+            throttle_class = type("BenchmarkThrottle", (base,), {"scope": "benchmark", "rate": options["rate"]})
+            requests = [
+                SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=client), META={})
+                for client in range(options["clients"])
+            ]
+            keys = [throttle_class().get_cache_key(request, None) for request in requests]
+            self.duration = throttle_class().duration
+            try:
+                self._prefill(base, throttle_class, keys, options["history"])
+                self._bench(name, throttle_class, requests, keys, options["checks"])
+            finally:
+                self._cleanup(keys)
+
+    def _prefill(self, base, throttle_class, keys: List[str], history: int) -> None:
+        throttle = throttle_class()
+        now = throttle.timer()
+        if base is throttling.UserRateThrottle:
+            for key in keys:
+                cache.set(key, [now] * history, throttle.duration)
+            return
+        window = int(now // throttle.duration)
+        for key in keys:
+            cache.set(f"{key}:{window}", history, timeout=2 * throttle.duration)
+
+    def _bench(self, name: str, throttle_class, requests, keys: List[str], checks: int) -> None:
+        durations = []
+        denied = 0
+        started = time.perf_counter()
+        for i in range(checks):
+            check_started = time.perf_counter()
+            if not throttle_class().allow_request(requests[i % len(requests)], None):
+                denied += 1
+            durations.append(time.perf_counter() - check_started)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(
+            f"  {checks} checks in {elapsed:.2f}s -> {checks / elapsed:.0f} checks/s, {denied} denied"
+        )
+        self.stdout.write(
+            f"  latency p50 {_percentile(durations, 0.50) * 1000:.2f}ms "
+            f"p95 {_percentile(durations, 0.95) * 1000:.2f}ms "
+            f"p99 {_percentile(durations, 0.99) * 1000:.2f}ms "
+            f"max {max(durations) * 1000:.2f}ms"
+        )
+        self.stdout.write(f"  cache memory per client {self._memory_per_client(keys)} bytes")
+
+    def _stored_keys(self, key: str) -> List[str]:
+        """The history list of DRF, the window counters of the sliding window throttle"""
+        window = int(time.time() // self.duration)
+        return [key] + [f"{key}:{window + shift}" for shift in (-1, 0, 1)]
+
+    def _memory_per_client(self, keys: List[str]) -> int:
+        from django_redis import get_redis_connection
+
+        redis_conn = get_redis_connection("default")
+        total = 0
+        for key in keys:
+            for stored_key in self._stored_keys(key):
+                total += redis_conn.memory_usage(cache.make_key(stored_key)) or 0
+        return total // max(1, len(keys))
+
+    def _cleanup(self, keys: List[str]) -> None:
+        cache.delete_many([stored_key for key in keys for stored_key in self._stored_keys(key)])
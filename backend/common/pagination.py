@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
 
 class CustomPagination(PageNumberPagination):
@@ -17,4 +17,24 @@ class CustomPagination(PageNumberPagination):
             'current_page': self.page.number,
             'page_size': self.page_size,
             'results': data
-        })
\ No newline at end of file
+        })
+
+class CustomCursorPagination(CursorPagination):
+    """
+        Keyset pagination for large record streams (no COUNT(*) and no OFFSET scans)
+        - the queryset must be ordered by a unique, indexed column (default: id)
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = 'id'
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'page_size': self.page_size,
+            'results': data
+        })
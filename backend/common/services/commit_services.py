@@ -0,0 +1,65 @@
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+from django.db import transaction
+
+Extent = Tuple[float, float, float, float]  # (xmin, ymin, xmax, ymax)
+
+
+class OnCommitCollector:
+    """
+    Coalesce side effects of a database transaction.
+
+    - add() may be called for every saved row (e.g. 100k times during a bulk import)
+    - items are collected per thread and handed to `handler` ONCE after the transaction commits
+    - outside of an atomic block the handler runs immediately (Django on_commit semantics)
+    - if the transaction rolls back the collected items are flushed with the next commit
+      (over-invalidation is harmless, missing one is not)
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], None], name: str = "") -> None:
+        self.handler = handler
+        self.name = name or getattr(handler, "__name__", "collector")
+        self._local = threading.local()
+
+    def _items(self) -> List[Any]:
+        items = getattr(self._local, "items", None)
+        if items is None:
+            items = []
+            self._local.items = items
+        return items
+
+    def _flush_pending(self) -> bool:
+        """flush is already registered in the current transaction (a rollback drops it)"""
+        connection = transaction.get_connection()
+        return connection.in_atomic_block and any(
+            entry[1] == self.flush for entry in connection.run_on_commit
+        )
+
+    def add(self, item: Any) -> None:
+        items = self._items()
+        items.append(item)
+        # One callback per transaction, not per add() (a bulk import adds 100k items)
+        if not self._flush_pending():
+            transaction.on_commit(self.flush)
+
+    def flush(self) -> None:
+        items = self._items()
+        if not items:
+            return
+        self._local.items = []
+        try:
+            self.handler(items)
+        except Exception as e:
+            print(f"Error in on-commit handler {self.name}: {e}")
+
+
+def union_extents(extents: List[Extent]) -> Optional[Extent]:
+    """Bounding box that covers all given extents (None for an empty list)"""
+    if not extents:
+        return None
+    return (
+        min(e[0] for e in extents),
+        min(e[1] for e in extents),
+        max(e[2] for e in extents),
+        max(e[3] for e in extents),
+    )
@@ -1,3 +1,112 @@
-from django.test import TestCase
+import math
+from unittest.mock import Mock, patch
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
 
-# Create your tests here.
+from common.services.commit_services import OnCommitCollector
+from common.throttles import AnonRateThrottle, sliding_window_wait
+
+LOCMEM_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+class TwoPerMinuteThrottle(AnonRateThrottle):
+    rate = '2/min'
+
+
+def _anonymous_request(ip='10.0.0.1'):
+    request = Mock()
+    request.user.is_authenticated = False
+    request.META = {'REMOTE_ADDR': ip}
+    return request
+
+
+class SlidingWindowWaitTests(SimpleTestCase):
+    """Test cases for the sliding window estimate of the Redis throttles"""
+
+    def test_wait_for_previous_window_to_slide_out(self):
+        # 5 now + 10 * (1 - 0.2) of the previous window = 13 >= 10, below 10 after half the window
+        self.assertAlmostEqual(sliding_window_wait(5, 10, 10, 0.2, 60), 18.0)
+
+    def test_wait_for_next_window_when_current_is_full(self):
+        self.assertAlmostEqual(sliding_window_wait(10, 0, 10, 0.5, 60), 30.0)
+
+    def test_no_wait_without_previous_window(self):
+        self.assertEqual(sliding_window_wait(3, 0, 10, 0.5, 60), 0.0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SlidingWindowThrottleTests(SimpleTestCase):
+    """Test cases for allow_request / wait of the sliding window throttles"""
+
+    def setUp(self):
+        cache.clear()
+
+    def _throttle(self):
+        throttle = TwoPerMinuteThrottle()
+        # 30s into window 10 -> elapsed share 0.5
+        throttle.timer = lambda: 630.0
+        return throttle
+
+    def test_falls_back_to_drf_without_redis(self):
+        """Local memory cache: DRF's timestamp list throttle"""
+        with patch('common.throttles._redis_script', return_value=None):
+            results = [self._throttle().allow_request(_anonymous_request(), None) for _ in range(3)]
+            throttle = self._throttle()
+            self.assertFalse(throttle.allow_request(_anonymous_request(), None))
+        self.assertEqual(results, [True, True, False])
+        self.assertGreater(throttle.wait(), 0)
+
+    def test_redis_counters_deny_at_limit(self):
+        script = Mock(side_effect=[[1, 1, 0], [1, 2, 0], [0, 2, 0]])
+        with patch('common.throttles._redis_script', return_value=script):
+            results = [self._throttle().allow_request(_anonymous_request(), None) for _ in range(2)]
+            throttle = self._throttle()
+            self.assertFalse(throttle.allow_request(_anonymous_request(), None))
+        self.assertEqual(results, [True, True])
+
+        keys = script.call_args.kwargs['keys']
+        self.assertEqual(keys, [
+            cache.make_key("throttle_anon_10.0.0.1:10"),
+            cache.make_key("throttle_anon_10.0.0.1:9"),
+        ])
+        self.assertEqual(script.call_args.kwargs['args'][:2], [2, 120])
+        # Current window full: wait for half a window
+        self.assertEqual(throttle.wait(), math.ceil(sliding_window_wait(2, 0, 2, 0.5, 60)))
+        self.assertEqual(throttle.wait(), 30)
+
+    def test_redis_error_lets_request_through(self):
+        script = Mock(side_effect=ConnectionError("redis down"))
+        with patch('common.throttles._redis_script', return_value=script):
+            self.assertTrue(self._throttle().allow_request(_anonymous_request(), None))
+
+
+class OnCommitCollectorTests(TestCase):
+    """Test cases for the per transaction side effect collector"""
+
+    def setUp(self):
+        self.handler = Mock()
+        self.collector = OnCommitCollector(handler=self.handler, name="test")
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for item in range(100):
+                self.collector.add(item)
+        self.assertEqual(len(callbacks), 1)
+        self.handler.assert_called_once_with(list(range(100)))
+
+    def test_items_of_rolled_back_savepoint_flushed_with_next_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.collector.add(1)
+                    raise ValueError
+            except ValueError:
+                pass
+            self.collector.add(2)
+        self.assertEqual(len(callbacks), 1)
+        self.handler.assert_called_once_with([1, 2])
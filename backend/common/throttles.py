@@ -0,0 +1,119 @@
+"""
+Sliding window throttles kept in Redis counters.
+
+DRF's SimpleRateThrottle stores the list of request timestamps of every client (up to
+num_requests of them) and rewrites it on each request. These throttles keep two counters per
+client instead (current and previous fixed window) and estimate the sliding window as
+previous * (share of the previous window still inside the sliding window) + current.
+
+- One Lua script call per request (EVALSHA), O(1) memory per client
+- Same scopes / rates / cache keys as the DRF classes they replace (drop-in)
+- Falls back to the DRF behaviour when the cache is not django-redis (tests, local memory cache)
+- Lets requests through when Redis fails, like the cache does (IGNORE_EXCEPTIONS)
+"""
+import math
+from typing import Optional
+from django.core.cache import cache
+from rest_framework import throttling
+
+# KEYS: current window counter, previous window counter
+# ARGV: limit, counter ttl (seconds), elapsed share of the current window (0..1)
+# Returns {allowed, current count, previous count}
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local limit = tonumber(ARGV[1])
+if previous * (1 - tonumber(ARGV[3])) + current >= limit then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+end
+return {1, current, previous}
+"""
+
+_script = None
+
+
+def _redis_script():
+    """Registered script bound to the default cache connection, None when the cache is not Redis"""
+    global _script
+    if _script is None:
+        try:
+            from django_redis import get_redis_connection
+            _script = get_redis_connection("default").register_script(SLIDING_WINDOW_SCRIPT)
+        except (ImportError, NotImplementedError):
+            return None
+    return _script
+
+
+def sliding_window_wait(current: int, previous: int, limit: int, elapsed: float, duration: int) -> float:
+    """
+    Seconds until the estimated count drops below limit again.
+    elapsed is the share (0..1) of the current window already gone.
+    """
+    if current >= limit:
+        # Wait for the next window, where this one weighs (1 - elapsed') * current
+        next_elapsed = 1 - limit / current
+        return (1 - elapsed + next_elapsed) * duration
+    if not previous:
+        return 0.0
+    # previous * (1 - e) + current < limit  <=>  e > 1 - (limit - current) / previous
+    needed = 1 - (limit - current) / previous
+    return max(0.0, needed - elapsed) * duration
+
+
+class SlidingWindowThrottleMixin:
+    """
+    allow_request / wait of SimpleRateThrottle on two Redis counters per client.
+    Goes before a SimpleRateThrottle subclass (which provides scope, rate and get_cache_key).
+    """
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+
+        script = _redis_script()
+        if script is None:
+            return super().allow_request(request, view)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        elapsed = (self.now % self.duration) / self.duration
+        keys = [
+            cache.make_key(f"{self.key}:{window}"),
+            cache.make_key(f"{self.key}:{window - 1}"),
+        ]
+        try:
+            allowed, current, previous = script(
+                keys=keys,
+                # A counter is read during its window and the next one
+                args=[self.num_requests, 2 * self.duration, repr(elapsed)],
+            )
+        except Exception as e:
+            print(f"Throttle check failed, request allowed: {e}")
+            return True
+
+        if allowed:
+            return True
+        self._wait = sliding_window_wait(int(current), int(previous), self.num_requests, elapsed, self.duration)
+        return False
+
+    def wait(self) -> Optional[float]:
+        wait = getattr(self, '_wait', None)
+        if wait is None:
+            return super().wait()
+        return math.ceil(wait)
+
+
+class AnonRateThrottle(SlidingWindowThrottleMixin, throttling.AnonRateThrottle):
+    """Scope 'anon', one counter pair per client IP"""
+
+
+class UserRateThrottle(SlidingWindowThrottleMixin, throttling.UserRateThrottle):
+    """Scope 'user', one counter pair per user (client IP when anonymous)"""
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -138,8 +138,8 @@ REST_FRAMEWORK = {
 
     #throttling
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'common.throttles.AnonRateThrottle',
+        'common.throttles.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
@@ -240,4 +240,88 @@ GEOSERVER = {
     "USER":config("GEOSERVER_ADMIN_USER"),
     "DEFAULT_WORKSPACE":config("GEOSERVER_DEFAULT_WORKSPACE"),
     "DEFAULT_STORE":config("GEOSERVER_DEFAULT_STORE"),
-}
\ No newline at end of file
+    # HTTP client (see geoserverapp/services/http_client.py)
+    "CONNECT_TIMEOUT":config("GEOSERVER_CONNECT_TIMEOUT",cast=float,default=3.05),
+    "READ_TIMEOUT":config("GEOSERVER_READ_TIMEOUT",cast=float,default=30),
+    "MAX_RETRIES":config("GEOSERVER_MAX_RETRIES",cast=int,default=3),
+    "RETRY_BACKOFF":config("GEOSERVER_RETRY_BACKOFF",cast=float,default=0.3),
+    "POOL_MAXSIZE":config("GEOSERVER_POOL_MAXSIZE",cast=int,default=20),
+    # Concurrent publishes of GeoServerService.publish_layers
+    "PUBLISH_WORKERS":config("GEOSERVER_PUBLISH_WORKERS",cast=int,default=4),
+    # Catalog (workspace/store/layer) cache: in-process LRU + shared Redis copy
+    "CATALOG_LOCAL_TTL":config("GEOSERVER_CATALOG_LOCAL_TTL",cast=float,default=10),
+    "CATALOG_SHARED_TTL":config("GEOSERVER_CATALOG_SHARED_TTL",cast=int,default=60),
+    "CATALOG_MAXSIZE":config("GEOSERVER_CATALOG_MAXSIZE",cast=int,default=512),
+    # On-disk LRU cache of WFS downloads (not under MEDIA_ROOT: it must not be served by nginx)
+    "DOWNLOAD_CACHE_DIR":config("GEOSERVER_DOWNLOAD_CACHE_DIR",cast=str,default=os.path.join(BASE_DIR, "geoserverdownloadcache")),
+    "DOWNLOAD_CACHE_MAX_BYTES":config("GEOSERVER_DOWNLOAD_CACHE_MAX_BYTES",cast=int,default=2 * 1024 ** 3),
+    # Outbox dispatcher (manage.py geoserver_outbox_dispatcher)
+    "OUTBOX_MAX_ATTEMPTS":config("GEOSERVER_OUTBOX_MAX_ATTEMPTS",cast=int,default=8),
+    "OUTBOX_POLL_INTERVAL":config("GEOSERVER_OUTBOX_POLL_INTERVAL",cast=float,default=1.0),
+    # Seconds a claimed row stays invisible to other dispatchers (longer than a batch of GeoServer calls)
+    "OUTBOX_LEASE_SECONDS":config("GEOSERVER_OUTBOX_LEASE_SECONDS",cast=int,default=300),
+    # GeoWebCache: truncate the tiles of changed areas after cadaster/flag writes
+    "GWC_TRUNCATE_ON_CHANGE":config("GEOSERVER_GWC_TRUNCATE_ON_CHANGE",cast=bool,default=True),
+    "GWC_GRIDSET":config("GEOSERVER_GWC_GRIDSET",cast=str,default="EPSG:900913"),
+    "GWC_ZOOM_START":config("GEOSERVER_GWC_ZOOM_START",cast=int,default=0),
+    "GWC_ZOOM_STOP":config("GEOSERVER_GWC_ZOOM_STOP",cast=int,default=21),
+    "GWC_FORMATS":config("GEOSERVER_GWC_FORMATS",cast=Csv(),default="image/png"),
+}
+REPORT_CACHE = {
+    # Recompute the reports of the imported province in the background after import_cadaster_data
+    "WARM_AFTER_IMPORT":config("REPORT_CACHE_WARM_AFTER_IMPORT",cast=bool,default=True),
+    # Worker processes of `manage.py warm_report_cache`
+    "WARM_WORKERS":config("REPORT_CACHE_WARM_WORKERS",cast=int,default=4),
+}
+CAPTCHA_POOL = {
+    # Pre-rendered captchas kept ready in Redis by `manage.py captcha_pool_filler`
+    "SIZE":config("CAPTCHA_POOL_SIZE",cast=int,default=500),
+    # Captchas rendered per second at most by the filler
+    "REFILL_RATE":config("CAPTCHA_POOL_REFILL_RATE",cast=int,default=50),
+    # Seconds the filler sleeps when the pool is full
+    "POLL_INTERVAL":config("CAPTCHA_POOL_POLL_INTERVAL",cast=float,default=1.0),
+}
+PRINCIPAL_CACHE = {
+    # Authenticated user + company + role cached by JWTAuthentication
+    # Seconds a worker reuses its own copy (edits reach other workers after at most this)
+    "LOCAL_TTL":config("PRINCIPAL_CACHE_LOCAL_TTL",cast=float,default=5),
+    # Seconds the shared Redis copy lives (edits drop it at once)
+    "SHARED_TTL":config("PRINCIPAL_CACHE_SHARED_TTL",cast=int,default=300),
+    # Users kept per worker
+    "MAXSIZE":config("PRINCIPAL_CACHE_MAXSIZE",cast=int,default=2048),
+}
+PERMISSION_CACHE = {
+    # Allowed APIs of each role (HasDynamicPermission)
+    # Seconds a worker trusts the generation it read last (edits reach other workers after at most this)
+    "CHECK_INTERVAL":config("PERMISSION_CACHE_CHECK_INTERVAL",cast=float,default=1),
+    # Seconds a worker keeps its copy of a role set even when no new generation is seen
+    "LOCAL_TTL":config("PERMISSION_CACHE_LOCAL_TTL",cast=int,default=300),
+    # Seconds the shared Redis copy of a role set lives
+    "SHARED_TTL":config("PERMISSION_CACHE_SHARED_TTL",cast=int,default=3600),
+}
+PELAK_ACCESS = {
+    # Seconds a user access snapshot (granted pelaks + company provinces) is cached, edits drop it at once
+    "SNAPSHOT_TIMEOUT":config("PELAK_ACCESS_SNAPSHOT_TIMEOUT",cast=int,default=60 * 60),
+    # Seconds an access area is trusted before it is rebuilt (unused areas are deleted after twice this)
+    "AREA_TIMEOUT":config("PELAK_ACCESS_AREA_TIMEOUT",cast=int,default=60 * 60 * 24),
+}
+VECTOR_TILES = {
+    # Zoom range served by /api/landreg/tiles/<layer>/<z>/<x>/<y>.mvt
+    "MIN_ZOOM":config("VECTOR_TILES_MIN_ZOOM",cast=int,default=0),
+    "MAX_ZOOM":config("VECTOR_TILES_MAX_ZOOM",cast=int,default=20),
+    # Seconds a tile stays in Redis (edits make it unreachable earlier)
+    "CACHE_TIMEOUT":config("VECTOR_TILES_CACHE_TIMEOUT",cast=int,default=60 * 60 * 24),
+    # An edit covering more tiles than this at one zoom invalidates the whole zoom level
+    "INVALIDATION_MAX_TILES":config("VECTOR_TILES_INVALIDATION_MAX_TILES",cast=int,default=1024),
+    # Features per answer of /api/landreg/borders/<layer>/ (GeoJSON)
+    "GEOJSON_MAX_FEATURES":config("VECTOR_TILES_GEOJSON_MAX_FEATURES",cast=int,default=5000),
+}
+TILE_PACKAGES = {
+    # Offline MBTiles / PMTiles packages (not under MEDIA_ROOT: packages are per access scope)
+    "DIR":config("TILE_PACKAGES_DIR",cast=str,default=os.path.join(BASE_DIR, "tilepackages")),
+    "MIN_ZOOM":config("TILE_PACKAGES_MIN_ZOOM",cast=int,default=10),
+    "MAX_ZOOM":config("TILE_PACKAGES_MAX_ZOOM",cast=int,default=16),
+    # Threads rendering tiles (each one holds a DB connection)
+    "WORKERS":config("TILE_PACKAGES_WORKERS",cast=int,default=4),
+    "MAX_TILES":config("TILE_PACKAGES_MAX_TILES",cast=int,default=200000),
+}
@@ -19,6 +19,7 @@ urlpatterns = [
     path('api/auth/', include('accounts.urls', namespace='accounts')),
     
     path('api/landreg/', include('landreg.urls')),
+    path('api/geoserver/', include('geoserverapp.urls')),
 
     #spectacular
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from geoserverapp.models import GeoServerOutbox
+
+
+class GeoServerOutboxAdmin(admin.ModelAdmin):
+    list_display = ["id", "operation", "status", "attempts", "next_attempt_at", "created_at", "processed_at"]
+    list_filter = ["operation", "status"]
+    readonly_fields = ["operation", "payload", "attempts", "last_error", "created_at", "processed_at"]
+    actions = ["retry_now"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_now(self, request, queryset):
+        """Re-queue selected operations (failed ones included) for the next dispatcher run"""
+        queryset.update(status=GeoServerOutbox.Status.PENDING, next_attempt_at=timezone.now(), attempts=0)
+    retry_now.short_description = "Retry selected operations now"
+
+
+admin.site.register(GeoServerOutbox, GeoServerOutboxAdmin)
@@ -0,0 +1,141 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from geoserverapp.services.geoserver_service import GeoServerService
+from geoserverapp.services.geoserver_stub import start_geoserver_stub
+from geoserverapp.services.http_client import latency_recorder
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure GeoServerService publish / WFS download throughput and tail latency under concurrency. "
+        "Runs against the local GeoServer stub unless --url is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", type=str, help="Real GeoServer URL (default: start the local stub)")
+        parser.add_argument("--workspace", type=str, default="benchmark_ws")
+        parser.add_argument("--store", type=str, default="benchmark_store")
+        parser.add_argument("--layers", type=int, default=50, help="Layers published (stub)")
+        parser.add_argument(
+            "--tables",
+            type=str,
+            nargs="+",
+            help="Existing PostGIS tables to publish (with --url, they must not be published yet)",
+        )
+        parser.add_argument("--downloads", type=int, default=100, help="WFS downloads")
+        parser.add_argument("--concurrency", type=int, default=8)
+        # Stub only
+        parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request (seconds)")
+        parser.add_argument("--jitter", type=float, default=0.01, help="Stub extra random latency (seconds)")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Stub share of 503 answers")
+        parser.add_argument("--download-bytes", type=int, default=1024 * 1024, help="Stub WFS answer size")
+
+    def handle(self, *args, **options):
+        stub = None
+        url = options.get("url")
+        if not url:
+            stub = start_geoserver_stub(
+                latency=options["latency"],
+                jitter=options["jitter"],
+                error_rate=options["error_rate"],
+                download_bytes=options["download_bytes"],
+                workspace=options["workspace"],
+                store_name=options["store"],
+            )
+            url = stub.url
+            self.stdout.write(f"GeoServer stub listening on {url}")
+
+        try:
+            service = GeoServerService(
+                url=url,
+                username=settings.GEOSERVER.get("USER"),
+                password=settings.GEOSERVER.get("PASSWORD"),
+            )
+            if not service.store_exists(store_name=options["store"], workspace=options["workspace"]):
+                raise CommandError(f"Store {options['workspace']}:{options['store']} does not exist")
+
+            latency_recorder.reset()
+            layers = self._bench_publish(service, options)
+            if layers:
+                self._bench_download(service, options, layers)
+            self._print_call_stats()
+        finally:
+            if stub is not None:
+                stub.shutdown()
+                stub.server_close()
+
+    def _bench_publish(self, service: GeoServerService, options) -> List[str]:
+        run_id = int(time.time())
+        pg_tables = options.get("tables") or [f"benchmark_{run_id}_{i}" for i in range(options["layers"])]
+        if not pg_tables:
+            return []
+
+        started = time.perf_counter()
+        results = service.publish_layers(
+            workspace=options["workspace"],
+            store_name=options["store"],
+            pg_tables=pg_tables,
+            max_workers=options["concurrency"],
+        )
+        elapsed = time.perf_counter() - started
+
+        published = [res["pg_table"] for res in results if res.get("status") == 201]
+        self.stdout.write(self.style.MIGRATE_HEADING("Publish"))
+        self.stdout.write(
+            f"  {len(published)}/{len(pg_tables)} layers in {elapsed:.2f}s "
+            f"-> {len(published) / elapsed:.1f} layers/s"
+        )
+        return published
+
+    def _bench_download(self, service: GeoServerService, options, layers: List[str]) -> None:
+        def download(i: int) -> Tuple[float, int, bool]:
+            started = time.perf_counter()
+            size = 0
+            try:
+                response = service.open_wfs_stream(
+                    workspace=options["workspace"],
+                    layer_name=layers[i % len(layers)],
+                )
+                with response:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        size += len(chunk)
+                return time.perf_counter() - started, size, True
+            except Exception:
+                return time.perf_counter() - started, size, False
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(executor.map(download, range(options["downloads"])))
+        elapsed = time.perf_counter() - started
+
+        durations = [duration for duration, _, ok in results if ok]
+        total_bytes = sum(size for _, size, _ in results)
+        self.stdout.write(self.style.MIGRATE_HEADING("Download"))
+        self.stdout.write(
+            f"  {len(durations)}/{len(results)} downloads in {elapsed:.2f}s "
+            f"-> {len(durations) / elapsed:.1f} downloads/s, {total_bytes / elapsed / 1024 ** 2:.1f} MB/s"
+        )
+        if durations:
+            self.stdout.write(
+                f"  latency p50 {_percentile(durations, 0.50) * 1000:.1f}ms "
+                f"p95 {_percentile(durations, 0.95) * 1000:.1f}ms "
+                f"p99 {_percentile(durations, 0.99) * 1000:.1f}ms "
+                f"max {max(durations) * 1000:.1f}ms"
+            )
+
+    def _print_call_stats(self) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING("GeoServer calls"))
+        for call, stats in sorted(latency_recorder.stats().items()):
+            self.stdout.write(
+                f"  {call}: n={stats['count']} errors={stats['errors']} "
+                f"avg={stats['avg_ms']}ms p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms max={stats['max_ms']}ms"
+            )
@@ -0,0 +1,79 @@
+# geoserverapp/management/commands/geoserver_outbox_dispatcher.py
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import close_old_connections
+
+from geoserverapp.services.outbox_service import (
+    OUTBOX_BATCH_SIZE,
+    dispatch_outbox_batch,
+    purge_outbox,
+)
+
+# Purge finished rows once per this many seconds
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Drain the GeoServer outbox (publish / delete layer / apply style) with retries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process all due operations and exit",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help="Operations claimed per transaction",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.GEOSERVER.get("OUTBOX_POLL_INTERVAL", 1.0),
+            help="Seconds to sleep when the outbox is empty",
+        )
+        parser.add_argument(
+            "--purge-days",
+            type=int,
+            default=30,
+            help="Delete done operations older than this many days (0 disables)",
+        )
+
+    def handle(self, *args, **options):
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        batch_size = options["batch_size"]
+        last_purge = 0.0
+        self.stdout.write(self.style.SUCCESS("GeoServer outbox dispatcher started"))
+
+        while not self._stop:
+            close_old_connections()
+            try:
+                handled = dispatch_outbox_batch(batch_size=batch_size)
+                if handled:
+                    self.stdout.write(f"Dispatched {handled} GeoServer operations")
+
+                if options["purge_days"] and time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                    purged = purge_outbox(options["purge_days"])
+                    if purged:
+                        self.stdout.write(f"Purged {purged} done GeoServer operations")
+                    last_purge = time.monotonic()
+            except Exception as e:
+                handled = 0
+                self.stderr.write(self.style.ERROR(f"GeoServer outbox dispatch failed: {e}"))
+
+            if options["once"] and handled == 0:
+                break
+            if handled < batch_size:
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("GeoServer outbox dispatcher stopped"))
+
+    def _request_stop(self, signum, frame):
+        self._stop = True
@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand
+
+from geoserverapp.services.geoserver_stub import start_geoserver_stub
+
+
+class Command(BaseCommand):
+    help = "Run the in-memory GeoServer REST/WFS stand-in (point GEOSERVER_URL at it for local work)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8600)
+        parser.add_argument("--latency", type=float, default=0.0, help="Latency per request (seconds)")
+        parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency (seconds)")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with --error-status")
+        parser.add_argument("--error-status", type=int, default=503)
+        parser.add_argument("--download-bytes", type=int, default=1024 * 1024, help="WFS GetFeature answer size")
+        parser.add_argument("--workspace", type=str, help="Workspace created at start")
+        parser.add_argument("--store", type=str, help="Store created at start (needs --workspace)")
+
+    def handle(self, *args, **options):
+        server = start_geoserver_stub(
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            download_bytes=options["download_bytes"],
+            workspace=options.get("workspace"),
+            store_name=options.get("store"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"GeoServer stub listening on {server.url}"))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from geoserverapp.services.geoserver_service import GeoServerService
+
+class Command(BaseCommand):
+    help = 'Seeds (or truncates) the GeoWebCache tiles of a layer, optionally inside a bbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('layer', type=str, help='Layer name (e.g. landreg_cadaster)')
+        parser.add_argument('--workspace', type=str, help='Workspace name (default: settings.py)')
+        parser.add_argument(
+            '--bbox',
+            type=float,
+            nargs=4,
+            metavar=('MINX', 'MINY', 'MAXX', 'MAXY'),
+            help='Extent in EPSG:4326 (default: whole layer)',
+        )
+        parser.add_argument('--zoom-start', type=int, default=0)
+        parser.add_argument('--zoom-stop', type=int, default=12)
+        parser.add_argument('--threads', type=int, default=2, help='GeoWebCache seeding threads')
+        parser.add_argument('--reseed', action='store_true', help='Regenerate tiles that already exist')
+        parser.add_argument('--truncate', action='store_true', help='Truncate instead of seeding')
+
+    def handle(self, *args, **options):
+        workspace = options.get('workspace') or settings.GEOSERVER.get('DEFAULT_WORKSPACE')
+        layer = options['layer']
+        bbox = tuple(options['bbox']) if options.get('bbox') else None
+        try:
+            service = GeoServerService()
+            if options['truncate']:
+                self.stdout.write(f"Truncating tile cache of '{workspace}:{layer}'...")
+                results = service.truncate_tile_cache(
+                    workspace=workspace,
+                    layer_name=layer,
+                    bbox=bbox,
+                    zoom_start=options['zoom_start'] if bbox else None,
+                    zoom_stop=options['zoom_stop'] if bbox else None,
+                )
+            else:
+                self.stdout.write(f"Seeding tile cache of '{workspace}:{layer}'...")
+                results = service.seed_tile_cache(
+                    workspace=workspace,
+                    layer_name=layer,
+                    bbox=bbox,
+                    zoom_start=options['zoom_start'],
+                    zoom_stop=options['zoom_stop'],
+                    thread_count=options['threads'],
+                    reseed=options['reseed'],
+                )
+            for result in results:
+                self.stdout.write(self.style.SUCCESS(result['message']))
+        except Exception as e:
+            raise CommandError(f'Failed to update tile cache: {str(e)}')
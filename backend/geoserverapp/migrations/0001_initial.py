@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 11:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoServerOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('publish_layer', 'انتشار لایه'), ('delete_layer', 'حذف لایه'), ('apply_style', 'اعمال استایل')], max_length=30, verbose_name='عملیات')),
+                ('payload', models.JSONField(default=dict, verbose_name='پارامترها')),
+                ('status', models.CharField(choices=[('pending', 'در انتظار'), ('done', 'انجام شده'), ('failed', 'ناموفق')], default='pending', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان تلاش بعدی')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='آخرین خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاریخ انجام')),
+            ],
+            options={
+                'verbose_name': 'صف عملیات جئوسرور',
+                'verbose_name_plural': 'صف عملیات های جئوسرور',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='geoserverap_status_e22fc4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geoserverapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='geoserveroutbox',
+            name='operation',
+            field=models.CharField(choices=[('publish_layer', 'انتشار لایه'), ('delete_layer', 'حذف لایه'), ('apply_style', 'اعمال استایل'), ('truncate_tiles', 'پاکسازی کش تایل')], max_length=30, verbose_name='عملیات'),
+        ),
+    ]
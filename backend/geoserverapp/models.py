@@ -0,0 +1,68 @@
+from django.utils import timezone
+from django.db import models
+
+
+class GeoServerOutbox(models.Model):
+    """
+    Transactional outbox of GeoServer side effects.
+    Rows are written in the same DB transaction as the data they belong to and drained by
+    `manage.py geoserver_outbox_dispatcher` (see outbox_service)
+    """
+    class Operation(models.TextChoices):
+        PUBLISH_LAYER = 'publish_layer', 'انتشار لایه'
+        DELETE_LAYER = 'delete_layer', 'حذف لایه'
+        APPLY_STYLE = 'apply_style', 'اعمال استایل'
+        TRUNCATE_TILES = 'truncate_tiles', 'پاکسازی کش تایل'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'در انتظار'
+        DONE = 'done', 'انجام شده'
+        FAILED = 'failed', 'ناموفق'
+
+    operation = models.CharField(
+        verbose_name="عملیات",
+        max_length=30,
+        choices=Operation.choices,
+    )
+    payload = models.JSONField(
+        verbose_name="پارامترها",
+        default=dict,
+    )
+    status = models.CharField(
+        verbose_name="وضعیت",
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name="تعداد تلاش",
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name="زمان تلاش بعدی",
+        default=timezone.now,
+    )
+    last_error = models.TextField(
+        verbose_name="آخرین خطا",
+        blank=True,
+        default="",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="تاریخ ایجاد",
+        auto_now_add=True,
+    )
+    processed_at = models.DateTimeField(
+        verbose_name="تاریخ انجام",
+        blank=True,
+        null=True,
+    )
+
+    def __str__(self):
+        return f"{self.operation} ({self.status}) #{self.id}"
+
+    class Meta:
+        verbose_name = "صف عملیات جئوسرور"
+        verbose_name_plural = "صف عملیات های جئوسرور"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
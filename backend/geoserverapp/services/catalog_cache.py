@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+# An entry is {"found": bool, "value": Any}; a 404 from GeoServer is cached as found=False
+CatalogEntry = Dict[str, Any]
+
+
+def workspace_key(workspace: str) -> str:
+    return f"workspace:{workspace}"
+
+
+def store_key(workspace: str, store_name: str) -> str:
+    return f"store:{workspace}:{store_name}"
+
+
+def layer_key(workspace: str, layer_name: str) -> str:
+    return f"layer:{workspace}:{layer_name}"
+
+
+class GeoServerCatalogCache:
+    """
+    Two level cache of GeoServer catalog lookups (workspaces, stores, layers).
+
+    - L1: in-process LRU with a short TTL -> a hit costs no network call at all
+    - L2: shared Redis copy (django cache) with a longer TTL -> one worker's lookup serves the others
+    - invalidate() drops both levels; L1 copies of OTHER processes expire within the local TTL
+    - Only definitive answers are cached (found / 404), connection errors and 5xx never are
+    """
+
+    def __init__(
+        self,
+        local_ttl: Optional[float] = None,
+        shared_ttl: Optional[int] = None,
+        maxsize: Optional[int] = None,
+        prefix: str = "geoserver_catalog",
+    ) -> None:
+        self._local_ttl = local_ttl
+        self._shared_ttl = shared_ttl
+        self._maxsize = maxsize
+        self.prefix = prefix
+        self._local: "OrderedDict[str, Tuple[float, CatalogEntry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def local_ttl(self) -> float:
+        return self._local_ttl if self._local_ttl is not None else settings.GEOSERVER.get("CATALOG_LOCAL_TTL", 10)
+
+    @property
+    def shared_ttl(self) -> int:
+        return self._shared_ttl if self._shared_ttl is not None else settings.GEOSERVER.get("CATALOG_SHARED_TTL", 60)
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize if self._maxsize is not None else settings.GEOSERVER.get("CATALOG_MAXSIZE", 512)
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _get_local(self, key: str) -> Optional[CatalogEntry]:
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _set_local(self, key: str, entry: CatalogEntry) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CatalogEntry]:
+        entry = self._get_local(key)
+        if entry is not None:
+            return entry
+        entry = cache.get(self._shared_key(key))
+        if entry is not None:
+            self._set_local(key, entry)
+        return entry
+
+    def set(self, key: str, entry: CatalogEntry) -> None:
+        self._set_local(key, entry)
+        cache.set(self._shared_key(key), entry, self.shared_ttl)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], CatalogEntry]) -> CatalogEntry:
+        """fetch() returns an entry to cache, or raises (nothing is cached)"""
+        entry = self.get(key)
+        if entry is None:
+            entry = fetch()
+            self.set(key, entry)
+        return entry
+
+    def invalidate(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        cache.delete_many([self._shared_key(key) for key in keys])
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+catalog_cache = GeoServerCatalogCache()
@@ -0,0 +1,93 @@
+"""
+Which GeoServer layers a user may download, and which part of them.
+
+- Only the layers served as vector tiles are downloadable, with the same exposed columns
+  (no owner personal data) and the same access rules (see landreg tile_service / access_service)
+- The access rule is sent to GeoServer as a CQL filter built here, callers never send raw CQL
+- Download cache entries are keyed by the access scope: users with other grants never share a file
+"""
+from typing import Any, Dict, List, Optional
+
+from geoserverapp.services.download_cache import download_cache_key
+from landreg.services.access_service import AccessSnapshot, area_generation
+from landreg.services.tile_service import TILE_LAYERS
+
+# Geometry attribute of the published landreg tables
+DOWNLOAD_GEOMETRY_ATTRIBUTE = "border"
+# CQL filter that matches nothing
+EXCLUDE_ALL = "EXCLUDE"
+
+
+def downloadable_layer(layername: str) -> Optional[Dict[str, Any]]:
+    """Tile layer config of a published table (GeoServer layer name = table name), None when not downloadable"""
+    for layer_config in TILE_LAYERS.values():
+        if layer_config['table'] == layername:
+            return layer_config
+    return None
+
+
+def download_property_names(layer_config: Dict[str, Any]) -> List[str]:
+    return [*layer_config['columns'], DOWNLOAD_GEOMETRY_ATTRIBUTE]
+
+
+def _cql_text(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def download_access_filter(layer_config: Dict[str, Any], access: AccessSnapshot) -> Optional[str]:
+    """CQL filter restricting the layer to what the user may see, None when nothing is restricted"""
+    if access.is_full or layer_config['access'] == 'public':
+        return None
+
+    if layer_config['access'] == 'pelak':
+        conditions = []
+        if access.pelak_numbers:
+            conditions.append(f"number IN ({', '.join(_cql_text(number) for number in access.pelak_numbers)})")
+        if access.province_ids:
+            conditions.append(f"provinces_id IN ({', '.join(str(int(pk)) for pk in access.province_ids)})")
+        return " OR ".join(conditions) if conditions else EXCLUDE_ALL
+
+    area_wkt = access.area_wkt()
+    if not area_wkt:
+        return EXCLUDE_ALL
+    return f"INTERSECTS({DOWNLOAD_GEOMETRY_ATTRIBUTE}, {area_wkt})"
+
+
+def bbox_filter(bbox: str) -> str:
+    """CQL of a validated WFS bbox (minx,miny,maxx,maxy[,crs]), GeoServer does not combine BBOX with CQL_FILTER"""
+    parts = bbox.split(",")
+    coordinates = ", ".join(str(float(part)) for part in parts[:4])
+    crs = f", {_cql_text(parts[4])}" if len(parts) > 4 else ""
+    return f"BBOX({DOWNLOAD_GEOMETRY_ATTRIBUTE}, {coordinates}{crs})"
+
+
+def download_filter(layer_config: Dict[str, Any], access: AccessSnapshot, bbox: Optional[str]) -> Optional[str]:
+    """Access filter AND the optional bbox, None when the whole layer is requested"""
+    conditions = [
+        condition
+        for condition in (download_access_filter(layer_config, access), bbox_filter(bbox) if bbox else None)
+        if condition
+    ]
+    if EXCLUDE_ALL in conditions:
+        return EXCLUDE_ALL
+    return " AND ".join(f"({condition})" for condition in conditions) or None
+
+
+def layer_download_cache_key(
+    workspace: str,
+    layername: str,
+    format: str,
+    bbox: Optional[str],
+    access: AccessSnapshot,
+    version: str,
+) -> str:
+    return download_cache_key(
+        workspace=workspace,
+        layer=layername,
+        format=format,
+        bbox=bbox,
+        scope=access.scope,
+        # The access area of a scope moves with the granted borders
+        area=None if access.is_full else area_generation(),
+        version=version,
+    )
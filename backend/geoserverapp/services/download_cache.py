@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, BinaryIO, Optional
+from django.conf import settings
+
+# Temp files of interrupted writes older than this are removed by eviction
+STALE_PART_SECONDS = 60 * 60
+
+
+def download_cache_key(**parts: Any) -> str:
+    """Stable key of a download request (sorted JSON of its parts)"""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheWriter:
+    """
+    Writes one cache entry next to its final path and publishes it atomically (os.replace).
+    Write errors (disk full, ...) disable the writer instead of breaking the download.
+    """
+
+    def __init__(self, cache: "DiskLRUCache", key: str) -> None:
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        self.tmp_path = os.path.join(cache.directory, f".{key}.{uuid.uuid4().hex}.part")
+        self._file: Optional[BinaryIO] = open(self.tmp_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        if self._file is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.cache.max_bytes:
+            # Larger than the whole cache, do not keep it
+            self.abort()
+            return
+        try:
+            self._file.write(chunk)
+        except OSError as e:
+            print(f"Error in download cache write {self.key}: {e}")
+            self.abort()
+
+    def commit(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            self._file = None
+            os.replace(self.tmp_path, self.cache.path_for(self.key))
+        except OSError as e:
+            print(f"Error in download cache commit {self.key}: {e}")
+            self.abort()
+            return
+        self.cache.evict()
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class DiskLRUCache:
+    """
+    Size bounded on-disk cache of downloads, least recently used entries are evicted first.
+
+    - Recency is the file mtime (touched on every hit), so it is shared by all processes
+    - Entries are immutable: the key includes everything the content depends on
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open a cached entry for reading (None on a miss)"""
+        path = self.path_for(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def writer(self, key: str) -> CacheWriter:
+        return CacheWriter(self, key)
+
+    def evict(self) -> None:
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.endswith(".part"):
+                        if now - stat.st_mtime > STALE_PART_SECONDS:
+                            self._remove(entry.path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+        finally:
+            self._evict_lock.release()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_download_cache: Optional[DiskLRUCache] = None
+
+
+def get_download_cache() -> DiskLRUCache:
+    global _download_cache
+    if _download_cache is None:
+        _download_cache = DiskLRUCache(
+            directory=settings.GEOSERVER.get("DOWNLOAD_CACHE_DIR"),
+            max_bytes=settings.GEOSERVER.get("DOWNLOAD_CACHE_MAX_BYTES"),
+        )
+    return _download_cache
@@ -1,15 +1,36 @@
-import requests
 import io
+import requests
 import os
 import uuid
 import tempfile
 # from xml.dom import minidom
 from lxml import etree
 import xml.sax.saxutils as saxutils
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import math
+from typing import Optional, Dict, Any, List, Tuple
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from geo.Geoserver import Geoserver , GeoserverException
 from django.conf import settings
+from geoserverapp.services.http_client import PooledGeoserver, get_geoserver_session
+from geoserverapp.services.layer_version import bump_layer_versions
+from geoserverapp.services.catalog_cache import (
+    catalog_cache,
+    workspace_key,
+    store_key,
+    layer_key,
+)
+
+WEB_MERCATOR_RADIUS = 6378137.0
+WEB_MERCATOR_MAX_LAT = 85.0511287798066
+
+
+def lonlat_to_web_mercator(lon: float, lat: float) -> Tuple[float, float]:
+    lat = max(min(lat, WEB_MERCATOR_MAX_LAT), -WEB_MERCATOR_MAX_LAT)
+    x = WEB_MERCATOR_RADIUS * math.radians(lon)
+    y = WEB_MERCATOR_RADIUS * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+    return x, y
+
 
 class GeoServerService:
     """Service class for interacting with GeoServer"""
@@ -19,8 +40,10 @@ class GeoServerService:
         self.url = url or settings.GEOSERVER.get('URL')
         self.username = username or settings.GEOSERVER.get('USER')
         self.password = password or settings.GEOSERVER.get('PASSWORD')
-        # Initialize Geoserver client
-        self.geo      : Geoserver = Geoserver(self.url, username=self.username, password=self.password)
+        # Keep-alive pooled session (timeouts, retries, latency) shared by every call of this process
+        self.session = get_geoserver_session()
+        # Initialize Geoserver client (its REST calls go through the same session)
+        self.geo      : Geoserver = PooledGeoserver(self.url, username=self.username, password=self.password, session=self.session)
 
     def get_all_layers_from_geoserver(
         self,
@@ -39,7 +62,13 @@ class GeoServerService:
         if not workspace or not layername:
             raise ValueError("workspace and layername cannot be None!")
         
-        res:Dict = self.geo.get_layer(layer_name=layername , workspace=workspace)
+        entry = catalog_cache.get_or_fetch(
+            layer_key(workspace, layername),
+            lambda: self._fetch_catalog_entry(lambda: self.geo.get_layer(layer_name=layername , workspace=workspace)),
+        )
+        if not entry["found"]:
+            raise GeoserverException(404, f"layer {workspace}:{layername} not found")
+        res:Dict = entry["value"]
         return res
     
     def delete_a_layer_from_geoserver(
@@ -50,8 +79,21 @@ class GeoServerService:
         if not workspace or not layername:
             raise ValueError("workspace and layername cannot be None!")
 
-        res:str = self.geo.delete_layer(layer_name=layername , workspace=workspace)
+        try:
+            res:str = self.geo.delete_layer(layer_name=layername , workspace=workspace)
+        finally:
+            catalog_cache.invalidate(layer_key(workspace, layername))
+            bump_layer_versions([(workspace, layername)])
         return res
+
+    def _fetch_catalog_entry(self, fetch) -> Dict[str, Any]:
+        """Catalog cache entry of a GeoServer lookup: found / 404, other errors are raised (not cached)"""
+        try:
+            return {"found": True, "value": fetch()}
+        except GeoserverException as e:
+            if e.status == 404:
+                return {"found": False, "value": None}
+            raise
     
     def workspace_exists(
         self,
@@ -59,9 +101,12 @@ class GeoServerService:
     ) -> bool:
         """Check if a workspace exists"""
         try:
-            result : Dict[str, Any] = self.geo.get_workspace(workspace=workspace_name)
-            # If we got here without an exception, and there's a workspace element, it exists
-            exists : bool = result.get("workspace") is not None
+            entry = catalog_cache.get_or_fetch(
+                workspace_key(workspace_name),
+                lambda: self._fetch_catalog_entry(lambda: self.geo.get_workspace(workspace=workspace_name)),
+            )
+            # Found, and there's a workspace element -> it exists
+            exists : bool = entry["found"] and entry["value"].get("workspace") is not None
             return exists
         except Exception:
             # If there's an exception, assume the workspace doesn't exist
@@ -75,9 +120,13 @@ class GeoServerService:
         if not store_name or not workspace:
             raise ValueError("Store name and workspace cannot be None or empty")            
         try:
-            result : Dict[str, Any] = self.geo.get_featurestore(store_name=store_name, workspace=workspace)
-            # If we got here without an exception, and there's a dataStore element, it exists
-            exists : bool = result.get("name") is not None and result.get("enabled") is True
+            entry = catalog_cache.get_or_fetch(
+                store_key(workspace, store_name),
+                lambda: self._fetch_catalog_entry(lambda: self.geo.get_featurestore(store_name=store_name, workspace=workspace)),
+            )
+            # Found, and there's an enabled dataStore element -> it exists
+            result : Dict[str, Any] = entry["value"] or {}
+            exists : bool = entry["found"] and result.get("name") is not None and result.get("enabled") is True
             return exists
         except Exception as e:
             return False
@@ -105,7 +154,10 @@ class GeoServerService:
                     raise e
         
         # Workspace doesn't exist, so create it
-        return self.geo.create_workspace(workspace=workspace_name)
+        try:
+            return self.geo.create_workspace(workspace=workspace_name)
+        finally:
+            catalog_cache.invalidate(workspace_key(workspace_name))
     
     def create_postgis_store(
         self,
@@ -129,17 +181,20 @@ class GeoServerService:
         # Escape XML special chars in password
         safe_password = saxutils.escape(db_params.get("PASSWORD", ""))
         
-        return self.geo.create_featurestore(
-            store_name=store_name,
-            workspace=workspace,
-            # port=db_params.get('PORT'),
-            port=5432, # contaners database & geoserver both are in the same network
-            db=db_params.get('NAME' , ''),
-            # host=db_params.get('HOST'),
-            host='jahad_postgis_db', #running in container
-            pg_user=db_params.get('USER' , ''),
-            pg_password=safe_password
-        )
+        try:
+            return self.geo.create_featurestore(
+                store_name=store_name,
+                workspace=workspace,
+                # port=db_params.get('PORT'),
+                port=5432, # contaners database & geoserver both are in the same network
+                db=db_params.get('NAME' , ''),
+                # host=db_params.get('HOST'),
+                host='jahad_postgis_db', #running in container
+                pg_user=db_params.get('USER' , ''),
+                pg_password=safe_password
+            )
+        finally:
+            catalog_cache.invalidate(store_key(workspace, store_name))
     
     def pulish_layer(
         self,
@@ -155,51 +210,110 @@ class GeoServerService:
         if not self.store_exists(store_name=store_name,workspace=workspace):
             raise Exception(f"Store '{store_name}' dose not exists")
     
-        result : int = self.geo.publish_featurestore(
+        return self._publish_featurestore(
             workspace=workspace,
             store_name=store_name,
             title=title,
             pg_table=pg_table,
         )
 
+    def _publish_featurestore(
+        self,
+        workspace: str,
+        store_name: str,
+        title: str,
+        pg_table: str,
+    ) -> Dict[str, Any]:
+        """Publish one table of an existing store (no store check)"""
+        try:
+            result : int = self.geo.publish_featurestore(
+                workspace=workspace,
+                store_name=store_name,
+                title=title,
+                pg_table=pg_table,
+            )
+        finally:
+            # GeoServer names the published layer after its table
+            catalog_cache.invalidate(layer_key(workspace, pg_table))
+            bump_layer_versions([(workspace, pg_table)])
+
         if result == 201:
             return {"detail":"The layer has been published successfully.","status":201}
         else:
             return {"detail":"Unknow Error","status":400}
+
+    def publish_layers(
+        self,
+        workspace: str,
+        store_name: str,
+        pg_tables: List[str],
+        max_workers: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Publish many tables of one store concurrently.
+
+        - The store is checked once for the whole batch
+        - Layers are published by a bounded thread pool sharing the pooled session
+        - Never raises for a single layer: returns one result per table, in input order
+          {"pg_table":..., "status": 201 | <error status>, "detail":...}
+        """
+        if not workspace or not store_name:
+            raise ValueError("workspace,store_name cannot be None!")
+        if not pg_tables:
+            return []
+
+        if not self.store_exists(store_name=store_name, workspace=workspace):
+            raise Exception(f"Store '{store_name}' dose not exists")
+
+        def publish(pg_table: str) -> Dict[str, Any]:
+            try:
+                result = self._publish_featurestore(
+                    workspace=workspace,
+                    store_name=store_name,
+                    title=pg_table,
+                    pg_table=pg_table,
+                )
+            except GeoserverException as e:
+                result = {"detail": str(e.message), "status": e.status}
+            except Exception as e:
+                result = {"detail": str(e), "status": 500}
+            return {"pg_table": pg_table, **result}
+
+        workers = max_workers or settings.GEOSERVER.get("PUBLISH_WORKERS", 4)
+        workers = max(1, min(workers, len(pg_tables)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geoserver-publish") as executor:
+            return list(executor.map(publish, pg_tables))
     
-    def download_layer_as_shape_zip(
+    def open_wfs_stream(
         self,
         workspace: str,
         layer_name: str,
+        output_format: str = "SHAPE-ZIP",
         bbox: Optional[str] = None,
-        cql_filter: Optional[str] = None
-    )->str:
+        cql_filter: Optional[str] = None,
+        property_names: Optional[List[str]] = None,
+    ) -> requests.Response:
         """
-        Download a layer as a ZIP file with optional spatial and attribute filtering.
-        
-        - This is achieved via a direct request to GeoServer,
-        as the geoserver-rest package does not currently support this functionality.
+        Start a WFS GetFeature request and return the streaming response (body not read yet).
+        The caller must consume or close() it.
+        The parameters are sent as a form encoded POST: access filters can be too long for a URL.
 
-        Returns:
-        - The file path of the downloaded ZIP archive located in the temporary directory.
+        Raises:
+            GeoserverException: workspace missing, non 200 answer or an OGC exception report
         """
-        
-        FORMAT = "SHAPE-ZIP"
-        
         if not workspace or not layer_name:
             raise ValueError("Workspace and layer_name cannot be None or empty")
         
         if not self.workspace_exists(workspace):
             raise GeoserverException(message="Workspace dose not exist!",status=404)
 
-        
         wfs_url = f"{self.url}/wfs"
         params = {
             'service': 'WFS',
             'version': '2.0.0',
             'request': 'GetFeature',
             'typeNames': f"{workspace}:{layer_name}",
-            'outputFormat': FORMAT,
+            'outputFormat': output_format,
         }
 
         if bbox:
@@ -208,15 +322,53 @@ class GeoServerService:
         if cql_filter:
             params['CQL_FILTER'] = cql_filter
 
-        response = requests.get(
+        if property_names:
+            params['propertyName'] = ",".join(property_names)
+
+        response = self.session.post(
             wfs_url,
-            params=params,
+            data=params,
             auth=(self.username, self.password),
             stream=True
         )
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to download layer: {response.status_code} - {response.text}")
+        # GeoServer reports WFS errors (bad CQL, unknown layer) as 200 + XML exception report
+        content_type = response.headers.get('Content-Type', '')
+        is_exception_report = 'xml' in content_type and 'xml' not in output_format.lower()
+        if response.status_code != 200 or is_exception_report:
+            detail = response.text
+            response.close()
+            raise GeoserverException(
+                message=f"Failed to download layer: {detail}",
+                status=response.status_code if response.status_code != 200 else 400,
+            )
+        return response
+
+    def download_layer_as_shape_zip(
+        self,
+        workspace: str,
+        layer_name: str,
+        bbox: Optional[str] = None,
+        cql_filter: Optional[str] = None
+    )->str:
+        """
+        Download a layer as a ZIP file with optional spatial and attribute filtering.
+        
+        - This is achieved via a direct request to GeoServer,
+        as the geoserver-rest package does not currently support this functionality.
+        - Prefer the streaming download endpoint (geoserverapp.views.LayerDownloadApiView),
+          files written here are never evicted.
+
+        Returns:
+        - The file path of the downloaded ZIP archive located in the temporary directory.
+        """
+        response = self.open_wfs_stream(
+            workspace=workspace,
+            layer_name=layer_name,
+            output_format="SHAPE-ZIP",
+            bbox=bbox,
+            cql_filter=cql_filter,
+        )
         
         downloads_dir = os.path.join(settings.MEDIA_ROOT, "geoserverdownloads")
         os.makedirs(downloads_dir, exist_ok=True)
@@ -227,7 +379,7 @@ class GeoServerService:
         absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
 
         # Save the response content to the specified path
-        with open(absolute_path, 'wb') as f:
+        with response, open(absolute_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
 
@@ -286,7 +438,7 @@ class GeoServerService:
             url += "/styles"
 
         # POST (raw SLD)
-        post_response = requests.post(
+        post_response = self.session.post(
             url,
             params={"name": style_name, "raw": "true"},
             auth=(self.username, self.password),
@@ -304,7 +456,7 @@ class GeoServerService:
         else:
             style_url += f"/styles/{style_name}"
 
-        put_response = requests.put(
+        put_response = self.session.put(
             style_url,
             params={"raw": "true"},  # ✅ Critical fix
             auth=(self.username, self.password),
@@ -339,7 +491,7 @@ class GeoServerService:
         </layer>
         """.strip()
 
-        response = requests.put(
+        response = self.session.put(
             url,
             data=payload.encode('utf-8'),
             headers={"Content-Type": "application/xml"},
@@ -356,3 +508,129 @@ class GeoServerService:
                 "success": False,
                 "message": f"Failed to apply style: {response.status_code} - {response.text}"
             }
+
+    # ----------------------------- GeoWebCache -----------------------------
+
+    def _gwc_bounds(self, bbox: Tuple[float, float, float, float], gridset: str) -> Tuple[List[float], int]:
+        """GWC expects the bounds in the SRS of the gridset (bbox is EPSG:4326 lon/lat)"""
+        if gridset in ("EPSG:900913", "EPSG:3857"):
+            minx, miny = lonlat_to_web_mercator(bbox[0], bbox[1])
+            maxx, maxy = lonlat_to_web_mercator(bbox[2], bbox[3])
+            return [minx, miny, maxx, maxy], int(gridset.split(":")[1])
+        return list(bbox), 4326
+
+    def _gwc_seed_request(
+        self,
+        request_type: str,
+        workspace: str,
+        layer_name: str,
+        bbox: Optional[Tuple[float, float, float, float]],
+        zoom_start: int,
+        zoom_stop: int,
+        tile_format: str,
+        gridset: str,
+        thread_count: int,
+    ) -> Dict[str, Any]:
+        full_name = f"{workspace}:{layer_name}"
+        seed_request: Dict[str, Any] = {
+            "name": full_name,
+            "gridSetId": gridset,
+            "zoomStart": zoom_start,
+            "zoomStop": zoom_stop,
+            "format": tile_format,
+            "type": request_type,
+            "threadCount": thread_count,
+        }
+        if bbox is not None:
+            coords, srid = self._gwc_bounds(bbox, gridset)
+            seed_request["bounds"] = {"coords": {"double": coords}}
+            seed_request["srs"] = {"number": srid}
+
+        response = self.session.post(
+            f"{self.url}/gwc/rest/seed/{full_name}.json",
+            json={"seedRequest": seed_request},
+            auth=(self.username, self.password),
+        )
+        if response.status_code not in [200, 201]:
+            raise GeoserverException(
+                status=response.status_code,
+                message=f"Failed to {request_type} tile cache of {full_name}: {response.text}",
+            )
+        return {"success": True, "message": f"{request_type} of {full_name} started"}
+
+    def truncate_tile_cache(
+        self,
+        workspace: str,
+        layer_name: str,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        zoom_start: Optional[int] = None,
+        zoom_stop: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Drop cached tiles of a layer (every configured format), optionally only inside bbox
+        (EPSG:4326) and a zoom range. Without bbox the whole layer cache is truncated.
+        """
+        if bbox is None and zoom_start is None and zoom_stop is None:
+            response = self.session.post(
+                f"{self.url}/gwc/rest/masstruncate",
+                data=f"<truncateLayer><layerName>{workspace}:{layer_name}</layerName></truncateLayer>".encode("utf-8"),
+                headers={"Content-Type": "text/xml"},
+                auth=(self.username, self.password),
+            )
+            if response.status_code not in [200, 201]:
+                raise GeoserverException(
+                    status=response.status_code,
+                    message=f"Failed to truncate tile cache of {workspace}:{layer_name}: {response.text}",
+                )
+            return [{"success": True, "message": f"tile cache of {workspace}:{layer_name} truncated"}]
+
+        return [
+            self._gwc_seed_request(
+                request_type="truncate",
+                workspace=workspace,
+                layer_name=layer_name,
+                bbox=bbox,
+                zoom_start=settings.GEOSERVER["GWC_ZOOM_START"] if zoom_start is None else zoom_start,
+                zoom_stop=settings.GEOSERVER["GWC_ZOOM_STOP"] if zoom_stop is None else zoom_stop,
+                tile_format=tile_format,
+                gridset=settings.GEOSERVER["GWC_GRIDSET"],
+                thread_count=1,
+            )
+            for tile_format in settings.GEOSERVER["GWC_FORMATS"]
+        ]
+
+    def seed_tile_cache(
+        self,
+        workspace: str,
+        layer_name: str,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        zoom_start: int = 0,
+        zoom_stop: int = 12,
+        thread_count: int = 2,
+        reseed: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Ask GeoWebCache to (re)generate tiles of a layer inside bbox (EPSG:4326) for a zoom range"""
+        return [
+            self._gwc_seed_request(
+                request_type="reseed" if reseed else "seed",
+                workspace=workspace,
+                layer_name=layer_name,
+                bbox=bbox,
+                zoom_start=zoom_start,
+                zoom_stop=zoom_stop,
+                tile_format=tile_format,
+                gridset=settings.GEOSERVER["GWC_GRIDSET"],
+                thread_count=thread_count,
+            )
+            for tile_format in settings.GEOSERVER["GWC_FORMATS"]
+        ]
+
+    def tile_cache_tasks(self, workspace: str, layer_name: str) -> Dict[str, Any]:
+        """Running / pending seed and truncate tasks of a layer"""
+        response = self.session.get(
+            f"{self.url}/gwc/rest/seed/{workspace}:{layer_name}.json",
+            auth=(self.username, self.password),
+        )
+        if response.status_code != 200:
+            raise GeoserverException(status=response.status_code, message=response.text)
+        return response.json()
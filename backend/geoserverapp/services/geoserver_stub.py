@@ -0,0 +1,336 @@
+"""
+In-memory stand-in of the GeoServer REST / WFS / GWC endpoints used by GeoServerService.
+Meant for local benchmarks and manual testing only (no persistence, no auth check).
+
+    server = start_geoserver_stub(latency=0.05, error_rate=0.01)
+    service = GeoServerService(url=server.url, username="admin", password="admin")
+    ...
+    server.shutdown()
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+XML_NAME = re.compile(r"<name>\s*([^<\s]+)\s*</name>")
+WFS_EXCEPTION_REPORT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows/1.1" version="2.0.0">'
+    '<ows:Exception exceptionCode="InvalidParameterValue" locator="typeName">'
+    '<ows:ExceptionText>Feature type {} unknown</ows:ExceptionText>'
+    '</ows:Exception></ows:ExceptionReport>'
+)
+WFS_CONTENT_TYPES = {
+    "shape-zip": "application/zip",
+    "application/json": "application/json",
+    "csv": "text/csv",
+}
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class GeoServerStubState:
+    """Catalog of the stub (workspaces, stores, layers, styles), shared by all request threads"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.workspaces: Set[str] = set()
+        # (workspace, store)
+        self.stores: Set[Tuple[str, str]] = set()
+        # (workspace, layer) -> store
+        self.layers: Dict[Tuple[str, str], str] = {}
+        # (workspace | "", style) -> sld
+        self.styles: Dict[Tuple[str, str], bytes] = {}
+        # (workspace, layer) -> default style
+        self.layer_styles: Dict[Tuple[str, str], str] = {}
+        self.requests = 0
+
+
+class GeoServerStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        download_bytes: int = 1024 * 1024,
+    ) -> None:
+        super().__init__(address, GeoServerStubHandler)
+        self.state = GeoServerStubState()
+        # Every answer waits latency + uniform(0, jitter) seconds
+        self.latency = latency
+        self.jitter = jitter
+        # Share of requests answered with error_status instead of being handled
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Body size of a WFS GetFeature answer
+        self.download_bytes = download_bytes
+        self._random = random.Random()
+        self._random_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/geoserver"
+
+    def delay(self) -> float:
+        with self._random_lock:
+            return self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+
+class GeoServerStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes: without TCP_NODELAY delayed ACKs add ~40ms per answer
+    disable_nagle_algorithm = True
+    server: GeoServerStubServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Keep benchmark output readable
+        pass
+
+    # ----------------------------- helpers -----------------------------
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: Any = b"", content_type: str = "text/plain") -> None:
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+            content_type = "application/json"
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _handle(self) -> None:
+        body = self._body()
+        state = self.server.state
+        with state.lock:
+            state.requests += 1
+
+        delay = self.server.delay()
+        if delay:
+            time.sleep(delay)
+        if self.server.should_fail():
+            self._send(self.server.error_status, "Injected failure")
+            return
+
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        if path.startswith("/geoserver"):
+            path = path[len("/geoserver"):]
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if "x-www-form-urlencoded" in (self.headers.get("Content-Type") or ""):
+            # KVP request sent as a form (WFS POST)
+            query.update({key: values[-1] for key, values in parse_qs(body.decode("utf-8")).items()})
+        segments = [segment for segment in path.strip("/").split("/") if segment]
+
+        try:
+            if segments[:1] == ["rest"]:
+                self._rest(segments[1:], body)
+            elif segments == ["wfs"]:
+                self._wfs(query)
+            elif segments[:2] == ["gwc", "rest"]:
+                self._gwc(segments[2:])
+            else:
+                self._send(404, f"No such resource {path}")
+        except Exception as e:
+            self._send(500, f"Stub error: {e}")
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+    # ----------------------------- REST -----------------------------
+
+    def _rest(self, segments: list, body: bytes) -> None:
+        state = self.server.state
+        method = self.command
+        # drop .json / .xml suffix of the last segment
+        if segments:
+            segments[-1] = re.sub(r"\.(json|xml)$", "", segments[-1])
+
+        with state.lock:
+            if segments == ["workspaces"]:
+                if method == "POST":
+                    name = self._xml_name(body)
+                    if name in state.workspaces:
+                        return self._send(409, f"Workspace '{name}' already exists")
+                    state.workspaces.add(name)
+                    return self._send(201, name)
+                return self._send(200, {"workspaces": {"workspace": [{"name": ws} for ws in sorted(state.workspaces)]}})
+
+            if segments[:1] == ["styles"]:
+                return self._styles("", segments[1:], body)
+
+            if len(segments) < 2 or segments[0] not in ("workspaces", "layers"):
+                return self._send(404, "No such resource")
+
+            if segments[0] == "layers":
+                # PUT /rest/layers/{ws}:{layer} (apply style)
+                workspace, _, layer = segments[1].partition(":")
+                if (workspace, layer) not in state.layers:
+                    return self._send(404, f"No such layer: {segments[1]}")
+                if method == "PUT":
+                    state.layer_styles[(workspace, layer)] = self._xml_name(body)
+                    return self._send(200)
+                return self._send(200, self._layer_json(workspace, layer))
+
+            workspace = segments[1]
+            if workspace not in state.workspaces:
+                return self._send(404, f"No such workspace: '{workspace}' found")
+            rest = segments[2:]
+
+            if not rest:
+                if method == "DELETE":
+                    state.workspaces.discard(workspace)
+                    return self._send(200)
+                return self._send(200, {"workspace": {"name": workspace}})
+
+            if rest[0] == "styles":
+                return self._styles(workspace, rest[1:], body)
+
+            if rest[0] == "layers":
+                if len(rest) == 1:
+                    layers = [name for ws, name in state.layers if ws == workspace]
+                    return self._send(200, {"layers": {"layer": [{"name": name} for name in sorted(layers)]}})
+                layer = rest[1]
+                if (workspace, layer) not in state.layers:
+                    return self._send(404, f"No such layer: {workspace}:{layer}")
+                if method == "DELETE":
+                    del state.layers[(workspace, layer)]
+                    state.layer_styles.pop((workspace, layer), None)
+                    return self._send(200)
+                return self._send(200, self._layer_json(workspace, layer))
+
+            if rest[0] == "datastores":
+                if len(rest) == 1:
+                    if method == "POST":
+                        name = self._xml_name(body)
+                        if (workspace, name) in state.stores:
+                            return self._send(500, f"Store '{name}' already exists in workspace '{workspace}'")
+                        state.stores.add((workspace, name))
+                        return self._send(201, name)
+                    stores = [name for ws, name in state.stores if ws == workspace]
+                    return self._send(200, {"dataStores": {"dataStore": [{"name": name} for name in sorted(stores)]}})
+                store = rest[1]
+                if (workspace, store) not in state.stores:
+                    return self._send(404, f"No such datastore: {workspace},{store}")
+                if len(rest) == 2:
+                    return self._send(200, {"dataStore": {"name": store, "type": "PostGIS", "enabled": True}})
+                if rest[2] == "featuretypes" and method == "POST":
+                    name = self._xml_name(body)
+                    if (workspace, name) in state.layers:
+                        return self._send(500, f"Resource named '{name}' already exists in store: '{store}'")
+                    state.layers[(workspace, name)] = store
+                    return self._send(201)
+                return self._send(404, "No such resource")
+
+            return self._send(404, "No such resource")
+
+    def _styles(self, workspace: str, rest: list, body: bytes) -> None:
+        state = self.server.state
+        if not rest and self.command == "POST":
+            name = self._query_name()
+            state.styles[(workspace, name)] = body
+            return self._send(201, name)
+        if rest and (workspace, rest[0]) in state.styles:
+            if self.command == "PUT":
+                state.styles[(workspace, rest[0])] = body
+            return self._send(200, {"style": {"name": rest[0]}})
+        return self._send(404, "No such style")
+
+    def _layer_json(self, workspace: str, layer: str) -> Dict[str, Any]:
+        style = self.server.state.layer_styles.get((workspace, layer), "polygon")
+        return {
+            "layer": {
+                "name": layer,
+                "type": "VECTOR",
+                "defaultStyle": {"name": style},
+                "resource": {"@class": "featureType", "name": f"{workspace}:{layer}"},
+            }
+        }
+
+    def _query_name(self) -> str:
+        query = parse_qs(urlsplit(self.path).query)
+        return query.get("name", [""])[-1]
+
+    @staticmethod
+    def _xml_name(body: bytes) -> str:
+        match = XML_NAME.search(body.decode("utf-8", "replace"))
+        return match.group(1) if match else ""
+
+    # ----------------------------- WFS / GWC -----------------------------
+
+    def _wfs(self, query: Dict[str, str]) -> None:
+        type_name = query.get("typeNames") or query.get("typeName") or ""
+        workspace, _, layer = type_name.partition(":")
+        with self.server.state.lock:
+            known = (workspace, layer) in self.server.state.layers
+        if not known:
+            return self._send(200, WFS_EXCEPTION_REPORT.format(type_name), "application/xml")
+
+        output_format = query.get("outputFormat", "SHAPE-ZIP").lower()
+        content_type = WFS_CONTENT_TYPES.get(output_format, "application/octet-stream")
+        remaining = self.server.download_bytes
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(remaining))
+        self.end_headers()
+        chunk = b"\0" * STREAM_CHUNK_SIZE
+        while remaining > 0:
+            size = min(remaining, STREAM_CHUNK_SIZE)
+            self.wfile.write(chunk[:size])
+            remaining -= size
+
+    def _gwc(self, segments: list) -> None:
+        if segments == ["masstruncate"] and self.command == "POST":
+            return self._send(200)
+        if segments[:1] == ["seed"] and len(segments) == 2:
+            if self.command == "POST":
+                return self._send(200)
+            return self._send(200, {"long-array-array": []})
+        return self._send(404, "No such resource")
+
+
+def start_geoserver_stub(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    download_bytes: int = 1024 * 1024,
+    workspace: Optional[str] = None,
+    store_name: Optional[str] = None,
+) -> GeoServerStubServer:
+    """Start the stub in a daemon thread (port 0 -> any free port, see server.url)"""
+    server = GeoServerStubServer(
+        (host, port),
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        error_status=error_status,
+        download_bytes=download_bytes,
+    )
+    if workspace:
+        server.state.workspaces.add(workspace)
+        if store_name:
+            server.state.stores.add((workspace, store_name))
+    threading.Thread(target=server.serve_forever, name="geoserver-stub", daemon=True).start()
+    return server
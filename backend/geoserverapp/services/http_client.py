@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from geo.Geoserver import Geoserver
+
+# Only idempotent calls are retried: a retried POST could create a layer/style twice
+RETRY_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+RETRY_STATUSES = (502, 503, 504)
+
+# Latency samples kept per (method, path) in this process
+LATENCY_SAMPLES = 500
+SLOW_CALL_SECONDS = 5.0
+
+
+def _option(name: str, default: Any) -> Any:
+    return settings.GEOSERVER.get(name, default)
+
+
+def geoserver_timeout() -> Tuple[float, float]:
+    """(connect, read) timeout of every GeoServer call"""
+    return (float(_option("CONNECT_TIMEOUT", 3.05)), float(_option("READ_TIMEOUT", 30)))
+
+
+class GeoServerLatencyRecorder:
+    """
+    Per call latency of GeoServer requests (in-process, bounded).
+    Keyed by (method, path) where the path has the query string removed.
+    """
+
+    def __init__(self, max_samples: int = LATENCY_SAMPLES) -> None:
+        self.max_samples = max_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method: str, url: str) -> Tuple[str, str]:
+        return method.upper(), urlsplit(url).path
+
+    def record(self, method: str, url: str, seconds: float, failed: bool = False) -> None:
+        key = self._key(method, url)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.max_samples)
+                self._samples[key] = samples
+            samples.append(seconds)
+            if failed:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+        if seconds >= SLOW_CALL_SECONDS:
+            print(f"Slow GeoServer call {key[0]} {key[1]}: {seconds:.2f}s")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """count / errors / avg / p50 / p95 / max (milliseconds) per call"""
+        with self._lock:
+            snapshot = {key: sorted(samples) for key, samples in self._samples.items()}
+            errors = dict(self._errors)
+
+        result = {}
+        for (method, path), samples in snapshot.items():
+            count = len(samples)
+            result[f"{method} {path}"] = {
+                "count": count,
+                "errors": errors.get((method, path), 0),
+                "avg_ms": round(sum(samples) / count * 1000, 2),
+                "p50_ms": round(samples[int(count * 0.50)] * 1000, 2),
+                "p95_ms": round(samples[min(count - 1, int(count * 0.95))] * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._errors.clear()
+
+
+latency_recorder = GeoServerLatencyRecorder()
+
+
+class GeoServerSession(requests.Session):
+    """requests.Session with a default (connect, read) timeout and per call latency recording"""
+
+    def __init__(self, timeout: Tuple[float, float]) -> None:
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = super().request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            latency_recorder.record(method, url, time.perf_counter() - started, failed=failed)
+
+
+def build_geoserver_session() -> GeoServerSession:
+    """Keep-alive connection pool + bounded retries with exponential backoff"""
+    retry = Retry(
+        total=int(_option("MAX_RETRIES", 3)),
+        connect=int(_option("MAX_RETRIES", 3)),
+        backoff_factor=float(_option("RETRY_BACKOFF", 0.3)),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+    )
+    pool_size = int(_option("POOL_MAXSIZE", 20))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+    session = GeoServerSession(timeout=geoserver_timeout())
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session: Optional[GeoServerSession] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_geoserver_session() -> GeoServerSession:
+    """
+    One pooled session per process (shared by all threads / GeoServerService instances).
+    Re-created after a fork so workers never share sockets with their parent.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = build_geoserver_session()
+                _session_pid = pid
+    return _session
+
+
+class PooledGeoserver(Geoserver):
+    """geo.Geoserver client that sends every REST call through the pooled session"""
+
+    def __init__(self, *args, session: Optional[requests.Session] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.session = session or get_geoserver_session()
+
+    def _requests(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session.request(
+            method.upper(),
+            url,
+            auth=(self.username, self.password),
+            **kwargs,
+            **self.request_options,
+        )
@@ -0,0 +1,45 @@
+import uuid
+from typing import Iterable, List, Optional, Tuple
+from django.core.cache import cache
+
+from common.services.commit_services import OnCommitCollector
+
+# (workspace, layer name)
+LayerRef = Tuple[str, str]
+
+
+def layer_version_key(workspace: str, layer: str) -> str:
+    return f"geoserver_layer_version:{workspace}:{layer}"
+
+
+def get_layer_version(workspace: str, layer: str) -> Optional[str]:
+    """
+    Opaque token that changes whenever the data of a layer changes.
+    A missing token (first use, Redis flush) is replaced by a fresh random one, so anything keyed
+    by the old token is never reused. None when the cache backend is unreachable.
+    """
+    key = layer_version_key(workspace, layer)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_layer_versions(layers: Iterable[LayerRef]) -> None:
+    cache.set_many(
+        {layer_version_key(workspace, layer): uuid.uuid4().hex for workspace, layer in set(layers)},
+        timeout=None,
+    )
+
+
+def _bump_collected(items: List[LayerRef]) -> None:
+    bump_layer_versions(items)
+
+
+layer_version_collector = OnCommitCollector(handler=_bump_collected, name="layer_version")
+
+
+def bump_layer_version_on_commit(workspace: str, layer: str) -> None:
+    """Bump once after the current transaction commits (coalesced for bulk writes)"""
+    layer_version_collector.add((workspace, layer))
@@ -0,0 +1,304 @@
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from geo.Geoserver import GeoserverException
+
+from geoserverapp.models import GeoServerOutbox
+from geoserverapp.services.geoserver_service import GeoServerService
+from common.services.commit_services import union_extents
+
+# row id -> error message (None on success)
+OutboxResult = Dict[int, Optional[str]]
+OutboxHandler = Callable[[GeoServerService, List[GeoServerOutbox]], OutboxResult]
+
+OUTBOX_BATCH_SIZE = 50
+# Pending truncates of a layer in the batch claimed along with it (merged into one request)
+TRUNCATE_COALESCE_LIMIT = 5000
+# Retry delay: RETRY_BASE_SECONDS * 2^(attempts-1), capped
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 10 * 60
+
+
+def _max_attempts() -> int:
+    return settings.GEOSERVER.get("OUTBOX_MAX_ATTEMPTS", 8)
+
+
+# ----------------------------- Enqueue (inside the caller's transaction) -----------------------------
+
+def enqueue_geoserver_operation(operation: str, **payload) -> GeoServerOutbox:
+    """
+    Queue a GeoServer side effect. Call it inside the transaction of the data it belongs to:
+    the operation exists if and only if that data was committed.
+    """
+    return GeoServerOutbox.objects.create(operation=operation, payload=payload)
+
+
+def enqueue_publish_layers(
+    pg_tables: List[str],
+    workspace: Optional[str] = None,
+    store_name: Optional[str] = None,
+) -> List[GeoServerOutbox]:
+    workspace = workspace or settings.GEOSERVER['DEFAULT_WORKSPACE']
+    store_name = store_name or settings.GEOSERVER['DEFAULT_STORE']
+    return GeoServerOutbox.objects.bulk_create([
+        GeoServerOutbox(
+            operation=GeoServerOutbox.Operation.PUBLISH_LAYER,
+            payload={"workspace": workspace, "store_name": store_name, "pg_table": pg_table},
+        )
+        for pg_table in pg_tables
+    ])
+
+
+def enqueue_delete_layer(layername: str, workspace: Optional[str] = None) -> GeoServerOutbox:
+    return enqueue_geoserver_operation(
+        GeoServerOutbox.Operation.DELETE_LAYER,
+        workspace=workspace or settings.GEOSERVER['DEFAULT_WORKSPACE'],
+        layername=layername,
+    )
+
+
+def enqueue_apply_style(layer_name: str, style_name: str, workspace: Optional[str] = None) -> GeoServerOutbox:
+    return enqueue_geoserver_operation(
+        GeoServerOutbox.Operation.APPLY_STYLE,
+        workspace=workspace or settings.GEOSERVER['DEFAULT_WORKSPACE'],
+        layer_name=layer_name,
+        style_name=style_name,
+    )
+
+
+# ----------------------------- Handlers (batched per operation) -----------------------------
+
+def _layer_exists(service: GeoServerService, workspace: str, layername: str) -> bool:
+    try:
+        service.get_a_layer_from_geoserver(layername=layername, workspace=workspace)
+        return True
+    except Exception:
+        return False
+
+
+def handle_publish_layer(service: GeoServerService, rows: List[GeoServerOutbox]) -> OutboxResult:
+    """One publish_layers() call (one store check, concurrent publishes) per (workspace, store)"""
+    results: OutboxResult = {}
+    groups: Dict[tuple, List[GeoServerOutbox]] = defaultdict(list)
+    for row in rows:
+        groups[(row.payload["workspace"], row.payload["store_name"])].append(row)
+
+    for (workspace, store_name), group_rows in groups.items():
+        publish_results = service.publish_layers(
+            workspace=workspace,
+            store_name=store_name,
+            pg_tables=[row.payload["pg_table"] for row in group_rows],
+        )
+        for row, pub_res in zip(group_rows, publish_results):
+            if pub_res.get("status") == 201:
+                results[row.id] = None
+            elif _layer_exists(service, workspace, row.payload["pg_table"]):
+                # Published by an earlier attempt whose answer was lost
+                results[row.id] = None
+            else:
+                results[row.id] = f"{pub_res.get('status')}: {pub_res.get('detail')}"
+    return results
+
+
+def handle_delete_layer(service: GeoServerService, rows: List[GeoServerOutbox]) -> OutboxResult:
+    results: OutboxResult = {}
+    for row in rows:
+        try:
+            service.delete_a_layer_from_geoserver(
+                layername=row.payload["layername"],
+                workspace=row.payload["workspace"],
+            )
+            results[row.id] = None
+        except GeoserverException as e:
+            # Already gone -> nothing left to do
+            results[row.id] = None if e.status == 404 else f"{e.status}: {e.message}"
+    return results
+
+
+def handle_apply_style(service: GeoServerService, rows: List[GeoServerOutbox]) -> OutboxResult:
+    results: OutboxResult = {}
+    for row in rows:
+        res = service.apply_sld_to_layer(
+            workspace=row.payload["workspace"],
+            layer_name=row.payload["layer_name"],
+            style_name=row.payload["style_name"],
+        )
+        results[row.id] = None if res.get("success") else res.get("message")
+    return results
+
+
+def handle_truncate_tiles(service: GeoServerService, rows: List[GeoServerOutbox]) -> OutboxResult:
+    """
+    Rows of the same layer are merged into one truncate of their union bbox
+    (a row without bbox truncates the whole layer)
+    """
+    results: OutboxResult = {}
+    groups: Dict[tuple, List[GeoServerOutbox]] = defaultdict(list)
+    for row in rows:
+        groups[(row.payload["workspace"], row.payload["layer"])].append(row)
+
+    for (workspace, layer), group_rows in groups.items():
+        bboxes = [tuple(row.payload["bbox"]) for row in group_rows if row.payload.get("bbox")]
+        whole_layer = len(bboxes) < len(group_rows)
+        try:
+            service.truncate_tile_cache(
+                workspace=workspace,
+                layer_name=layer,
+                bbox=None if whole_layer else union_extents(bboxes),
+            )
+            error = None
+        except GeoserverException as e:
+            # Layer is not cached (or not published yet) -> no stale tiles
+            error = None if e.status == 404 else f"{e.status}: {e.message}"
+        results.update({row.id: error for row in group_rows})
+    return results
+
+
+OPERATION_HANDLERS: Dict[str, OutboxHandler] = {
+    GeoServerOutbox.Operation.PUBLISH_LAYER: handle_publish_layer,
+    GeoServerOutbox.Operation.DELETE_LAYER: handle_delete_layer,
+    GeoServerOutbox.Operation.APPLY_STYLE: handle_apply_style,
+    GeoServerOutbox.Operation.TRUNCATE_TILES: handle_truncate_tiles,
+}
+
+
+# ----------------------------- Dispatcher -----------------------------
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def _lease_seconds() -> int:
+    return settings.GEOSERVER.get("OUTBOX_LEASE_SECONDS", 300)
+
+
+def _claim_layer_truncates(rows: List[GeoServerOutbox], now) -> List[GeoServerOutbox]:
+    """Every committed transaction queues its own truncate row: take the other due ones of the same layers too"""
+    layers = {
+        (row.payload["workspace"], row.payload["layer"])
+        for row in rows if row.operation == GeoServerOutbox.Operation.TRUNCATE_TILES
+    }
+    if not layers:
+        return []
+    same_layer = Q()
+    for workspace, layer in layers:
+        same_layer |= Q(payload__workspace=workspace, payload__layer=layer)
+    return list(
+        GeoServerOutbox.objects.select_for_update(skip_locked=True).filter(
+            same_layer,
+            operation=GeoServerOutbox.Operation.TRUNCATE_TILES,
+            status=GeoServerOutbox.Status.PENDING,
+            next_attempt_at__lte=now,
+        ).exclude(id__in=[row.id for row in rows]).order_by('id')[:TRUNCATE_COALESCE_LIMIT]
+    )
+
+
+def claim_outbox_rows(batch_size: int = OUTBOX_BATCH_SIZE) -> List[GeoServerOutbox]:
+    """
+    Claim up to batch_size due rows in a short transaction and return them.
+
+    - SELECT ... FOR UPDATE SKIP LOCKED: several dispatchers never claim the same row
+    - A truncate in the batch brings the other due truncates of its layer (one merged request)
+    - The claim is a lease: next_attempt_at is pushed OUTBOX_LEASE_SECONDS ahead and the attempt
+      is counted, so rows of a dispatcher that died mid-batch become due again after the lease
+      (and a row that keeps killing dispatchers still ends up failed)
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=_lease_seconds())
+    with transaction.atomic():
+        rows = list(
+            GeoServerOutbox.objects.select_for_update(skip_locked=True).filter(
+                status=GeoServerOutbox.Status.PENDING,
+                next_attempt_at__lte=now,
+            ).order_by('id')[:batch_size]
+        )
+        rows += _claim_layer_truncates(rows, now)
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = lease_until
+        GeoServerOutbox.objects.bulk_update(rows, ['attempts', 'next_attempt_at'])
+    return rows
+
+
+def run_outbox_handlers(rows: List[GeoServerOutbox]) -> OutboxResult:
+    """Hand the rows to their operation handlers (grouped per operation, first come first served)"""
+    service = GeoServerService()
+    by_operation: Dict[str, List[GeoServerOutbox]] = defaultdict(list)
+    for row in rows:
+        by_operation[row.operation].append(row)
+
+    results: OutboxResult = {}
+    for operation, op_rows in by_operation.items():
+        handler = OPERATION_HANDLERS.get(operation)
+        if handler is None:
+            results.update({row.id: f"Unknown operation {operation}" for row in op_rows})
+            continue
+        try:
+            results.update(handler(service, op_rows))
+        except Exception as e:
+            results.update({row.id: str(e) for row in op_rows})
+    return results
+
+
+def record_outbox_results(rows: List[GeoServerOutbox], results: OutboxResult) -> None:
+    """
+    Store the outcome of claimed rows in a short transaction.
+    Rows whose lease expired and were claimed again by another dispatcher are left to it.
+    """
+    finished_at = timezone.now()
+    with transaction.atomic():
+        owned = set(
+            GeoServerOutbox.objects.select_for_update().filter(
+                id__in=[row.id for row in rows],
+                status=GeoServerOutbox.Status.PENDING,
+            ).values_list('id', 'attempts')
+        )
+        # A re-claimed row has counted one more attempt
+        rows = [row for row in rows if (row.id, row.attempts) in owned]
+        for row in rows:
+            error = results.get(row.id, "No result")
+            if error is None:
+                row.status = GeoServerOutbox.Status.DONE
+                row.processed_at = finished_at
+                row.last_error = ""
+            else:
+                row.last_error = error[:2000]
+                if row.attempts >= _max_attempts():
+                    row.status = GeoServerOutbox.Status.FAILED
+                    row.processed_at = finished_at
+                    print(f"GeoServer outbox #{row.id} {row.operation} failed: {error}")
+                else:
+                    row.next_attempt_at = finished_at + retry_delay(row.attempts)
+
+        GeoServerOutbox.objects.bulk_update(
+            rows, ['status', 'next_attempt_at', 'last_error', 'processed_at']
+        )
+
+
+def dispatch_outbox_batch(batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Process one batch of due operations. Returns the number of rows handled.
+
+    - Rows are claimed (leased) in one short transaction, GeoServer is called outside of any
+      transaction and the results are stored in a second short one: no row lock or open
+      transaction is held while waiting on GeoServer
+    - A failed row is retried with exponential backoff, and marked failed after OUTBOX_MAX_ATTEMPTS
+    """
+    rows = claim_outbox_rows(batch_size)
+    if not rows:
+        return 0
+    record_outbox_results(rows, run_outbox_handlers(rows))
+    return len(rows)
+
+
+def purge_outbox(older_than_days: int) -> int:
+    """Delete done rows older than the given number of days"""
+    deleted, _ = GeoServerOutbox.objects.filter(
+        status=GeoServerOutbox.Status.DONE,
+        processed_at__lt=timezone.now() - timedelta(days=older_than_days),
+    ).delete()
+    return deleted
@@ -0,0 +1,58 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.gis.geos import GEOSGeometry
+
+from common.services.commit_services import Extent, OnCommitCollector, union_extents
+from geoserverapp.models import GeoServerOutbox
+
+
+def geometry_extent(geometry: Optional[GEOSGeometry]) -> Optional[Extent]:
+    """EPSG:4326 extent of a geometry (None for an empty / missing geometry)"""
+    if geometry is None or geometry.empty:
+        return None
+    if geometry.srid and geometry.srid != 4326:
+        geometry = geometry.transform(4326, clone=True)
+    return geometry.extent
+
+
+def enqueue_truncate_tiles(workspace: str, layer: str, extent: Optional[Extent]) -> GeoServerOutbox:
+    """Queue a GeoWebCache truncate of a layer (whole layer when extent is None)"""
+    return GeoServerOutbox.objects.create(
+        operation=GeoServerOutbox.Operation.TRUNCATE_TILES,
+        payload={"workspace": workspace, "layer": layer, "bbox": list(extent) if extent else None},
+    )
+
+
+def _enqueue_collected_truncates(items: List[Tuple[str, str, Extent]]) -> None:
+    extents: Dict[Tuple[str, str], List[Extent]] = defaultdict(list)
+    for workspace, layer, extent in items:
+        extents[(workspace, layer)].append(extent)
+    GeoServerOutbox.objects.bulk_create([
+        GeoServerOutbox(
+            operation=GeoServerOutbox.Operation.TRUNCATE_TILES,
+            payload={"workspace": workspace, "layer": layer, "bbox": list(union_extents(layer_extents))},
+        )
+        for (workspace, layer), layer_extents in extents.items()
+    ])
+
+
+tile_truncate_collector = OnCommitCollector(handler=_enqueue_collected_truncates, name="tile_truncate")
+
+
+def truncate_tiles_for_geometries(
+    layer: str,
+    geometries: List[Optional[GEOSGeometry]],
+    workspace: Optional[str] = None,
+) -> None:
+    """
+    The area of `geometries` changed in `layer`: truncate its GeoWebCache tiles.
+    Coalesced per transaction: one outbox row per layer with the union bbox of the transaction
+    is queued after commit (a 100k row import -> one truncate row per layer).
+    """
+    if not settings.GEOSERVER["GWC_TRUNCATE_ON_CHANGE"]:
+        return
+    workspace = workspace or settings.GEOSERVER['DEFAULT_WORKSPACE']
+    for extent in map(geometry_extent, geometries):
+        if extent is not None:
+            tile_truncate_collector.add((workspace, layer, extent))
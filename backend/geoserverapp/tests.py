@@ -0,0 +1,251 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from geoserverapp.models import GeoServerOutbox
+from geoserverapp.services import outbox_service
+from geoserverapp.services.download_access import (
+    EXCLUDE_ALL,
+    download_filter,
+    downloadable_layer,
+    layer_download_cache_key,
+)
+from geoserverapp.services.tile_cache_service import enqueue_truncate_tiles
+from landreg.models.cadaster import Cadaster
+from landreg.models.pelak import Pelak
+from landreg.services.access_service import AccessSnapshot
+
+LOCMEM_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DownloadAccessTests(SimpleTestCase):
+    """Test cases for the download allow-list and access filters"""
+
+    def setUp(self):
+        cache.clear()
+        self.cadaster_layer = downloadable_layer(Cadaster._meta.db_table)
+        self.pelak_layer = downloadable_layer(Pelak._meta.db_table)
+
+    def test_only_tile_layers_are_downloadable(self):
+        """Upload tables and unknown layers are not downloadable"""
+        self.assertIsNotNone(self.cadaster_layer)
+        self.assertIsNone(downloadable_layer("landreg_oldcadasterdata"))
+        self.assertIsNone(downloadable_layer("olddata_upload_1"))
+
+    def test_personal_columns_not_exposed(self):
+        """The cadaster download keeps the tile columns only"""
+        self.assertNotIn('national_code', self.cadaster_layer['columns'])
+
+    def test_full_access_is_not_filtered(self):
+        access = AccessSnapshot(pelak_numbers=None, province_ids=[])
+        self.assertIsNone(download_filter(self.cadaster_layer, access, None))
+
+    def test_pelak_layer_filtered_to_grants(self):
+        """Granted pelaks (quotes escaped) OR company provinces"""
+        access = AccessSnapshot(pelak_numbers=["12", "3'4"], province_ids=[7])
+        self.assertEqual(
+            download_filter(self.pelak_layer, access, None),
+            "(number IN ('12', '3''4') OR provinces_id IN (7))",
+        )
+
+    def test_no_grant_downloads_nothing(self):
+        """A user without grants gets an empty download, even with a bbox"""
+        access = AccessSnapshot(pelak_numbers=[], province_ids=[])
+        self.assertEqual(download_filter(self.pelak_layer, access, "50,30,51,31"), EXCLUDE_ALL)
+
+    def test_area_layer_intersects_access_area(self):
+        """Cadasters are restricted to the access area, AND the bbox"""
+        access = AccessSnapshot(pelak_numbers=["12"], province_ids=[])
+        with mock.patch.object(AccessSnapshot, 'area_wkt', return_value="POLYGON((50 30,51 30,51 31,50 30))"):
+            cql = download_filter(self.cadaster_layer, access, "50,30,51,31,EPSG:4326")
+        self.assertEqual(
+            cql,
+            "(INTERSECTS(border, POLYGON((50 30,51 30,51 31,50 30)))) "
+            "AND (BBOX(border, 50.0, 30.0, 51.0, 31.0, 'EPSG:4326'))",
+        )
+
+    def test_empty_access_area_downloads_nothing(self):
+        access = AccessSnapshot(pelak_numbers=["12"], province_ids=[])
+        with mock.patch.object(AccessSnapshot, 'area_wkt', return_value=None):
+            self.assertEqual(download_filter(self.cadaster_layer, access, None), EXCLUDE_ALL)
+
+    def test_cache_key_depends_on_access_scope(self):
+        """Users with other grants never share a cached file"""
+        keys = {
+            layer_download_cache_key("ws", "landreg_pelak", "geojson", None, access, "v1")
+            for access in (
+                AccessSnapshot(pelak_numbers=None, province_ids=[]),
+                AccessSnapshot(pelak_numbers=["12"], province_ids=[]),
+                AccessSnapshot(pelak_numbers=["13"], province_ids=[]),
+            )
+        }
+        self.assertEqual(len(keys), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LayerDownloadApiTests(APITestCase):
+    """Test cases for the layer download endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='downloaduser', password='testpass123')
+        self.client.force_authenticate(self.user)
+        permission = mock.patch('accounts.permissions.HasDynamicPermission.has_permission', return_value=True)
+        permission.start()
+        self.addCleanup(permission.stop)
+
+    def test_unauthorized_layer(self):
+        """Layers outside the allow-list are refused before GeoServer is called"""
+        with mock.patch('geoserverapp.views.GeoServerService') as geoserver_service:
+            response = self.client.get('/api/geoserver/download/landreg_oldcadasterdata/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        geoserver_service.assert_not_called()
+
+    def test_out_of_scope_user_gets_excluded_filter(self):
+        """A user without grants sends an EXCLUDE filter and the exposed columns only"""
+        with mock.patch('geoserverapp.views.get_layer_version', return_value=None), \
+                mock.patch('geoserverapp.views.GeoServerService') as geoserver_service:
+            geoserver_service.return_value.open_wfs_stream.return_value.iter_content.return_value = [b"{}"]
+            response = self.client.get(f'/api/geoserver/download/{Pelak._meta.db_table}/', {'format': 'geojson'})
+            b"".join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        kwargs = geoserver_service.return_value.open_wfs_stream.call_args.kwargs
+        self.assertEqual(kwargs['cql_filter'], EXCLUDE_ALL)
+        self.assertIn('number', kwargs['property_names'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class OutboxDispatcherTests(TestCase):
+    """Test cases for claiming, retrying and failing outbox rows"""
+
+    def setUp(self):
+        self.row = outbox_service.enqueue_delete_layer("layer_1", workspace="ws")
+        service = mock.patch('geoserverapp.services.outbox_service.GeoServerService')
+        service.start()
+        self.addCleanup(service.stop)
+
+    def _dispatch(self, error=None):
+        handler = mock.Mock(side_effect=lambda service, rows: {row.id: error for row in rows})
+        with mock.patch.dict(outbox_service.OPERATION_HANDLERS, {GeoServerOutbox.Operation.DELETE_LAYER: handler}):
+            handled = outbox_service.dispatch_outbox_batch()
+        self.row.refresh_from_db()
+        return handled, handler
+
+    def test_claim_leases_rows(self):
+        """A claimed row counts the attempt and is not due again until its lease ends"""
+        rows = outbox_service.claim_outbox_rows()
+        self.assertEqual([row.id for row in rows], [self.row.id])
+        self.row.refresh_from_db()
+        self.assertEqual(self.row.attempts, 1)
+        self.assertGreater(self.row.next_attempt_at, timezone.now() + timedelta(seconds=60))
+        self.assertEqual(outbox_service.claim_outbox_rows(), [])
+
+    def test_success_marks_done(self):
+        handled, handler = self._dispatch()
+        self.assertEqual(handled, 1)
+        handler.assert_called_once()
+        self.assertEqual(self.row.status, GeoServerOutbox.Status.DONE)
+        self.assertIsNotNone(self.row.processed_at)
+
+    def test_failure_is_retried_with_backoff(self):
+        """A failed row stays pending, due again after the retry delay"""
+        before = timezone.now()
+        self._dispatch(error="503: unavailable")
+        self.assertEqual(self.row.status, GeoServerOutbox.Status.PENDING)
+        self.assertEqual(self.row.attempts, 1)
+        self.assertEqual(self.row.last_error, "503: unavailable")
+        self.assertGreaterEqual(self.row.next_attempt_at, before + outbox_service.retry_delay(1))
+        # Not due yet
+        self.assertEqual(outbox_service.dispatch_outbox_batch(), 0)
+
+        GeoServerOutbox.objects.filter(id=self.row.id).update(next_attempt_at=timezone.now())
+        self._dispatch()
+        self.assertEqual(self.row.status, GeoServerOutbox.Status.DONE)
+        self.assertEqual(self.row.attempts, 2)
+        self.assertEqual(self.row.last_error, "")
+
+    @override_settings(GEOSERVER={'OUTBOX_MAX_ATTEMPTS': 2})
+    def test_max_attempts_marks_failed(self):
+        GeoServerOutbox.objects.filter(id=self.row.id).update(attempts=1)
+        self._dispatch(error="500: boom")
+        self.assertEqual(self.row.status, GeoServerOutbox.Status.FAILED)
+        self.assertEqual(self.row.attempts, 2)
+        self.assertIsNotNone(self.row.processed_at)
+
+    def test_expired_lease_result_is_dropped(self):
+        """A row claimed again by another dispatcher keeps that dispatcher's state"""
+        rows = outbox_service.claim_outbox_rows()
+        GeoServerOutbox.objects.filter(id=self.row.id).update(next_attempt_at=timezone.now())
+        outbox_service.claim_outbox_rows()
+        outbox_service.record_outbox_results(rows, {self.row.id: None})
+        self.row.refresh_from_db()
+        self.assertEqual(self.row.status, GeoServerOutbox.Status.PENDING)
+        self.assertEqual(self.row.attempts, 2)
+
+
+def _square(minx, miny, size):
+    return MultiPolygon(Polygon.from_bbox((minx, miny, minx + size, miny + size)), srid=4326)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TileTruncateOutboxTests(TestCase):
+    """Test cases for the GeoWebCache truncates queued by cadaster writes"""
+
+    def _truncates(self):
+        return GeoServerOutbox.objects.filter(operation=GeoServerOutbox.Operation.TRUNCATE_TILES).order_by('id')
+
+    def test_one_truncate_per_layer_per_transaction(self):
+        """A bulk write queues one row with the union bbox of the transaction, after commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                Cadaster.objects.create(jaam_code=str(i), border=_square(51 + i, 31, 0.01))
+            self.assertFalse(self._truncates().exists())
+        self.assertEqual(self._truncates().count(), 1)
+        truncate = self._truncates().get()
+        self.assertEqual(truncate.payload['layer'], Cadaster._meta.db_table)
+        xmin, ymin, xmax, ymax = truncate.payload['bbox']
+        self.assertAlmostEqual(xmin, 51)
+        self.assertAlmostEqual(ymin, 31)
+        self.assertAlmostEqual(xmax, 53.01)
+        self.assertAlmostEqual(ymax, 31.01)
+
+    def test_moved_border_truncates_old_place(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cadaster = Cadaster.objects.create(jaam_code='1', border=_square(51, 31, 0.01))
+        with self.captureOnCommitCallbacks(execute=True):
+            cadaster.border = _square(52, 32, 0.01)
+            cadaster.save()
+        xmin, ymin, xmax, ymax = self._truncates().last().payload['bbox']
+        self.assertAlmostEqual(xmin, 51)
+        self.assertAlmostEqual(ymin, 31)
+        self.assertAlmostEqual(xmax, 52.01)
+        self.assertAlmostEqual(ymax, 32.01)
+
+    def test_dispatcher_merges_layer_truncates(self):
+        """A batch of one truncate takes every due truncate of its layer, one request per layer"""
+        enqueue_truncate_tiles("ws", "layer_a", (0, 0, 1, 1))
+        enqueue_truncate_tiles("ws", "layer_b", (0, 0, 1, 1))
+        enqueue_truncate_tiles("ws", "layer_a", (2, 2, 3, 3))
+
+        rows = outbox_service.claim_outbox_rows(batch_size=1)
+        self.assertEqual(sorted(row.payload['layer'] for row in rows), ["layer_a", "layer_a"])
+
+        service = mock.Mock()
+        results = outbox_service.handle_truncate_tiles(service, rows)
+        service.truncate_tile_cache.assert_called_once_with(workspace="ws", layer_name="layer_a", bbox=(0, 0, 3, 3))
+        self.assertEqual(set(results.values()), {None})
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from geoserverapp.views import (
+    LayerDownloadApiView,
+)
+
+
+urlpatterns = [
+    path('download/<str:layername>/', LayerDownloadApiView.as_view(), name="geoserver-layer-download"),
+]
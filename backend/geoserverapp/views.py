@@ -0,0 +1,152 @@
+from typing import Iterator, Optional
+import requests
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework import serializers
+from rest_framework import status
+from geo.Geoserver import GeoserverException
+
+from geoserverapp.services.geoserver_service import GeoServerService
+from geoserverapp.services.layer_version import get_layer_version
+from geoserverapp.services.download_access import (
+    download_filter,
+    download_property_names,
+    downloadable_layer,
+    layer_download_cache_key,
+)
+from geoserverapp.services.download_cache import (
+    CacheWriter,
+    get_download_cache,
+)
+from landreg.services.access_service import AccessSnapshot
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# format -> (WFS outputFormat, content type, file extension)
+DOWNLOAD_FORMATS = {
+    "shapezip": ("SHAPE-ZIP", "application/zip", "zip"),
+    "geojson": ("application/json", "application/geo+json", "geojson"),
+    "csv": ("csv", "text/csv", "csv"),
+    "gml": ("application/gml+xml; version=3.2", "application/gml+xml", "gml"),
+}
+
+
+def _stream_and_cache(
+    upstream: requests.Response,
+    writer: Optional[CacheWriter],
+) -> Iterator[bytes]:
+    """Pipe GeoServer chunks to the client, teeing them into the cache (kept only if complete)"""
+    completed = False
+    try:
+        for chunk in upstream.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if writer is not None:
+                writer.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        upstream.close()
+        if writer is not None:
+            if completed:
+                writer.commit()
+            else:
+                writer.abort()
+
+
+class LayerDownloadApiView(APIView):
+    #permission is dynamic
+    """
+        - Download a layer of the default workspace through GeoServer WFS
+        - Only the vector tile layers (cadaster, flag, pelak, province) with their exposed columns,
+          restricted to what the user may see (access snapshot, sent as a CQL filter built here)
+        - ?format=shapezip (default) | geojson | csv | gml, optional bbox
+        - The GeoServer response is piped to the client as it arrives (nothing buffered in memory / MEDIA_ROOT)
+        - Completed downloads are kept in a size bounded LRU disk cache keyed by
+          (layer, format, bbox, access scope, layer version) -> repeated exports are served from disk
+    """
+
+    class LayerDownloadInputSerializer(serializers.Serializer):
+        format = serializers.ChoiceField(choices=list(DOWNLOAD_FORMATS.keys()), default="shapezip")
+        bbox = serializers.RegexField(
+            regex=r"^-?\d+(\.\d+)?(,-?\d+(\.\d+)?){3}(,[A-Za-z0-9:._-]+)?$",
+            required=False,
+            allow_blank=True,
+        )
+
+    def get(self, request: Request, layername: str):
+        layer_config = downloadable_layer(layername)
+        if layer_config is None:
+            return Response(
+                {"detail": "دانلود این لایه مجاز نیست"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        input_serializer = self.LayerDownloadInputSerializer(data=request.query_params)
+        if not input_serializer.is_valid():
+            return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = input_serializer.validated_data
+        workspace = settings.GEOSERVER['DEFAULT_WORKSPACE']
+        output_format, content_type, extension = DOWNLOAD_FORMATS[data["format"]]
+        filename = f"{layername}.{extension}"
+        bbox = data.get("bbox") or None
+
+        try:
+            access = AccessSnapshot.for_user(request.user)
+            download_cache = get_download_cache()
+            version = get_layer_version(workspace, layername)
+            cache_key = None
+            if version is not None:
+                cache_key = layer_download_cache_key(
+                    workspace=workspace,
+                    layername=layername,
+                    format=data["format"],
+                    bbox=bbox,
+                    access=access,
+                    version=version,
+                )
+                cached_file = download_cache.open(cache_key)
+                if cached_file is not None:
+                    response = FileResponse(cached_file, as_attachment=True, filename=filename, content_type=content_type)
+                    response['X-Download-Cache'] = 'HIT'
+                    return response
+
+            geoserver_service = GeoServerService()
+            upstream = geoserver_service.open_wfs_stream(
+                workspace=workspace,
+                layer_name=layername,
+                output_format=output_format,
+                cql_filter=download_filter(layer_config, access, bbox),
+                property_names=download_property_names(layer_config),
+            )
+
+            writer = download_cache.writer(cache_key) if cache_key else None
+            response = StreamingHttpResponse(
+                _stream_and_cache(upstream, writer),
+                content_type=content_type,
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response['X-Download-Cache'] = 'MISS'
+            return response
+
+        except GeoserverException as e:
+            return Response(
+                {"detail": f"خطا در دریافت لایه از جئوسرور: {e.message}"},
+                status=status.HTTP_404_NOT_FOUND if e.status == 404 else status.HTTP_400_BAD_REQUEST
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Error in layer download {layername}: {str(e)}")
+            return Response(
+                {"detail": "جئوسرور در دسترس نیست"},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
+        except Exception as e:
+            print(f"Error in layer download {layername}: {str(e)}")
+            return Response(
+                {"detail": "خطا در دانلود لایه"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -8,6 +8,7 @@ from .models.cadaster import (
     OldCadasterData
 )
 from .models.flag import Flag
+from .models.statushistory import CadasterStatusHistory
 from landreg.services.gis import drop_table_if_exists
 
 
@@ -170,10 +171,22 @@ class OldCadasterDataAdmin(admin.ModelAdmin):
     drop_selected_tables.short_description = "Drop database tables for selected records"
 
 
+class CadasterStatusHistoryAdmin(admin.ModelAdmin):
+    # Append-only log: read only in admin
+    list_display = ["id", "cadaster", "province", "old_status", "new_status", "source", "changed_by", "changed_at"]
+    list_filter = ["source", "new_status"]
+    search_fields = ["cadaster__uniquecode", "changed_by__username"]
+    list_select_related = ["cadaster", "province", "changed_by"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(Pelak , PelakAdmin)
 admin.site.register(Cadaster , CadasterAdmin)
 admin.site.register(Flag , FlagAdmin)
 admin.site.register(OldCadasterData , OldCadasterDataAdmin)
-
-
-
+admin.site.register(CadasterStatusHistory , CadasterStatusHistoryAdmin)
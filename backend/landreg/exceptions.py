@@ -21,3 +21,7 @@ class TableNotFoundError(DatabaseError):
 class CadasterImportError(Exception):
     """Exception raised during cadaster import"""
     pass
+
+class GridRequestError(Exception):
+    """Exception raised for an invalid grid aggregation request (zoom / bbox)"""
+    pass
@@ -0,0 +1,70 @@
+# landreg/management/commands/build_tile_package.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from accounts.models import User
+from common.models import Province
+from landreg.models.pelak import Pelak
+from landreg.services.access_service import AccessSnapshot
+from landreg.services.tile_package_service import (
+    PACKAGE_FORMATS,
+    TilePackageError,
+    build_tile_package,
+)
+
+
+class Command(BaseCommand):
+    help = "Pre-render the pelak / cadaster / flag vector tiles of a province or a pelak into an MBTiles or PMTiles package"
+
+    def add_arguments(self, parser):
+        area = parser.add_mutually_exclusive_group(required=True)
+        area.add_argument("--province", type=int, help="Province id")
+        area.add_argument("--pelak", type=str, help="Pelak number")
+        parser.add_argument("--format", choices=PACKAGE_FORMATS, default="mbtiles")
+        parser.add_argument("--min-zoom", type=int, default=settings.TILE_PACKAGES["MIN_ZOOM"])
+        parser.add_argument("--max-zoom", type=int, default=settings.TILE_PACKAGES["MAX_ZOOM"])
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TILE_PACKAGES["WORKERS"],
+            help="Threads rendering tiles",
+        )
+        parser.add_argument(
+            "--user",
+            type=str,
+            help="Build the package with the access of this username (default: every feature)",
+        )
+
+    def handle(self, *args, **options):
+        if options["min_zoom"] > options["max_zoom"]:
+            raise CommandError("--min-zoom must not be greater than --max-zoom")
+
+        access = AccessSnapshot(pelak_numbers=None, province_ids=[])
+        if options["user"]:
+            try:
+                access = AccessSnapshot.build(User.objects.get(username=options["user"]))
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        started = time.perf_counter()
+        try:
+            result = build_tile_package(
+                access=access,
+                province_id=options["province"],
+                pelak_id=options["pelak"],
+                min_zoom=options["min_zoom"],
+                max_zoom=options["max_zoom"],
+                package_format=options["format"],
+                workers=options["workers"],
+            )
+        except (Province.DoesNotExist, Pelak.DoesNotExist):
+            raise CommandError("Province / pelak does not exist")
+        except TilePackageError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['path']}: {result['tiles']} tiles "
+            f"({result['reused']} reused, {result['rendered']} rendered, {result['empty']} empty) "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
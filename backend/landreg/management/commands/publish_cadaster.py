@@ -1,21 +1,23 @@
-# landreg/management/commands/publish_pelak.py
+# landreg/management/commands/publish_cadaster.py
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from geoserverapp.services.geoserver_service import GeoServerService
 from landreg.models.cadaster import Cadaster
 
 class Command(BaseCommand):
-    help = "Publish Pelak layer to GeoServer"
+    help = "Publish Cadaster layer to GeoServer"
 
     def handle(self, *args, **options):
         geoserver_service = GeoServerService()
         try:
-            result = geoserver_service.pulish_layer(
+            [result] = geoserver_service.publish_layers(
                 workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
                 store_name=settings.GEOSERVER['DEFAULT_STORE'],
-                pg_table=Cadaster._meta.db_table,
-                title=Cadaster._meta.db_table,
+                pg_tables=[Cadaster._meta.db_table],
             )
-            self.stdout.write(self.style.SUCCESS(f"Published Cadaster layer: {result}"))
+            if result["status"] == 201:
+                self.stdout.write(self.style.SUCCESS(f"Published Cadaster layer: {result}"))
+            else:
+                self.stderr.write(self.style.ERROR(f"Failed to publish Cadaster layer: {result}"))
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Failed to publish Cadaster layer: {e}"))
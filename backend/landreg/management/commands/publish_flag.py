@@ -1,21 +1,23 @@
-# landreg/management/commands/publish_pelak.py
+# landreg/management/commands/publish_flag.py
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from geoserverapp.services.geoserver_service import GeoServerService
 from landreg.models.flag import Flag
 
 class Command(BaseCommand):
-    help = "Publish Pelak layer to GeoServer"
+    help = "Publish Flag layer to GeoServer"
 
     def handle(self, *args, **options):
         geoserver_service = GeoServerService()
         try:
-            result = geoserver_service.pulish_layer(
+            [result] = geoserver_service.publish_layers(
                 workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
                 store_name=settings.GEOSERVER['DEFAULT_STORE'],
-                pg_table=Flag._meta.db_table,
-                title=Flag._meta.db_table,
+                pg_tables=[Flag._meta.db_table],
             )
-            self.stdout.write(self.style.SUCCESS(f"Published Flag layer: {result}"))
+            if result["status"] == 201:
+                self.stdout.write(self.style.SUCCESS(f"Published Flag layer: {result}"))
+            else:
+                self.stderr.write(self.style.ERROR(f"Failed to publish Flag layer: {result}"))
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Failed to publish Flag layer: {e}"))
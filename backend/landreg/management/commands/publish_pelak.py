@@ -10,13 +10,14 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         geoserver_service = GeoServerService()
         try:
-            print(">>>>>>>>>>" , Pelak._meta.db_table)
-            result = geoserver_service.pulish_layer(
+            [result] = geoserver_service.publish_layers(
                 workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
                 store_name=settings.GEOSERVER['DEFAULT_STORE'],
-                pg_table=Pelak._meta.db_table,
-                title=Pelak._meta.db_table,
+                pg_tables=[Pelak._meta.db_table],
             )
-            self.stdout.write(self.style.SUCCESS(f"Published Pelak layer: {result}"))
+            if result["status"] == 201:
+                self.stdout.write(self.style.SUCCESS(f"Published Pelak layer: {result}"))
+            else:
+                self.stderr.write(self.style.ERROR(f"Failed to publish Pelak layer: {result}"))
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Failed to publish Pelak layer: {e}"))
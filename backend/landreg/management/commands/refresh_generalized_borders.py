@@ -0,0 +1,34 @@
+# landreg/management/commands/refresh_generalized_borders.py
+import time
+from django.core.management.base import BaseCommand
+
+from landreg.services.generalization_service import (
+    GENERALIZATION_MAX_ZOOMS,
+    GENERALIZED_SOURCES,
+    refresh_generalized_borders,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the generalized (simplified) cadaster / pelak / province borders of every zoom level. "
+        "Run once after migrating and after changing GENERALIZATION_MAX_ZOOMS; edits keep them up to date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            choices=list(GENERALIZED_SOURCES.keys()),
+            action="append",
+            dest="sources",
+            help="Only rebuild this source (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        sources = options["sources"] or list(GENERALIZED_SOURCES.keys())
+        self.stdout.write(f"Levels (deepest zoom): {list(GENERALIZATION_MAX_ZOOMS)}")
+        for source in sources:
+            started = time.perf_counter()
+            written = refresh_generalized_borders(source)
+            self.stdout.write(f"{source}: {written} borders in {time.perf_counter() - started:.2f}s")
+        self.stdout.write(self.style.SUCCESS("Generalized borders rebuilt"))
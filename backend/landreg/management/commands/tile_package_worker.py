@@ -0,0 +1,64 @@
+# landreg/management/commands/tile_package_worker.py
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import close_old_connections
+
+from landreg.services.tile_package_service import claim_tile_package_job, run_tile_package_job
+
+
+class Command(BaseCommand):
+    help = "Build the offline tile packages requested through the API (one at a time)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Build all due packages and exit",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when no package is requested",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TILE_PACKAGES["WORKERS"],
+            help="Threads rendering tiles",
+        )
+
+    def handle(self, *args, **options):
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        self.stdout.write(self.style.SUCCESS("Tile package worker started"))
+
+        # A build in progress is finished before stopping (an interrupted one is taken over
+        # by the next worker once its heartbeat is stale)
+        while not self._stop:
+            close_old_connections()
+            job = None
+            try:
+                job = claim_tile_package_job()
+                if job is not None:
+                    started = time.perf_counter()
+                    run_tile_package_job(job, workers=options["workers"])
+                    self.stdout.write(
+                        f"Tile package job #{job.pk}: {job.status} in {time.perf_counter() - started:.1f}s"
+                    )
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Tile package worker failed: {e}"))
+
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Tile package worker stopped"))
+
+    def _request_stop(self, signum, frame):
+        self._stop = True
@@ -0,0 +1,65 @@
+# landreg/management/commands/warm_report_cache.py
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+from landreg.services.report_warmup_service import (
+    all_report_jobs,
+    province_report_jobs,
+    national_report_jobs,
+    warm_reports,
+)
+
+
+class Command(BaseCommand):
+    help = "Recompute and store every report cache key (province, national and grid reports)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.REPORT_CACHE.get("WARM_WORKERS", 4),
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--province",
+            type=int,
+            action="append",
+            dest="provinces",
+            help="Only warm the reports of this province id (repeatable) + national reports",
+        )
+        parser.add_argument(
+            "--skip-grid",
+            action="store_true",
+            help="Do not warm the grid aggregation reports",
+        )
+
+    def handle(self, *args, **options):
+        include_grid = not options["skip_grid"]
+        if options["provinces"]:
+            jobs = province_report_jobs(options["provinces"]) + national_report_jobs(include_grid)
+        else:
+            jobs = all_report_jobs(include_grid)
+
+        self.stdout.write(f"Warming {len(jobs)} report keys with {options['workers']} workers")
+
+        def on_result(result):
+            cache_key, seconds, error = result
+            if error:
+                self.stderr.write(self.style.ERROR(f"{cache_key}: failed after {seconds:.2f}s: {error}"))
+            else:
+                self.stdout.write(f"{cache_key}: {seconds:.2f}s")
+
+        started = time.perf_counter()
+        results = warm_reports(jobs, workers=options["workers"], on_result=on_result)
+        elapsed = time.perf_counter() - started
+
+        failed = [r for r in results if r[2]]
+        slowest = sorted(results, key=lambda r: r[1], reverse=True)[:5]
+        self.stdout.write("Slowest keys: " + ", ".join(f"{key} ({seconds:.2f}s)" for key, seconds, _ in slowest))
+        if failed:
+            self.stderr.write(self.style.ERROR(
+                f"Warmed {len(results) - len(failed)}/{len(results)} report keys in {elapsed:.2f}s, {len(failed)} failed"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Warmed {len(results)} report keys in {elapsed:.2f}s"))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-19 09:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_rmov_typ_from_company'),
+        ('landreg', '0009_chng_fla_fields_nullables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CadasterStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.IntegerField(blank=True, null=True, verbose_name='وضعیت قبلی')),
+                ('new_status', models.IntegerField(verbose_name='وضعیت جدید')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاریخ تغییر')),
+                ('source', models.CharField(choices=[('manual', 'تغییر دستی'), ('import', 'بارگذاری')], default='manual', max_length=10, verbose_name='منبع تغییر')),
+                ('cadaster', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_history', to='landreg.cadaster', verbose_name='کاداستر')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cadaster_status_changes', to=settings.AUTH_USER_MODEL, verbose_name='تغییر داده شده توسط')),
+                ('province', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cadaster_status_history', to='common.province', verbose_name='استان')),
+            ],
+            options={
+                'verbose_name': 'تاریخچه وضعیت کاداستر',
+                'verbose_name_plural': 'تاریخچه وضعیت کاداسترها',
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['cadaster', 'changed_at'], name='landreg_cad_cadaste_bb4f77_idx'), models.Index(fields=['province', 'changed_at'], name='landreg_cad_provinc_7ec445_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CadasterStatusDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='روز')),
+                ('status', models.IntegerField(verbose_name='وضعیت')),
+                ('entered_count', models.PositiveIntegerField(default=0, verbose_name='تعداد ورود به وضعیت')),
+                ('left_count', models.PositiveIntegerField(default=0, verbose_name='تعداد خروج از وضعیت')),
+                ('province', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cadaster_status_rollups', to='common.province', verbose_name='استان')),
+            ],
+            options={
+                'verbose_name': 'آمار روزانه وضعیت کاداستر',
+                'verbose_name_plural': 'آمار روزانه وضعیت کاداسترها',
+                'indexes': [models.Index(fields=['province', 'day'], name='landreg_cad_provinc_f8b67c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'province', 'status'), name='unique_cadaster_status_rollup_day', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 14:05
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landreg', '0010_add_cadaster_status_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneralizedBorder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('cadaster', 'کاداستر'), ('pelak', 'پلاک'), ('province', 'استان')], max_length=10, verbose_name='جدول مبدا')),
+                ('source_id', models.CharField(max_length=100, verbose_name='شناسه رکورد مبدا')),
+                ('level', models.PositiveSmallIntegerField(verbose_name='سطح ساده سازی')),
+                ('border', django.contrib.gis.db.models.fields.MultiPolygonField(spatial_index=False, srid=4326, verbose_name='مرز ساده شده')),
+            ],
+            options={
+                'verbose_name': 'مرز ساده شده',
+                'verbose_name_plural': 'مرزهای ساده شده',
+                'constraints': [models.UniqueConstraint(fields=('source', 'level', 'source_id'), name='unique_generalized_border_level')],
+            },
+        ),
+    ]
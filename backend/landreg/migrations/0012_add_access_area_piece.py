@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-19 15:20
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('landreg', '0011_add_generalized_border'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessAreaPiece',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(db_index=True, max_length=32, verbose_name='دامنه دسترسی')),
+                ('piece', django.contrib.gis.db.models.fields.GeometryField(srid=4326, verbose_name='بخش محدوده دسترسی')),
+                ('built_at', models.DateTimeField(auto_now_add=True, verbose_name='زمان ساخت')),
+            ],
+            options={
+                'verbose_name': 'بخش محدوده دسترسی',
+                'verbose_name_plural': 'بخش‌های محدوده دسترسی',
+                'indexes': [models.Index(fields=['built_at'], name='landreg_acc_built_a_8ae038_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-19 18:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_rmov_typ_from_company'),
+        ('landreg', '0012_add_access_area_piece'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TilePackageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_zoom', models.PositiveSmallIntegerField(verbose_name='حداقل زوم')),
+                ('max_zoom', models.PositiveSmallIntegerField(verbose_name='حداکثر زوم')),
+                ('package_format', models.CharField(max_length=10, verbose_name='قالب')),
+                ('access', models.JSONField(default=dict, verbose_name='دسترسی درخواست کننده')),
+                ('scope', models.CharField(max_length=32, verbose_name='دامنه دسترسی')),
+                ('status', models.CharField(choices=[('pending', 'در انتظار'), ('running', 'در حال ساخت'), ('done', 'آماده'), ('failed', 'ناموفق')], default='pending', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان تلاش بعدی')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='آخرین گزارش سازنده')),
+                ('path', models.CharField(blank=True, default='', max_length=500, verbose_name='مسیر فایل')),
+                ('stats', models.JSONField(default=dict, verbose_name='آمار ساخت')),
+                ('error', models.TextField(blank=True, default='', verbose_name='خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاریخ پایان')),
+                ('pelak', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tile_package_jobs', to='landreg.pelak', verbose_name='پلاک')),
+                ('province', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tile_package_jobs', to='common.province', verbose_name='استان')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tile_package_jobs', to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+            ],
+            options={
+                'verbose_name': 'بسته آفلاین نقشه',
+                'verbose_name_plural': 'بسته‌های آفلاین نقشه',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='landreg_til_status_463569_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,7 @@
 from .cadaster import Cadaster
 from .pelak import Pelak
-from .flag import Flag
\ No newline at end of file
+from .flag import Flag
+from .statushistory import CadasterStatusHistory, CadasterStatusDailyRollup
+from .generalized import GeneralizedBorder
+from .accessarea import AccessAreaPiece
+from .tilepackage import TilePackageJob
@@ -0,0 +1,36 @@
+from django.db import models
+from django.contrib.gis.db import models as gis_models
+
+
+class AccessAreaPiece(models.Model):
+    """
+    Precomputed access area of an access scope (same granted pelaks + company provinces):
+    union of their borders cut in small pieces (ST_Subdivide) so "inside my access" is an
+    index lookup + a cheap intersects. Built on first use (see access_service)
+    """
+    scope = models.CharField(
+        verbose_name="دامنه دسترسی",
+        max_length=32,
+        db_index=True,
+    )
+    piece = gis_models.GeometryField(
+        srid=4326,
+        blank=False,
+        null=False,
+        verbose_name="بخش محدوده دسترسی",
+        spatial_index=True,
+    )
+    built_at = models.DateTimeField(
+        verbose_name="زمان ساخت",
+        auto_now_add=True,
+    )
+
+    def __str__(self):
+        return f"{self.scope} ({self.pk})"
+
+    class Meta:
+        verbose_name = "بخش محدوده دسترسی"
+        verbose_name_plural = "بخش‌های محدوده دسترسی"
+        indexes = [
+            models.Index(fields=['built_at']),
+        ]
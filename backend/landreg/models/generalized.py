@@ -0,0 +1,49 @@
+from django.db import models
+from django.contrib.gis.db import models as gis_models
+
+
+class GeneralizedBorder(models.Model):
+    """
+    Simplified copies of cadaster / pelak / province borders, one row per (source row, level).
+    Low zoom tiles and GeoJSON read these instead of the full resolution border.
+    Maintained incrementally after commit (see generalization_service)
+    """
+    class Source(models.TextChoices):
+        CADASTER = 'cadaster', 'کاداستر'
+        PELAK = 'pelak', 'پلاک'
+        PROVINCE = 'province', 'استان'
+
+    source = models.CharField(
+        verbose_name="جدول مبدا",
+        max_length=10,
+        choices=Source.choices,
+    )
+    # Primary key of the source row (pelak number / cadaster or province id) as text
+    source_id = models.CharField(
+        verbose_name="شناسه رکورد مبدا",
+        max_length=100,
+    )
+    level = models.PositiveSmallIntegerField(
+        verbose_name="سطح ساده سازی",
+    )
+    border = gis_models.MultiPolygonField(
+        srid=4326,
+        blank=False,
+        null=False,
+        verbose_name="مرز ساده شده",
+        # Always reached through its source row (bbox filter on the source spatial index)
+        spatial_index=False,
+    )
+
+    def __str__(self):
+        return f"{self.source} {self.source_id} (level {self.level})"
+
+    class Meta:
+        verbose_name = "مرز ساده شده"
+        verbose_name_plural = "مرزهای ساده شده"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'level', 'source_id'],
+                name='unique_generalized_border_level',
+            ),
+        ]
@@ -0,0 +1,125 @@
+from django.utils import timezone
+from django.db import models
+
+from common.models import Province
+from accounts.models import User
+
+
+class CadasterStatusHistory(models.Model):
+    """
+    Append-only log of cadaster status changes.
+    Written in the same transaction as the status change / bulk import (see status_history_service)
+    """
+    class Source(models.TextChoices):
+        MANUAL = 'manual', 'تغییر دستی'
+        IMPORT = 'import', 'بارگذاری'
+
+    cadaster = models.ForeignKey(
+        'landreg.Cadaster',
+        verbose_name="کاداستر",
+        on_delete=models.SET_NULL,
+        related_name="status_history",
+        blank=True,
+        null=True,
+    )
+    province = models.ForeignKey(
+        Province,
+        verbose_name="استان",
+        on_delete=models.SET_NULL,
+        related_name="cadaster_status_history",
+        blank=True,
+        null=True,
+    )
+    old_status = models.IntegerField(
+        verbose_name="وضعیت قبلی",
+        blank=True,
+        null=True,
+    )
+    new_status = models.IntegerField(
+        verbose_name="وضعیت جدید",
+        blank=False,
+        null=False,
+    )
+    changed_by = models.ForeignKey(
+        User,
+        verbose_name="تغییر داده شده توسط",
+        on_delete=models.SET_NULL,
+        related_name="cadaster_status_changes",
+        blank=True,
+        null=True,
+    )
+    changed_at = models.DateTimeField(
+        verbose_name="تاریخ تغییر",
+        default=timezone.now,
+    )
+    source = models.CharField(
+        verbose_name="منبع تغییر",
+        max_length=10,
+        choices=Source.choices,
+        default=Source.MANUAL,
+    )
+
+    def __str__(self):
+        return f"{self.cadaster_id}: {self.old_status} -> {self.new_status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("تاریخچه وضعیت کاداستر قابل ویرایش نیست")
+        super().save(*args, **kwargs)
+
+    class Meta:
+        verbose_name = "تاریخچه وضعیت کاداستر"
+        verbose_name_plural = "تاریخچه وضعیت کاداسترها"
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['cadaster', 'changed_at']),
+            models.Index(fields=['province', 'changed_at']),
+        ]
+
+
+class CadasterStatusDailyRollup(models.Model):
+    """
+    Incrementally maintained daily counters per (day, province, status).
+    - entered_count: cadasters that moved INTO this status on this day
+    - left_count: cadasters that moved OUT OF this status on this day
+    Trend reports read this table only (weekly buckets are summed from days).
+    """
+    day = models.DateField(
+        verbose_name="روز",
+    )
+    province = models.ForeignKey(
+        Province,
+        verbose_name="استان",
+        on_delete=models.CASCADE,
+        related_name="cadaster_status_rollups",
+        blank=True,
+        null=True,
+    )
+    status = models.IntegerField(
+        verbose_name="وضعیت",
+    )
+    entered_count = models.PositiveIntegerField(
+        verbose_name="تعداد ورود به وضعیت",
+        default=0,
+    )
+    left_count = models.PositiveIntegerField(
+        verbose_name="تعداد خروج از وضعیت",
+        default=0,
+    )
+
+    def __str__(self):
+        return f"{self.day} - {self.province_id} - {self.status}"
+
+    class Meta:
+        verbose_name = "آمار روزانه وضعیت کاداستر"
+        verbose_name_plural = "آمار روزانه وضعیت کاداسترها"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'province', 'status'],
+                name='unique_cadaster_status_rollup_day',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['province', 'day']),
+        ]
@@ -0,0 +1,112 @@
+from django.utils import timezone
+from django.db import models
+
+from common.models import Province
+from accounts.models import User
+
+
+class TilePackageJob(models.Model):
+    """
+    Offline tile package requested through the API.
+    Built by `manage.py tile_package_worker` (see tile_package_service), the API only serves
+    the file of a finished job
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'در انتظار'
+        RUNNING = 'running', 'در حال ساخت'
+        DONE = 'done', 'آماده'
+        FAILED = 'failed', 'ناموفق'
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="کاربر",
+        on_delete=models.CASCADE,
+        related_name="tile_package_jobs",
+    )
+    province = models.ForeignKey(
+        Province,
+        verbose_name="استان",
+        on_delete=models.CASCADE,
+        related_name="tile_package_jobs",
+        blank=True,
+        null=True,
+    )
+    pelak = models.ForeignKey(
+        'landreg.Pelak',
+        verbose_name="پلاک",
+        on_delete=models.CASCADE,
+        related_name="tile_package_jobs",
+        blank=True,
+        null=True,
+    )
+    min_zoom = models.PositiveSmallIntegerField(
+        verbose_name="حداقل زوم",
+    )
+    max_zoom = models.PositiveSmallIntegerField(
+        verbose_name="حداکثر زوم",
+    )
+    package_format = models.CharField(
+        verbose_name="قالب",
+        max_length=10,
+    )
+    access = models.JSONField(
+        verbose_name="دسترسی درخواست کننده",
+        default=dict,
+    )
+    scope = models.CharField(
+        verbose_name="دامنه دسترسی",
+        max_length=32,
+    )
+    status = models.CharField(
+        verbose_name="وضعیت",
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name="تعداد تلاش",
+        default=0,
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name="زمان تلاش بعدی",
+        default=timezone.now,
+    )
+    heartbeat_at = models.DateTimeField(
+        verbose_name="آخرین گزارش سازنده",
+        blank=True,
+        null=True,
+    )
+    path = models.CharField(
+        verbose_name="مسیر فایل",
+        max_length=500,
+        blank=True,
+        default="",
+    )
+    stats = models.JSONField(
+        verbose_name="آمار ساخت",
+        default=dict,
+    )
+    error = models.TextField(
+        verbose_name="خطا",
+        blank=True,
+        default="",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="تاریخ ایجاد",
+        auto_now_add=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name="تاریخ پایان",
+        blank=True,
+        null=True,
+    )
+
+    def __str__(self):
+        return f"{self.province_id or self.pelak_id} z{self.min_zoom}-{self.max_zoom} ({self.status}) #{self.id}"
+
+    class Meta:
+        verbose_name = "بسته آفلاین نقشه"
+        verbose_name_plural = "بسته‌های آفلاین نقشه"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
@@ -0,0 +1,197 @@
+"""
+Per-user access snapshot: which pelaks / provinces a user may see, and where.
+
+- superuser / supernazer company -> everything
+- otherwise the pelaks granted to the user (UserPelakPermission) plus, for nazer / moshaver
+  companies, the company provinces
+- The snapshot (pelak numbers + province ids) is cached per user and dropped after commit when
+  the grants, the user or its company change
+- Users with the same grants share a scope; the access area of a scope (union of the granted
+  borders, subdivided) is materialized in AccessAreaPiece on first use
+"""
+import hashlib
+import uuid
+from typing import Any, FrozenSet, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from accounts.models import User
+from common.models import Province
+from common.services.commit_services import OnCommitCollector
+from landreg.models.accessarea import AccessAreaPiece
+from landreg.models.pelak import Pelak
+
+# Scope of users that see every feature
+FULL_ACCESS_SCOPE = "all"
+# Max vertices of an access area piece (ST_Subdivide)
+AREA_PIECE_MAX_VERTICES = 256
+AREA_GENERATION_KEY = "access_area:generation"
+
+
+def snapshot_key(user_id: int) -> str:
+    return f"pelak_access:{user_id}"
+
+
+def area_ready_key(scope: str, generation: str) -> str:
+    return f"access_area:{scope}:{generation}"
+
+
+class AccessSnapshot:
+    """What a user may see on the map / in lists / in exports"""
+
+    def __init__(self, pelak_numbers: Optional[List[str]], province_ids: List[int]) -> None:
+        # None -> no restriction
+        self.pelak_numbers = sorted(pelak_numbers) if pelak_numbers is not None else None
+        self.province_ids = sorted(province_ids)
+        self._pelak_set: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def for_user(cls, user: User) -> "AccessSnapshot":
+        """Cached snapshot of the user (no query on a hit)"""
+        cached = cache.get(snapshot_key(user.pk))
+        if cached is not None:
+            return cls(pelak_numbers=cached['pelak_numbers'], province_ids=cached['province_ids'])
+
+        snapshot = cls.build(user)
+        cache.set(
+            snapshot_key(user.pk),
+            {'pelak_numbers': snapshot.pelak_numbers, 'province_ids': snapshot.province_ids},
+            timeout=settings.PELAK_ACCESS['SNAPSHOT_TIMEOUT'],
+        )
+        return snapshot
+
+    @classmethod
+    def build(cls, user: User) -> "AccessSnapshot":
+        if user.is_superuser or (user.company and user.company.is_supernazer):
+            return cls(pelak_numbers=None, province_ids=[])
+        province_ids: List[int] = []
+        if user.company and (user.company.is_nazer or user.company.is_moshaver):
+            province_ids = list(user.company.provinces.values_list('id', flat=True))
+        return cls(
+            pelak_numbers=list(user.pelaks.values_list('number', flat=True)),
+            province_ids=province_ids,
+        )
+
+    @property
+    def is_full(self) -> bool:
+        return self.pelak_numbers is None
+
+    @property
+    def scope(self) -> str:
+        """Users with the same grants share cached tiles and access areas"""
+        if self.is_full:
+            return FULL_ACCESS_SCOPE
+        raw = f"p:{','.join(self.pelak_numbers)}|r:{','.join(map(str, self.province_ids))}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+    def has_pelak(self, pelak_number: str) -> bool:
+        if self.is_full:
+            return True
+        if self._pelak_set is None:
+            self._pelak_set = frozenset(self.pelak_numbers)
+        return pelak_number in self._pelak_set
+
+    def intersects_area(self, geometry) -> bool:
+        """geometry touches the access area (one indexed query on the area pieces)"""
+        if self.is_full:
+            return True
+        ensure_access_area(self)
+        return AccessAreaPiece.objects.filter(scope=self.scope, piece__intersects=geometry).exists()
+
+    def area_filter_sql(self, geometry_sql: str) -> Tuple[str, List[Any]]:
+        """
+        SQL condition (and its parameters): geometry_sql (a 4326 geometry column) touches the access area.
+        Builds the area of the scope first when needed.
+        """
+        if self.is_full:
+            return "TRUE", []
+        ensure_access_area(self)
+        return f"""EXISTS (
+            SELECT 1 FROM "{AccessAreaPiece._meta.db_table}" aa
+            WHERE aa.scope = %s AND aa.piece && {geometry_sql} AND ST_Intersects(aa.piece, {geometry_sql})
+        )""", [self.scope]
+
+    def area_wkt(self) -> Optional[str]:
+        """WKT of the whole access area (None when it is empty), for filters sent to GeoServer"""
+        if self.is_full:
+            raise ValueError("A full access snapshot has no access area")
+        ensure_access_area(self)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT ST_AsText(ST_Union(piece), 7) FROM "{AccessAreaPiece._meta.db_table}" WHERE scope = %s',
+                [self.scope],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+# ----------------------------- Access areas -----------------------------
+
+def area_generation() -> str:
+    return cache.get(AREA_GENERATION_KEY) or "0"
+
+
+def bump_area_generation() -> None:
+    """A granted border moved: every access area is rebuilt on its next use"""
+    cache.set(AREA_GENERATION_KEY, uuid.uuid4().hex[:12], timeout=None)
+
+
+def build_access_area(snapshot: AccessSnapshot) -> int:
+    """(Re)build the pieces of the snapshot scope, returns the number of pieces"""
+    piece_table = AccessAreaPiece._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Concurrent builds of the same scope run one after the other
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"access_area:{snapshot.scope}"])
+        cursor.execute(f'DELETE FROM "{piece_table}" WHERE scope = %s', [snapshot.scope])
+        cursor.execute(
+            f"""
+            INSERT INTO "{piece_table}" (scope, piece, built_at)
+            SELECT %s, ST_Subdivide(area.geom, %s), now()
+            FROM (
+                SELECT ST_Union(granted.border) AS geom
+                FROM (
+                    SELECT border FROM "{Pelak._meta.db_table}" WHERE number = ANY(%s)
+                    UNION ALL
+                    SELECT border FROM "{Province._meta.db_table}" WHERE id = ANY(%s)
+                ) granted
+            ) area
+            WHERE area.geom IS NOT NULL
+            """,
+            [snapshot.scope, AREA_PIECE_MAX_VERTICES, snapshot.pelak_numbers, snapshot.province_ids],
+        )
+        pieces = cursor.rowcount
+        # Areas unused for two ready marker lifetimes have no live marker left
+        cursor.execute(
+            f"DELETE FROM \"{piece_table}\" WHERE built_at < now() - make_interval(secs => %s)",
+            [2 * settings.PELAK_ACCESS['AREA_TIMEOUT']],
+        )
+    return pieces
+
+
+def ensure_access_area(snapshot: AccessSnapshot) -> None:
+    """One cache GET when the area of the scope is already built for the current generation"""
+    ready_key = area_ready_key(snapshot.scope, area_generation())
+    if cache.get(ready_key):
+        return
+    build_access_area(snapshot)
+    cache.set(ready_key, 1, timeout=settings.PELAK_ACCESS['AREA_TIMEOUT'])
+
+
+# ----------------------------- Invalidation -----------------------------
+
+def _invalidate_collected(user_ids: list) -> None:
+    cache.delete_many([snapshot_key(user_id) for user_id in set(user_ids)])
+
+
+snapshot_invalidation_collector = OnCommitCollector(handler=_invalidate_collected, name="pelak_access")
+
+
+def invalidate_snapshots_on_commit(user_ids: Iterable[int]) -> None:
+    """Drop the cached snapshots after commit (a new snapshot gets a new scope -> new area)"""
+    for user_id in user_ids:
+        snapshot_invalidation_collector.add(user_id)
+
+
+def bump_area_generation_on_commit() -> None:
+    transaction.on_commit(bump_area_generation)
@@ -206,6 +206,8 @@ def import_cadaster_data(
     source_table_name: str,
     source_table_schema: str,
     matched_fields: List[Dict[str, str]],
+    province_id: Optional[int] = None,
+    user: Optional[Any] = None,
 ) -> Dict[str, Any]:
     """
     Import data from source table to Cadaster model.
@@ -214,6 +216,8 @@ def import_cadaster_data(
         source_table_name: Name of the source table
         source_table_schema: Schema of the source table
         matched_fields: List of column mappings
+        province_id: Province of the imported data (written to the status history)
+        user: User who started the import (written to the status history)
         pelak_id: ID of the Pelak to associate with
         
     Returns:
@@ -224,6 +228,8 @@ def import_cadaster_data(
         TableNotFoundError: When source table is not found
     """
     from landreg.models import Cadaster, Pelak
+    from landreg.services.status_history_service import record_imported_cadasters
+    from landreg.services.report_warmup_service import schedule_report_warmup
     
     # Protected fields that should never be imported
     PROTECTED_FIELDS = {'id' , 'status', 'change_status_date', 'change_status_by', 'pelak', 'id', 'created_at', 'updated_at'}
@@ -376,6 +382,10 @@ def import_cadaster_data(
                 for cadaster in cadaster_instances:
                     cadaster.save()
                     imported_count += 1
+                record_imported_cadasters(cadaster_instances, province_id=province_id, user=user)
+
+            # Recompute the invalidated reports so the first reader does not pay for them
+            schedule_report_warmup([province_id])
             
             return {
                 'success': True,
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import fiona
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.contrib.gis.geos import Polygon
+from django.db.models import BooleanField, QuerySet
+from django.db.models.expressions import RawSQL
+
+from common.models import Province
+from landreg.models.cadaster import Cadaster
+from landreg.models.pelak import Pelak
+from landreg.services.access_service import AccessSnapshot
+
+# Rows fetched per round trip of the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+# Records handed to fiona per writerecords() call
+EXPORT_WRITE_BATCH = 1000
+# RFC 8142 record separator
+GEOJSONSEQ_RS = "\x1e"
+
+# field -> fiona (OGR) type
+# Bulk exports carry no owner personal data (name, father name, national code, mobile), like the
+# layer downloads (geoserverapp download_access): those stay on the per cadaster details endpoint
+EXPORT_FIELDS: Dict[str, str] = {
+    'id': 'int',
+    'uniquecode': 'str',
+    'jaam_code': 'str',
+    'plak_name': 'str',
+    'plak_asli': 'str',
+    'plak_farei': 'str',
+    'bakhsh_sabti': 'str',
+    'nahiye_sabti': 'str',
+    'area': 'float',
+    'ownership_kinde': 'str',
+    'consulate_name': 'str',
+    'nezarat_type': 'str',
+    'project_name': 'str',
+    'land_use': 'str',
+    'irrigation_type': 'str',
+    'status': 'int',
+    'change_status_date': 'str',
+}
+
+# format -> (OGR driver | None for the streamed GeoJSONSeq, content type, extension, layer creation options)
+EXPORT_FORMATS: Dict[str, Tuple[Optional[str], str, str, Dict[str, str]]] = {
+    'geojsonseq': (None, 'application/geo+json-seq', 'geojsons', {}),
+    'fgb': ('FlatGeobuf', 'application/octet-stream', 'fgb', {'SPATIAL_INDEX': 'YES'}),
+    'gpkg': ('GPKG', 'application/geopackage+sqlite3', 'gpkg', {'SPATIAL_INDEX': 'YES'}),
+}
+
+
+def build_export_queryset(
+    province_id: Optional[int] = None,
+    pelak_id: Optional[str] = None,
+    status: Optional[int] = None,
+    bbox: Optional[List[float]] = None,
+    access: Optional[AccessSnapshot] = None,
+) -> QuerySet:
+    """
+    Cadasters matching all given filters, as dicts with the geometry already serialized by PostGIS
+    (no GEOS objects are built per row). With an access, only cadasters touching its access area.
+
+    Raises:
+        Province.DoesNotExist
+        Pelak.DoesNotExist
+    """
+    queryset = Cadaster.objects.all()
+
+    if province_id is not None:
+        province_instance = Province.objects.only('id', 'border').get(pk=province_id)
+        queryset = queryset.filter(border__intersects=province_instance.border)
+    if pelak_id is not None:
+        pelak_instance = Pelak.objects.only('number', 'border').get(pk=pelak_id)
+        queryset = queryset.filter(border__intersects=pelak_instance.border)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    if bbox is not None:
+        bbox_polygon = Polygon.from_bbox(bbox)
+        bbox_polygon.srid = 4326
+        queryset = queryset.filter(border__intersects=bbox_polygon)
+    if access is not None and not access.is_full:
+        area_sql, area_params = access.area_filter_sql(f'"{Cadaster._meta.db_table}"."border"')
+        queryset = queryset.filter(RawSQL(area_sql, area_params, output_field=BooleanField()))
+
+    return queryset.annotate(
+        geojson=AsGeoJSON('border', precision=7)
+    ).values('geojson', *EXPORT_FIELDS.keys()).order_by('id')
+
+
+def _properties(row: Dict[str, Any]) -> Dict[str, Any]:
+    properties = {field: row[field] for field in EXPORT_FIELDS}
+    if properties['change_status_date'] is not None:
+        properties['change_status_date'] = properties['change_status_date'].isoformat()
+    return properties
+
+
+def iter_geojsonseq(queryset: QuerySet) -> Iterator[str]:
+    """
+    GeoJSON text sequence (RFC 8142), one feature per record.
+    .iterator() uses a server-side cursor on PostgreSQL -> constant memory for any export size.
+    """
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        properties = json.dumps(_properties(row), ensure_ascii=False)
+        yield f'{GEOJSONSEQ_RS}{{"type":"Feature","id":{row["id"]},"geometry":{row["geojson"] or "null"},"properties":{properties}}}\n'
+
+
+def write_export_file(queryset: QuerySet, export_format: str) -> str:
+    """
+    Write the queryset into a temporary FlatGeobuf / GeoPackage file with fiona, in batches.
+    Returns the file path, the caller must remove it.
+    """
+    driver, _, extension, layer_options = EXPORT_FORMATS[export_format]
+    schema = {
+        'geometry': 'MultiPolygon',
+        'properties': dict(EXPORT_FIELDS),
+    }
+
+    fd, path = tempfile.mkstemp(suffix=f".{extension}", prefix="cadaster_export_")
+    os.close(fd)
+    # GDAL creates the file itself (GPKG refuses to open an existing empty file)
+    os.remove(path)
+
+    try:
+        with fiona.open(
+            path,
+            'w',
+            driver=driver,
+            schema=schema,
+            crs='EPSG:4326',
+            layer='cadaster',
+            **layer_options,
+        ) as dst:
+            batch = []
+            for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                batch.append(fiona.Feature.from_dict(
+                    geometry=json.loads(row['geojson']) if row['geojson'] else None,
+                    properties=_properties(row),
+                ))
+                if len(batch) >= EXPORT_WRITE_BATCH:
+                    dst.writerecords(batch)
+                    batch = []
+            if batch:
+                dst.writerecords(batch)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    return path
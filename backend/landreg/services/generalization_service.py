@@ -0,0 +1,130 @@
+"""
+Pre-generalized (simplified) borders for low zoom rendering.
+
+- Zooms are grouped in levels (GENERALIZATION_MAX_ZOOMS), deeper zooms use the full resolution border
+- Each level keeps a copy of every cadaster / pelak / province border simplified to half a
+  screen pixel of its deepest zoom (GeneralizedBorder table)
+- Copies are refreshed after commit for the saved / deleted rows only; a row without a copy yet
+  (e.g. bulk_create) is simplified on the fly, so reads are never wrong, only slower
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from django.db import connection, models, transaction
+
+from common.models import Province
+from common.services.commit_services import OnCommitCollector
+from landreg.models.cadaster import Cadaster
+from landreg.models.generalized import GeneralizedBorder
+from landreg.models.pelak import Pelak
+
+# Deepest zoom of each level (level = index)
+GENERALIZATION_MAX_ZOOMS = (5, 8, 11)
+# Simplification tolerance is half a pixel of a 256px tile shown on a 2x screen
+SCREEN_TILE_SIZE = 512
+# Source rows refreshed per statement
+REFRESH_BATCH = 5000
+
+GENERALIZED_SOURCES: Dict[str, Type[models.Model]] = {
+    GeneralizedBorder.Source.CADASTER: Cadaster,
+    GeneralizedBorder.Source.PELAK: Pelak,
+    GeneralizedBorder.Source.PROVINCE: Province,
+}
+
+
+def level_for_zoom(z: int) -> Optional[int]:
+    """Generalization level used at zoom z, None -> full resolution"""
+    for level, max_zoom in enumerate(GENERALIZATION_MAX_ZOOMS):
+        if z <= max_zoom:
+            return level
+    return None
+
+
+def level_tolerance(level: int) -> float:
+    """Simplification tolerance (degrees) of a level"""
+    return 360.0 / (SCREEN_TILE_SIZE * (1 << GENERALIZATION_MAX_ZOOMS[level]))
+
+
+def source_levels(source: str) -> List[int]:
+    """Levels worth storing for a source: the ones reaching its tile layer min zoom"""
+    from landreg.services.tile_service import TILE_LAYERS
+
+    min_zoom = TILE_LAYERS[source]['min_zoom'] if source in TILE_LAYERS else 0
+    return [level for level, max_zoom in enumerate(GENERALIZATION_MAX_ZOOMS) if max_zoom >= min_zoom]
+
+
+def generalized_border_sql(source: Optional[str], alias: str, z: int) -> Tuple[str, List[Any], str, List[Any]]:
+    """
+    SQL pieces reading the border of the source rows (table alias `alias`) at zoom z:
+    (geometry expression, its params, join clause, its params).
+    The join clause must follow the source table in the FROM list.
+    """
+    level = level_for_zoom(z) if source else None
+    if level is None:
+        return f"{alias}.border", [], "", []
+
+    pk_column = GENERALIZED_SOURCES[source]._meta.pk.column
+    return (
+        # Rows without a stored copy yet are simplified on the fly
+        f"COALESCE(g.border, ST_SimplifyPreserveTopology({alias}.border, %s))",
+        [level_tolerance(level)],
+        f"""LEFT JOIN "{GeneralizedBorder._meta.db_table}" g
+            ON g.source = %s AND g.level = %s AND g.source_id = {alias}."{pk_column}"::text""",
+        [source, level],
+    )
+
+
+def refresh_generalized_borders(source: str, ids: Optional[Iterable[Any]] = None) -> int:
+    """
+    Rebuild the generalized copies of the given source rows (every row when ids is None).
+    Deleted rows just lose their copies. Returns the number of copies written.
+    """
+    model = GENERALIZED_SOURCES[source]
+    levels = source_levels(source)
+    tolerances = [level_tolerance(level) for level in levels]
+    generalized_table = GeneralizedBorder._meta.db_table
+    pk_column = model._meta.pk.column
+    insert_sql = f"""
+        INSERT INTO "{generalized_table}" (source, source_id, level, border)
+        SELECT %s, t."{pk_column}"::text, l.level,
+               ST_Multi(ST_SimplifyPreserveTopology(t.border, l.tolerance))
+        FROM "{model._meta.db_table}" t
+        CROSS JOIN unnest(%s::smallint[], %s::float8[]) AS l(level, tolerance)
+    """
+
+    written = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        if ids is None:
+            cursor.execute(f'DELETE FROM "{generalized_table}" WHERE source = %s', [source])
+            cursor.execute(insert_sql, [source, levels, tolerances])
+            return cursor.rowcount
+
+        ids = list(dict.fromkeys(ids))
+        for start in range(0, len(ids), REFRESH_BATCH):
+            batch = ids[start:start + REFRESH_BATCH]
+            cursor.execute(
+                f'DELETE FROM "{generalized_table}" WHERE source = %s AND source_id = ANY(%s)',
+                [source, [str(pk) for pk in batch]],
+            )
+            cursor.execute(
+                insert_sql + f' WHERE t."{pk_column}" = ANY(%s)',
+                [source, levels, tolerances, batch],
+            )
+            written += cursor.rowcount
+    return written
+
+
+def _refresh_collected(items: List[Tuple[str, Any]]) -> None:
+    ids_by_source: Dict[str, List[Any]] = defaultdict(list)
+    for source, pk in items:
+        ids_by_source[source].append(pk)
+    for source, ids in ids_by_source.items():
+        refresh_generalized_borders(source, ids)
+
+
+generalized_border_collector = OnCommitCollector(handler=_refresh_collected, name="generalized_borders")
+
+
+def refresh_generalized_borders_on_commit(source: str, pks: Iterable[Any]) -> None:
+    """Queue the refresh of these rows, coalesced per transaction (one statement per batch on commit)"""
+    for pk in pks:
+        generalized_border_collector.add((source, pk))
@@ -0,0 +1,170 @@
+import time
+import uuid
+from typing import Any, Callable, Iterable, List
+from django.conf import settings
+from django.core.cache import cache
+
+from common.services.commit_services import OnCommitCollector, Extent, union_extents
+
+# Report entries live until their scope is invalidated (bounded to limit the damage of a lost invalidation)
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24
+# Max time a single worker may hold the recompute lock of a key
+REPORT_LOCK_TIMEOUT = 120
+# How long other workers wait for the lock holder when there is no stale value to serve
+REPORT_WAIT_TIMEOUT = 15
+REPORT_WAIT_INTERVAL = 0.1
+
+NATIONAL_SCOPE = "national"
+
+
+def province_scope(provinceid: int) -> str:
+    return f"province_{provinceid}"
+
+
+def _generation_key(scope: str) -> str:
+    return f"report_generation_{scope}"
+
+
+def _lock_key(cache_key: str) -> str:
+    return f"{cache_key}__lock"
+
+
+def _new_generation() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _current_generation(generation_key: str, generation: Any = None) -> Any:
+    """
+    Generation of a scope (`generation`: the value already read, if any).
+    A missing (never set / evicted) generation is seeded with a random token, so entries
+    stored under an evicted generation never become fresh again.
+    """
+    if generation is not None:
+        return generation
+    token = _new_generation()
+    if cache.add(generation_key, token, timeout=None):
+        return token
+    # Another worker seeded it first (or the cache is unreachable -> the entry is just recomputed)
+    return cache.get(generation_key) or token
+
+
+def get_or_compute_report(
+    cache_key: str,
+    scope: str,
+    compute: Callable[[], Any],
+    timeout: int = REPORT_CACHE_TIMEOUT,
+) -> Any:
+    """
+    Read-through report cache with event driven invalidation and stampede protection.
+
+    - Every entry is stored as {'generation': g, 'value': v}; the entry is fresh while `g` equals
+      the current generation of its scope (bumped by invalidate_report_scopes)
+    - Empty / falsy results are valid cached values
+    - Only one worker recomputes a cold or stale key (cache.add lock); the others serve the
+      stale value, or wait for the lock holder when the key is cold
+    - In DEBUG mode the cache is bypassed
+    """
+    if settings.DEBUG:
+        return compute()
+
+    generation_key = _generation_key(scope)
+    values = cache.get_many([cache_key, generation_key])
+    generation = _current_generation(generation_key, values.get(generation_key))
+    entry = values.get(cache_key)
+
+    if entry is not None and entry.get("generation") == generation:
+        return entry["value"]
+
+    lock_key = _lock_key(cache_key)
+    lock_token = uuid.uuid4().hex
+    acquired = cache.add(lock_key, lock_token, REPORT_LOCK_TIMEOUT)
+
+    # acquired is None when the cache backend is unreachable (IGNORE_EXCEPTIONS) -> just compute
+    if acquired is False:
+        if entry is not None:
+            # Someone else is recomputing, serve stale
+            return entry["value"]
+
+        deadline = time.monotonic() + REPORT_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(REPORT_WAIT_INTERVAL)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                return entry["value"]
+            if cache.get(lock_key) is None:
+                # Lock holder failed or finished without storing, stop waiting
+                break
+        return compute()
+
+    try:
+        value = compute()
+        # Store with the generation read BEFORE computing: an invalidation that lands while we
+        # compute leaves the entry stale, so the next reader recomputes it
+        cache.set(cache_key, {"generation": generation, "value": value}, timeout)
+        return value
+    finally:
+        if acquired and cache.get(lock_key) == lock_token:
+            cache.delete(lock_key)
+
+
+def refresh_report(
+    cache_key: str,
+    scope: str,
+    compute: Callable[[], Any],
+    timeout: int = REPORT_CACHE_TIMEOUT,
+) -> Any:
+    """
+    Recompute a report and store it unconditionally (cache warm-up).
+    Holds the recompute lock like get_or_compute_report so concurrent readers serve stale / wait
+    instead of recomputing the same key.
+    """
+    generation_key = _generation_key(scope)
+    generation = _current_generation(generation_key, cache.get(generation_key))
+    lock_key = _lock_key(cache_key)
+    lock_token = uuid.uuid4().hex
+    acquired = cache.add(lock_key, lock_token, REPORT_LOCK_TIMEOUT)
+    try:
+        value = compute()
+        cache.set(cache_key, {"generation": generation, "value": value}, timeout)
+        return value
+    finally:
+        if acquired and cache.get(lock_key) == lock_token:
+            cache.delete(lock_key)
+
+
+def invalidate_report_scopes(scopes: Iterable[str]) -> None:
+    """Mark every report of the given scopes as stale (one SET of a new generation token per scope)"""
+    cache.set_many({_generation_key(scope): _new_generation() for scope in set(scopes)}, timeout=None)
+
+
+def _invalidate_reports_for_extents(extents: List[Extent]) -> None:
+    from common.models import Province
+    from django.contrib.gis.geos import Polygon
+
+    extent = union_extents(extents)
+    if extent is None:
+        return
+
+    bbox = Polygon.from_bbox(extent)
+    bbox.srid = 4326
+    province_ids = Province.objects.filter(border__intersects=bbox).values_list('id', flat=True)
+
+    invalidate_report_scopes(
+        [province_scope(pid) for pid in province_ids] + [NATIONAL_SCOPE]
+    )
+
+
+report_invalidation_collector = OnCommitCollector(
+    handler=_invalidate_reports_for_extents,
+    name="report_invalidation",
+)
+
+
+def invalidate_reports_for_geometry(geometry) -> None:
+    """
+    Queue invalidation of the reports of every province the geometry touches.
+    Coalesced per transaction: a bulk import of N cadasters costs one province lookup on commit.
+    """
+    if geometry is None or geometry.empty:
+        return
+    report_invalidation_collector.add(geometry.extent)
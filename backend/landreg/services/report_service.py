@@ -0,0 +1,414 @@
+import gzip
+import hashlib
+import json
+import math
+from typing import Any, Dict, Optional, Tuple
+from django.db import connection
+from django.db.models import Count, Case, When, Q, F, IntegerField
+
+from common.models import Province
+from landreg.models.cadaster import Cadaster
+from landreg.models.flag import Flag
+from landreg.exceptions import GridRequestError
+from landreg.services.report_cache_service import (
+    get_or_compute_report,
+    province_scope,
+    NATIONAL_SCOPE,
+)
+
+CADASTER_STATUS_LABELS = dict(Cadaster.cadaster_status)
+FLAG_STATUS_LABELS = dict(Flag.FLAG_STATUS_CHOICES)
+
+
+def cadaster_status_cache_key(provinceid: int) -> str:
+    return f'report_cadaster_by_province_status_{provinceid}'
+
+
+def flag_status_cache_key(provinceid: int) -> str:
+    return f'report_flag_by_province_status_{provinceid}'
+
+
+def diff_cadaster_flag_cache_key(provinceid: int) -> str:
+    return f'report_diff__cadasterflag_by_province_status_{provinceid}'
+
+
+def compute_cadaster_status_by_province(provinceid: int) -> Dict[str, Any]:
+    """
+    - Intersect the province.border with all Cadaster.border instances
+    - Return status count of all founded Cadasters
+
+    Raises:
+        Province.DoesNotExist
+    """
+    # Use only() to fetch only required fields
+    province_instance = Province.objects.only('id', 'name_fa', 'border').get(pk=provinceid)
+
+    # Single query with conditional aggregation for all statuses
+    status_aggregation = {
+        f'status_{code}': Count(
+            Case(When(status=code, then=1), output_field=IntegerField())
+        )
+        for code, _ in Cadaster.cadaster_status
+    }
+
+    counts = Cadaster.objects.filter(
+        border__intersects=province_instance.border
+    ).aggregate(
+        total=Count('id'),
+        **status_aggregation
+    )
+
+    return {
+        'province_id': provinceid,
+        'province_name': province_instance.name_fa,
+        'total_cadasters': counts['total'],
+        'status_breakdown': [
+            {
+                'status_code': status_code,
+                'status_label': status_label,
+                'count': counts[f'status_{status_code}']
+            }
+            for status_code, status_label in Cadaster.cadaster_status
+        ]
+    }
+
+
+def compute_flag_status_by_province(provinceid: int) -> Dict[str, Any]:
+    """
+    - Intersect the province.border with all flag.border (its point) instances
+    - Return status count of all founded Flags
+
+    Raises:
+        Province.DoesNotExist
+    """
+    province_instance = Province.objects.only('id', 'name_fa', 'border').get(pk=provinceid)
+
+    status_aggregation = {
+        f'status_{code}': Count(
+            Case(When(status=code, then=1), output_field=IntegerField())
+        )
+        for code, _ in Flag.FLAG_STATUS_CHOICES
+    }
+
+    counts = Flag.objects.filter(
+        border__intersects=province_instance.border
+    ).aggregate(
+        total=Count('id'),
+        **status_aggregation
+    )
+
+    return {
+        'province_id': provinceid,
+        'province_name': province_instance.name_fa,
+        'total_flags': counts['total'],
+        'status_breakdown': [
+            {
+                'status_code': status_code,
+                'status_label': status_label,
+                'count': counts[f'status_{status_code}']
+            }
+            for status_code, status_label in Flag.FLAG_STATUS_CHOICES
+        ]
+    }
+
+
+def compute_diff_cadaster_flag_by_province(provinceid: int) -> Dict[str, Any]:
+    """
+    - Count Cadasters in this province, those with flags and flags whose status differs from own Cadaster
+    - All totals are computed in a single SQL join with aggregates
+
+    Raises:
+        Province.DoesNotExist
+    """
+    province_instance = Province.objects.only('id', 'name_fa', 'border').get(pk=provinceid)
+
+    # LEFT JOIN cadaster -> flags, one row per (cadaster, flag) pair
+    counts = Cadaster.objects.filter(
+        border__intersects=province_instance.border
+    ).aggregate(
+        total_cadasters=Count('id', distinct=True),
+        total_with_flags=Count('id', filter=Q(flags__isnull=False), distinct=True),
+        total_mismatched=Count(
+            'flags',
+            filter=Q(flags__status__lt=F('status')) | Q(flags__status__gt=F('status'))
+        ),
+        # Cadasters with a flag of their own status (a cadaster with several flags counts once)
+        matched_count=Count('id', filter=Q(flags__status=F('status')), distinct=True),
+    )
+
+    return {
+        'province_id': provinceid,
+        'province_name': province_instance.name_fa,
+        'total_cadasters_in_province': counts['total_cadasters'],
+        'total_cadasters_with_flags': counts['total_with_flags'],
+        'total_mismatched': counts['total_mismatched'],
+        'matched_count': counts['matched_count'],
+    }
+
+
+def get_cadaster_status_by_province(provinceid: int) -> Dict[str, Any]:
+    return get_or_compute_report(
+        cache_key=cadaster_status_cache_key(provinceid),
+        scope=province_scope(provinceid),
+        compute=lambda: compute_cadaster_status_by_province(provinceid),
+    )
+
+
+def get_flag_status_by_province(provinceid: int) -> Dict[str, Any]:
+    return get_or_compute_report(
+        cache_key=flag_status_cache_key(provinceid),
+        scope=province_scope(provinceid),
+        compute=lambda: compute_flag_status_by_province(provinceid),
+    )
+
+
+def get_diff_cadaster_flag_by_province(provinceid: int) -> Dict[str, Any]:
+    return get_or_compute_report(
+        cache_key=diff_cadaster_flag_cache_key(provinceid),
+        scope=province_scope(provinceid),
+        compute=lambda: compute_diff_cadaster_flag_by_province(provinceid),
+    )
+
+
+# ----------------------------- National (all provinces) report -----------------------------
+
+NATIONAL_STATUS_CACHE_KEY = 'report_national_status'
+
+
+def compute_national_status_report() -> Dict[str, Any]:
+    """
+    Cadaster and flag status breakdowns of every province from ONE grouped query
+    (province x layer JOIN ON ST_Intersects ... GROUP BY province, status).
+    Same intersect semantics as the per province reports.
+    """
+    province_table = Province._meta.db_table
+    cadaster_table = Cadaster._meta.db_table
+    flag_table = Flag._meta.db_table
+
+    query = f"""
+        SELECT 'cadaster' AS layer, p.id, c.status, COUNT(*)
+        FROM "{province_table}" p
+        JOIN "{cadaster_table}" c ON ST_Intersects(p.border, c.border)
+        GROUP BY p.id, c.status
+        UNION ALL
+        SELECT 'flag' AS layer, p.id, f.status, COUNT(*)
+        FROM "{province_table}" p
+        JOIN "{flag_table}" f ON ST_Intersects(p.border, f.border)
+        GROUP BY p.id, f.status
+    """
+
+    counts: Dict[tuple, int] = {}
+    with connection.cursor() as cursor:
+        cursor.execute(query)
+        for layer, province_id, status_code, count in cursor.fetchall():
+            counts[(layer, province_id, status_code)] = count
+
+    def breakdown(layer: str, province_id: int, labels) -> list:
+        return [
+            {
+                'status_code': status_code,
+                'status_label': status_label,
+                'count': counts.get((layer, province_id, status_code), 0),
+            }
+            for status_code, status_label in labels
+        ]
+
+    provinces = []
+    for province_id, name_fa in Province.objects.order_by('id').values_list('id', 'name_fa'):
+        cadaster_breakdown = breakdown('cadaster', province_id, Cadaster.cadaster_status)
+        flag_breakdown = breakdown('flag', province_id, Flag.FLAG_STATUS_CHOICES)
+        provinces.append({
+            'province_id': province_id,
+            'province_name': name_fa,
+            'total_cadasters': sum(item['count'] for item in cadaster_breakdown),
+            'cadaster_status_breakdown': cadaster_breakdown,
+            'total_flags': sum(item['count'] for item in flag_breakdown),
+            'flag_status_breakdown': flag_breakdown,
+        })
+
+    return {'provinces': provinces}
+
+
+def build_compressed_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize once: gzip compressed JSON body + a strong ETag of the uncompressed body"""
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        'etag': f'"{hashlib.sha1(body).hexdigest()}"',
+        'gzip': gzip.compress(body, compresslevel=6),
+    }
+
+
+def get_national_status_report() -> Dict[str, Any]:
+    """{'etag': ..., 'gzip': ...} of the national report, cached until any cadaster/flag changes"""
+    return get_or_compute_report(
+        cache_key=NATIONAL_STATUS_CACHE_KEY,
+        scope=NATIONAL_SCOPE,
+        compute=lambda: build_compressed_payload(compute_national_status_report()),
+    )
+
+
+# ----------------------------- Grid (hex/square) aggregation -----------------------------
+
+GRID_LAYERS = {
+    'cadaster': (Cadaster, CADASTER_STATUS_LABELS),
+    'flag': (Flag, FLAG_STATUS_LABELS),
+}
+GRID_SHAPES = ('hex', 'square')
+# Origin of the cells: ST_Square / ST_Hexagon default to POINT(0 0) without SRID, which can not be transformed
+GRID_ORIGIN_SQL = "ST_SetSRID(ST_MakePoint(0, 0), 3857)"
+GRID_MIN_ZOOM = 0
+GRID_MAX_ZOOM = 14
+# Deepest zoom served nationwide (cached, warmed); deeper zooms need a bbox
+GRID_NATIONAL_MAX_ZOOM = 8
+# Max cells of a bbox request (estimated from the bbox size)
+GRID_MAX_BBOX_CELLS = 10000
+# A cell is about this many screen pixels wide at the requested zoom
+GRID_CELL_SIZE_PIXELS = 64
+# Web Mercator meters per pixel at zoom 0 (256px tiles)
+WEB_MERCATOR_RESOLUTION_Z0 = 156543.03392804097
+
+
+def grid_cell_size_for_zoom(zoom: int) -> float:
+    """Cell size in meters (EPSG:3857) for a web map zoom level"""
+    return GRID_CELL_SIZE_PIXELS * WEB_MERCATOR_RESOLUTION_Z0 / (2 ** zoom)
+
+
+def grid_bbox_cells(zoom: int, bbox: Tuple[float, float, float, float]) -> float:
+    """Estimated number of cells of an EPSG:4326 bbox at a zoom level"""
+    def mercator(lon: float, lat: float) -> Tuple[float, float]:
+        lat = max(-85.0511, min(85.0511, lat))
+        return (
+            math.radians(lon) * 6378137.0,
+            math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) * 6378137.0,
+        )
+
+    minx, miny = mercator(bbox[0], bbox[1])
+    maxx, maxy = mercator(bbox[2], bbox[3])
+    size = grid_cell_size_for_zoom(zoom)
+    return (math.ceil((maxx - minx) / size) + 1) * (math.ceil((maxy - miny) / size) + 1)
+
+
+def validate_grid_request(zoom: int, bbox: Optional[Tuple[float, float, float, float]]) -> None:
+    """Raise GridRequestError when the zoom / bbox combination is not served"""
+    if not (GRID_MIN_ZOOM <= zoom <= GRID_MAX_ZOOM):
+        raise GridRequestError(f"سطح زوم باید بین {GRID_MIN_ZOOM} و {GRID_MAX_ZOOM} باشد")
+    if bbox is None:
+        if zoom > GRID_NATIONAL_MAX_ZOOM:
+            raise GridRequestError(f"برای زوم بیشتر از {GRID_NATIONAL_MAX_ZOOM} محدوده (bbox) الزامی است")
+        return
+    if grid_bbox_cells(zoom, bbox) > GRID_MAX_BBOX_CELLS:
+        raise GridRequestError("محدوده (bbox) برای این سطح زوم بیش از حد بزرگ است")
+
+
+def grid_aggregation_cache_key(layer: str, shape: str, zoom: int) -> str:
+    return f'report_grid_{layer}_{shape}_{zoom}'
+
+
+def compute_grid_aggregation(
+    layer: str,
+    shape: str,
+    zoom: int,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Count features of a layer per grid cell and status (optionally of the features in an EPSG:4326 bbox).
+
+    - Every feature is reduced to a point (ST_PointOnSurface) in EPSG:3857
+    - square cells are found arithmetically, hex cells with ST_HexagonGrid over the point itself
+      (constant work per feature, no feature x cell join)
+    - cells are drawn from (0, 0) in EPSG:3857, the origin of both cell indexes
+    - Returns a GeoJSON FeatureCollection of cells with per status counts
+    """
+    model, status_labels = GRID_LAYERS[layer]
+    table = model._meta.db_table
+    size = grid_cell_size_for_zoom(zoom)
+
+    if shape == 'square':
+        cell_index_sql = """
+            CROSS JOIN LATERAL (
+                SELECT floor(ST_X(p.geom) / %(size)s)::int AS i,
+                       floor(ST_Y(p.geom) / %(size)s)::int AS j
+            ) h
+        """
+        cell_geometry_fn = "ST_Square"
+    else:
+        cell_index_sql = """
+            CROSS JOIN LATERAL (
+                SELECT g.i, g.j FROM ST_HexagonGrid(%(size)s, p.geom) g
+                WHERE ST_Intersects(g.geom, p.geom)
+                LIMIT 1
+            ) h
+        """
+        cell_geometry_fn = "ST_Hexagon"
+
+    params: Dict[str, Any] = {'size': size}
+    bbox_sql = "TRUE"
+    if bbox is not None:
+        bbox_sql = "t.border && ST_MakeEnvelope(%(minx)s, %(miny)s, %(maxx)s, %(maxy)s, 4326)"
+        params.update(zip(('minx', 'miny', 'maxx', 'maxy'), bbox))
+
+    query = f"""
+        SELECT c.i, c.j,
+               ST_AsGeoJSON(ST_Transform({cell_geometry_fn}(%(size)s, c.i, c.j, {GRID_ORIGIN_SQL}), 4326), 6) AS cell,
+               c.status, c.cnt
+        FROM (
+            SELECT h.i, h.j, t.status, COUNT(*) AS cnt
+            FROM "{table}" t
+            CROSS JOIN LATERAL (SELECT ST_Transform(ST_PointOnSurface(t.border), 3857) AS geom) p
+            {cell_index_sql}
+            WHERE {bbox_sql}
+            GROUP BY h.i, h.j, t.status
+        ) c
+        ORDER BY c.i, c.j
+    """
+
+    cells: Dict[tuple, Dict[str, Any]] = {}
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        for i, j, cell_geojson, status_code, count in cursor.fetchall():
+            cell = cells.get((i, j))
+            if cell is None:
+                cell = {
+                    'type': 'Feature',
+                    'geometry': json.loads(cell_geojson),
+                    'properties': {
+                        'i': i,
+                        'j': j,
+                        'total': 0,
+                        'status_breakdown': {},
+                    },
+                }
+                cells[(i, j)] = cell
+            cell['properties']['total'] += count
+            cell['properties']['status_breakdown'][str(status_code)] = count
+
+    return {
+        'type': 'FeatureCollection',
+        'layer': layer,
+        'shape': shape,
+        'zoom': zoom,
+        'bbox': list(bbox) if bbox is not None else None,
+        'cell_size_meters': size,
+        'status_labels': {str(code): label for code, label in status_labels.items()},
+        'features': list(cells.values()),
+    }
+
+
+def get_grid_aggregation(
+    layer: str,
+    shape: str,
+    zoom: int,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> Dict[str, Any]:
+    """
+    National grids (zoom <= GRID_NATIONAL_MAX_ZOOM) are cached under the national scope,
+    bbox grids are bounded by GRID_MAX_BBOX_CELLS and computed on demand
+    """
+    validate_grid_request(zoom, bbox)
+    if bbox is not None:
+        return compute_grid_aggregation(layer, shape, zoom, bbox)
+    return get_or_compute_report(
+        cache_key=grid_aggregation_cache_key(layer, shape, zoom),
+        scope=NATIONAL_SCOPE,
+        compute=lambda: compute_grid_aggregation(layer, shape, zoom),
+    )
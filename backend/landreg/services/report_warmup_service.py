@@ -0,0 +1,142 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db import connections, transaction
+
+from common.models import Province
+from landreg.services.report_cache_service import refresh_report, province_scope, NATIONAL_SCOPE
+from landreg.services import report_service
+
+# A warm-up job is (report kind, args); kept picklable so it can be sent to a worker process
+ReportJob = Tuple[str, tuple]
+# (cache_key, seconds, error)
+ReportJobResult = Tuple[str, float, Optional[str]]
+
+PROVINCE_REPORTS = ('cadaster_status', 'flag_status', 'diff_cadaster_flag')
+
+# kind -> (cache key builder, scope builder, compute function)
+REPORT_REGISTRY: Dict[str, Tuple[Callable[..., str], Callable[..., str], Callable[..., object]]] = {
+    'cadaster_status': (
+        report_service.cadaster_status_cache_key,
+        province_scope,
+        report_service.compute_cadaster_status_by_province,
+    ),
+    'flag_status': (
+        report_service.flag_status_cache_key,
+        province_scope,
+        report_service.compute_flag_status_by_province,
+    ),
+    'diff_cadaster_flag': (
+        report_service.diff_cadaster_flag_cache_key,
+        province_scope,
+        report_service.compute_diff_cadaster_flag_by_province,
+    ),
+    'national_status': (
+        lambda: report_service.NATIONAL_STATUS_CACHE_KEY,
+        lambda: NATIONAL_SCOPE,
+        lambda: report_service.build_compressed_payload(report_service.compute_national_status_report()),
+    ),
+    'grid': (
+        report_service.grid_aggregation_cache_key,
+        lambda *args: NATIONAL_SCOPE,
+        report_service.compute_grid_aggregation,
+    ),
+}
+
+
+def province_report_jobs(province_ids: Iterable[int]) -> List[ReportJob]:
+    return [(kind, (province_id,)) for province_id in province_ids for kind in PROVINCE_REPORTS]
+
+
+def national_report_jobs(include_grid: bool = True) -> List[ReportJob]:
+    jobs: List[ReportJob] = [('national_status', ())]
+    if include_grid:
+        jobs += [
+            ('grid', (layer, shape, zoom))
+            for layer in report_service.GRID_LAYERS
+            for shape in report_service.GRID_SHAPES
+            for zoom in range(report_service.GRID_MIN_ZOOM, report_service.GRID_NATIONAL_MAX_ZOOM + 1)
+        ]
+    return jobs
+
+
+def all_report_jobs(include_grid: bool = True) -> List[ReportJob]:
+    province_ids = Province.objects.order_by('id').values_list('id', flat=True)
+    return province_report_jobs(province_ids) + national_report_jobs(include_grid)
+
+
+def warm_report(job: ReportJob) -> ReportJobResult:
+    """Recompute and store one report. Never raises (runs in a worker process)"""
+    kind, args = job
+    key_builder, scope_builder, compute = REPORT_REGISTRY[kind]
+    cache_key = key_builder(*args)
+    started = time.perf_counter()
+    try:
+        refresh_report(cache_key, scope_builder(*args), lambda: compute(*args))
+        return cache_key, time.perf_counter() - started, None
+    except Exception as e:
+        return cache_key, time.perf_counter() - started, str(e)
+
+
+def warm_reports(
+    jobs: List[ReportJob],
+    workers: int = 1,
+    on_result: Optional[Callable[[ReportJobResult], None]] = None,
+) -> List[ReportJobResult]:
+    """
+    Run warm-up jobs, in a process pool when workers > 1.
+
+    - DB connections are closed before forking, every worker opens its own
+    - The 'fork' start method is used explicitly: workers inherit the configured Django
+    """
+    results: List[ReportJobResult] = []
+
+    def collect(result: ReportJobResult) -> None:
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            collect(warm_report(job))
+        return results
+
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+    ) as executor:
+        futures = [executor.submit(warm_report, job) for job in jobs]
+        for future in as_completed(futures):
+            collect(future.result())
+    return results
+
+
+def _warm_in_background(jobs: List[ReportJob]) -> None:
+    def run():
+        try:
+            for cache_key, seconds, error in warm_reports(jobs):
+                if error:
+                    print(f"Error in report warm-up {cache_key}: {error}")
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name="report-warmup", daemon=True).start()
+
+
+def schedule_report_warmup(province_ids: Iterable[int]) -> None:
+    """
+    Warm the reports touched by an import once its transaction commits
+    (after report_invalidation_collector bumped the generations).
+    Runs in a background thread of the current process, controlled by REPORT_CACHE['WARM_AFTER_IMPORT'].
+    Grid aggregations are left to the management command (too heavy for a request worker).
+    """
+    if not settings.REPORT_CACHE.get('WARM_AFTER_IMPORT', False):
+        return
+
+    jobs = province_report_jobs([pid for pid in province_ids if pid is not None])
+    jobs += national_report_jobs(include_grid=False)
+    transaction.on_commit(lambda: _warm_in_background(jobs))
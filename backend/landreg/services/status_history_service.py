@@ -0,0 +1,178 @@
+import datetime
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from django.utils import timezone
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncWeek
+
+from common.models import Province
+from accounts.models import User
+from landreg.models.cadaster import Cadaster
+from landreg.models.statushistory import CadasterStatusHistory, CadasterStatusDailyRollup
+
+TREND_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+# (day, province_id, status) -> (entered, left)
+RollupDelta = Dict[Tuple[datetime.date, Optional[int], int], List[int]]
+
+
+def resolve_cadaster_province_id(cadaster: Cadaster) -> Optional[int]:
+    """Province that contains a point of the cadaster border (None if outside all provinces)"""
+    if cadaster.border is None or cadaster.border.empty:
+        return None
+    return Province.objects.filter(
+        border__contains=cadaster.border.point_on_surface
+    ).values_list('id', flat=True).first()
+
+
+def _apply_rollup_deltas(deltas: RollupDelta) -> None:
+    """
+    Upsert the daily counters in one statement:
+    INSERT ... ON CONFLICT (day, province_id, status) DO UPDATE SET count = count + EXCLUDED.count
+    """
+    if not deltas:
+        return
+
+    table = CadasterStatusDailyRollup._meta.db_table
+    values_sql = []
+    params: List[Any] = []
+    for (day, province_id, status_code), (entered, left) in deltas.items():
+        values_sql.append("(%s, %s, %s, %s, %s)")
+        params.extend([day, province_id, status_code, entered, left])
+
+    query = f"""
+        INSERT INTO "{table}" (day, province_id, status, entered_count, left_count)
+        VALUES {', '.join(values_sql)}
+        ON CONFLICT (day, province_id, status) DO UPDATE SET
+            entered_count = "{table}".entered_count + EXCLUDED.entered_count,
+            left_count = "{table}".left_count + EXCLUDED.left_count
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+
+
+def change_cadaster_status(cadaster: Cadaster, new_status: int, user: User) -> Optional[CadasterStatusHistory]:
+    """
+    Change the status of a cadaster, append a history row and update the daily rollup.
+    All three writes share one transaction. The old status is read from the locked row (concurrent
+    changes of the same cadaster are recorded one after the other).
+    Returns None, writing nothing, when the cadaster already has new_status.
+    """
+    now = timezone.now()
+    day = timezone.localdate(now)
+    province_id = resolve_cadaster_province_id(cadaster)
+
+    with transaction.atomic():
+        old_status = Cadaster.objects.select_for_update().values_list('status', flat=True).get(pk=cadaster.pk)
+        cadaster.status = old_status
+        if old_status == new_status:
+            return None
+
+        cadaster.status = new_status
+        cadaster.change_status_date = now
+        cadaster.change_status_by = user
+        cadaster.save(update_fields=['status', 'change_status_date', 'change_status_by', 'updated_at'])
+
+        history = CadasterStatusHistory.objects.create(
+            cadaster=cadaster,
+            province_id=province_id,
+            old_status=old_status,
+            new_status=new_status,
+            changed_by=user,
+            changed_at=now,
+            source=CadasterStatusHistory.Source.MANUAL,
+        )
+
+        _apply_rollup_deltas({
+            (day, province_id, new_status): [1, 0],
+            (day, province_id, old_status): [0, 1],
+        })
+
+    return history
+
+
+def record_imported_cadasters(
+    cadasters: Iterable[Cadaster],
+    province_id: Optional[int] = None,
+    user: Optional[User] = None,
+) -> int:
+    """
+    Append the initial status of freshly imported cadasters to the history.
+    Must be called inside the import transaction: one bulk insert + one rollup upsert.
+    """
+    now = timezone.now()
+    day = timezone.localdate(now)
+
+    history_rows = [
+        CadasterStatusHistory(
+            cadaster=cadaster,
+            province_id=province_id,
+            old_status=None,
+            new_status=cadaster.status,
+            changed_by=user,
+            changed_at=now,
+            source=CadasterStatusHistory.Source.IMPORT,
+        )
+        for cadaster in cadasters
+    ]
+    if not history_rows:
+        return 0
+
+    CadasterStatusHistory.objects.bulk_create(history_rows, batch_size=2000)
+
+    entered = Counter(row.new_status for row in history_rows)
+    _apply_rollup_deltas({
+        (day, province_id, status_code): [count, 0]
+        for status_code, count in entered.items()
+    })
+    return len(history_rows)
+
+
+def get_status_trend(
+    bucket: str,
+    date_from: datetime.date,
+    date_to: datetime.date,
+    province_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Entered / left counts per time bucket and status, read from the daily rollup only.
+    """
+    trunc = TREND_BUCKETS[bucket]
+    queryset = CadasterStatusDailyRollup.objects.filter(day__gte=date_from, day__lte=date_to)
+    if province_id is not None:
+        queryset = queryset.filter(province_id=province_id)
+
+    rows = queryset.annotate(
+        bucket=trunc('day')
+    ).values('bucket', 'status').annotate(
+        entered=Sum('entered_count'),
+        left=Sum('left_count'),
+    ).order_by('bucket', 'status')
+
+    status_labels = dict(Cadaster.cadaster_status)
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        bucket_start = row['bucket']
+        if isinstance(bucket_start, datetime.datetime):
+            bucket_start = bucket_start.date()
+        key = bucket_start.isoformat()
+        item = buckets.setdefault(key, {'bucket_start': key, 'status_breakdown': []})
+        item['status_breakdown'].append({
+            'status_code': row['status'],
+            'status_label': status_labels.get(row['status'], "Unknown"),
+            'entered': row['entered'],
+            'left': row['left'],
+            'net': row['entered'] - row['left'],
+        })
+
+    return {
+        'province_id': province_id,
+        'bucket': bucket,
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'results': list(buckets.values()),
+    }
@@ -0,0 +1,152 @@
+import math
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+from common.services.commit_services import Extent, OnCommitCollector
+
+# (x, y) of a tile at some zoom
+TileXY = Tuple[int, int]
+# (layer, extent in EPSG:4326)
+TileEdit = Tuple[str, Extent]
+
+WEB_MERCATOR_MAX_LAT = 85.0511287798066
+
+
+def _tile_x(lon: float, z: int) -> float:
+    return (lon + 180.0) / 360.0 * (1 << z)
+
+
+def _tile_y(lat: float, z: int) -> float:
+    lat = max(min(lat, WEB_MERCATOR_MAX_LAT), -WEB_MERCATOR_MAX_LAT)
+    lat_rad = math.radians(lat)
+    return (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * (1 << z)
+
+
+def tile_range(extent: Extent, z: int, buffer_ratio: float = 0.0) -> Tuple[int, int, int, int]:
+    """
+    (x_min, x_max, y_min, y_max) of the XYZ tiles an EPSG:4326 extent touches at zoom z.
+    buffer_ratio widens it by that share of a tile: ST_AsMVTGeom also draws features
+    that are within the tile buffer of a neighbour tile.
+    """
+    last = (1 << z) - 1
+    x_min = int(math.floor(_tile_x(extent[0], z) - buffer_ratio))
+    x_max = int(math.floor(_tile_x(extent[2], z) + buffer_ratio))
+    # y grows southwards
+    y_min = int(math.floor(_tile_y(extent[3], z) - buffer_ratio))
+    y_max = int(math.floor(_tile_y(extent[1], z) + buffer_ratio))
+    return max(x_min, 0), min(x_max, last), max(y_min, 0), min(y_max, last)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Extent:
+    """EPSG:4326 extent of an XYZ tile"""
+    n = 1 << z
+
+    def lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y))
+
+
+def tiles_for_extents(
+    extents: Iterable[Extent],
+    z: int,
+    max_tiles: int,
+    buffer_ratio: float = 0.0,
+) -> Optional[Set[TileXY]]:
+    """Tiles covered by any of the extents at zoom z, None when more than max_tiles"""
+    tiles: Set[TileXY] = set()
+    for extent in extents:
+        x_min, x_max, y_min, y_max = tile_range(extent, z, buffer_ratio)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) > max_tiles:
+            return None
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                tiles.add((x, y))
+        if len(tiles) > max_tiles:
+            return None
+    return tiles
+
+
+# ----------------------------- Tile versions -----------------------------
+
+def tile_version_key(layer: str, z: int, x: int, y: int) -> str:
+    return f"mvt_version:{layer}:{z}/{x}/{y}"
+
+
+def zoom_generation_key(layer: str, z: int) -> str:
+    return f"mvt_generation:{layer}:{z}"
+
+
+def get_tile_version(layer: str, z: int, x: int, y: int) -> str:
+    """
+    Opaque version of one tile: the generation of its zoom level + its own version.
+    Both live in the same cache as the tiles: a flush drops versions and tiles together.
+    """
+    generation_key = zoom_generation_key(layer, z)
+    version_key = tile_version_key(layer, z, x, y)
+    values = cache.get_many([generation_key, version_key])
+    return f"{values.get(generation_key, 0)}.{values.get(version_key, 0)}"
+
+
+def bump_tile_versions(layer: str, z: int, tiles: Iterable[TileXY]) -> None:
+    """Make the cached entries of these tiles (every access scope) unreachable"""
+    cache.set_many(
+        {tile_version_key(layer, z, x, y): uuid.uuid4().hex[:12] for x, y in tiles},
+        # A version may expire together with the tiles cached under it (see get_tile_version)
+        timeout=settings.VECTOR_TILES['CACHE_TIMEOUT'],
+    )
+
+
+def bump_zoom_generation(layer: str, z: int) -> None:
+    """Every tile of the zoom level is stale (edit too large to list its tiles)"""
+    cache.set(zoom_generation_key(layer, z), uuid.uuid4().hex[:12], timeout=None)
+
+
+def invalidate_tiles(edits: List[TileEdit]) -> Dict[str, Dict[int, int]]:
+    """
+    Invalidate every cached tile covering the edited extents, per layer and zoom of the
+    configured range. Returns {layer: {zoom: tiles bumped (-1 = whole zoom level)}}.
+    """
+    from landreg.services.tile_service import MVT_BUFFER, MVT_EXTENT, TILE_LAYERS
+
+    by_layer: Dict[str, List[Extent]] = defaultdict(list)
+    for layer, extent in edits:
+        if layer in TILE_LAYERS:
+            by_layer[layer].append(extent)
+
+    max_tiles = settings.VECTOR_TILES['INVALIDATION_MAX_TILES']
+    buffer_ratio = MVT_BUFFER / MVT_EXTENT
+    summary: Dict[str, Dict[int, int]] = {}
+    for layer, extents in by_layer.items():
+        summary[layer] = {}
+        min_zoom = max(settings.VECTOR_TILES['MIN_ZOOM'], TILE_LAYERS[layer]['min_zoom'])
+        for z in range(min_zoom, settings.VECTOR_TILES['MAX_ZOOM'] + 1):
+            tiles = tiles_for_extents(extents, z, max_tiles, buffer_ratio)
+            if tiles is None:
+                bump_zoom_generation(layer, z)
+                summary[layer][z] = -1
+            elif tiles:
+                bump_tile_versions(layer, z, tiles)
+                summary[layer][z] = len(tiles)
+    return summary
+
+
+def _invalidate_collected(edits: List[TileEdit]) -> None:
+    invalidate_tiles(edits)
+
+
+tile_invalidation_collector = OnCommitCollector(handler=_invalidate_collected, name="tile_invalidation")
+
+
+def invalidate_tiles_for_geometry(layers: Iterable[str], geometry) -> None:
+    """
+    Queue invalidation of the tiles of `layers` covering the geometry.
+    Coalesced per transaction: the tile set of a bulk import is computed once, on commit.
+    """
+    if geometry is None or geometry.empty:
+        return
+    for layer in layers:
+        tile_invalidation_collector.add((layer, geometry.extent))
@@ -0,0 +1,512 @@
+"""
+Offline vector tile packages (MBTiles / PMTiles) of a province or a pelak.
+
+- Every package is built as MBTiles (the PMTiles file is converted from it)
+- The MBTiles file keeps the fingerprint (tile versions of every layer) of each tile:
+  the next build of the same package copies the tiles whose fingerprint did not change
+- Tiles are rendered by PostGIS in parallel threads (one DB connection per chunk)
+- API requests are queued as TilePackageJob rows and built by `manage.py tile_package_worker`,
+  the API only serves finished files
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.gis.geos import GEOSGeometry, Polygon
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from pmtiles.convert import mbtiles_to_pmtiles
+
+from accounts.models import User
+from common.models import Province
+from landreg.models.pelak import Pelak
+from landreg.models.tilepackage import TilePackageJob
+from landreg.services.tile_invalidation_service import (
+    tile_bounds,
+    tile_range,
+    tile_version_key,
+    zoom_generation_key,
+)
+from landreg.services.access_service import AccessSnapshot
+from landreg.services.tile_service import TILE_LAYERS, compute_tile_layers
+
+PACKAGE_LAYERS = ['pelak', 'cadaster', 'flag']
+PACKAGE_FORMATS = ('mbtiles', 'pmtiles')
+# Tiles rendered per worker task (one DB connection each)
+RENDER_CHUNK_SIZE = 256
+# Versions read per cache round trip
+FINGERPRINT_BATCH = 1000
+# The builder refreshes its lock while it works: a killed build frees the package within this time
+PACKAGE_LOCK_TIMEOUT = 5 * 60
+# A running job without heartbeat for this long is taken over by another worker
+JOB_LEASE_SECONDS = 10 * 60
+JOB_HEARTBEAT_SECONDS = 30
+JOB_MAX_ATTEMPTS = 3
+# Delay before a job blocked by a build of the same package (or a failed attempt) is tried again
+JOB_RETRY_SECONDS = 30
+
+# (z, x, y) in the XYZ scheme
+TileZXY = Tuple[int, int, int]
+
+
+class TilePackageError(Exception):
+    pass
+
+
+class TilePackageBusy(TilePackageError):
+    """The same package is being built by someone else"""
+    pass
+
+
+def package_area(province_id: Optional[int] = None, pelak_id: Optional[str] = None) -> Tuple[str, GEOSGeometry]:
+    """
+    (package name, area geometry) of a province or a pelak
+
+    Raises:
+        Province.DoesNotExist
+        Pelak.DoesNotExist
+    """
+    if pelak_id is not None:
+        pelak_instance = Pelak.objects.only('number', 'border').get(pk=pelak_id)
+        return f"pelak_{pelak_instance.number}", pelak_instance.border
+    province_instance = Province.objects.only('id', 'border').get(pk=province_id)
+    return f"province_{province_instance.id}", province_instance.border
+
+
+def package_tiles(area: GEOSGeometry, min_zoom: int, max_zoom: int) -> List[TileZXY]:
+    """Tiles of the zoom range that intersect the area (not only its bbox)"""
+    prepared = area.prepared
+    tiles: List[TileZXY] = []
+    for z in range(min_zoom, max_zoom + 1):
+        x_min, x_max, y_min, y_max = tile_range(area.extent, z)
+        for x in range(x_min, x_max + 1):
+            for y in range(y_min, y_max + 1):
+                envelope = Polygon.from_bbox(tile_bounds(z, x, y))
+                envelope.srid = area.srid
+                if prepared.intersects(envelope):
+                    tiles.append((z, x, y))
+    return tiles
+
+
+def count_package_tiles(area: GEOSGeometry, min_zoom: int, max_zoom: int) -> int:
+    """Upper bound (bbox tiles) of package_tiles, cheap enough to reject huge requests"""
+    total = 0
+    for z in range(min_zoom, max_zoom + 1):
+        x_min, x_max, y_min, y_max = tile_range(area.extent, z)
+        total += (x_max - x_min + 1) * (y_max - y_min + 1)
+    return total
+
+
+def check_package_size(area: GEOSGeometry, min_zoom: int, max_zoom: int) -> None:
+    """Raises TilePackageError when the package would go over TILE_PACKAGES MAX_TILES"""
+    tile_count = count_package_tiles(area, min_zoom, max_zoom)
+    if tile_count > settings.TILE_PACKAGES['MAX_TILES']:
+        raise TilePackageError(
+            f"تعداد تایل‌های بسته ({tile_count}) بیشتر از حد مجاز ({settings.TILE_PACKAGES['MAX_TILES']}) است، بازه زوم را کوچک‌تر کنید"
+        )
+
+
+def tile_fingerprints(tiles: List[TileZXY], scope: str) -> Dict[TileZXY, str]:
+    """
+    Fingerprint of each tile = access scope + version of the tile in every layer.
+    An edit bumps the versions of the tiles it covers (tile_invalidation_service) -> new fingerprint.
+    """
+    fingerprints: Dict[TileZXY, str] = {}
+    for start in range(0, len(tiles), FINGERPRINT_BATCH):
+        batch = tiles[start:start + FINGERPRINT_BATCH]
+        keys = set()
+        for z, x, y in batch:
+            for layer in PACKAGE_LAYERS:
+                keys.add(zoom_generation_key(layer, z))
+                keys.add(tile_version_key(layer, z, x, y))
+        values = cache.get_many(list(keys))
+        for z, x, y in batch:
+            parts = [scope]
+            for layer in PACKAGE_LAYERS:
+                parts.append(str(values.get(zoom_generation_key(layer, z), 0)))
+                parts.append(str(values.get(tile_version_key(layer, z, x, y), 0)))
+            fingerprints[(z, x, y)] = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+def package_path(name: str, scope: str, min_zoom: int, max_zoom: int, package_format: str) -> str:
+    directory = settings.TILE_PACKAGES['DIR']
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{name}_{scope}_z{min_zoom}-{max_zoom}.{package_format}")
+
+
+# ----------------------------- MBTiles -----------------------------
+
+def _create_mbtiles(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    db.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+        CREATE TABLE tile_fingerprints (
+            zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, fingerprint TEXT,
+            PRIMARY KEY (zoom_level, tile_column, tile_row)
+        );
+    """)
+    return db
+
+
+def _tms_row(z: int, y: int) -> int:
+    # MBTiles uses the TMS scheme (y grows northwards)
+    return (1 << z) - 1 - y
+
+
+def _read_previous_fingerprints(path: str) -> Dict[TileZXY, str]:
+    """Fingerprints of an existing package, empty when it is missing or too old to be trusted"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            built_at = db.execute("SELECT value FROM metadata WHERE name = 'built_at'").fetchone()
+            # Tile versions expire with the tile cache: an older fingerprint could match by accident
+            if built_at is None or time.time() - float(built_at[0]) >= settings.VECTOR_TILES['CACHE_TIMEOUT']:
+                return {}
+            return {
+                (z, x, _tms_row(z, row)): fingerprint
+                for z, x, row, fingerprint in db.execute(
+                    "SELECT zoom_level, tile_column, tile_row, fingerprint FROM tile_fingerprints"
+                )
+            }
+        finally:
+            db.close()
+    except sqlite3.Error as e:
+        print(f"Error in reading previous tile package {path}: {e}")
+        return {}
+
+
+def _render_chunk(tiles: List[TileZXY], access: AccessSnapshot) -> List[Tuple[TileZXY, bytes]]:
+    try:
+        return [
+            ((z, x, y), compute_tile_layers(PACKAGE_LAYERS, z, x, y, access))
+            for z, x, y in tiles
+        ]
+    finally:
+        # Worker threads get their own connection, do not leave it open
+        connection.close()
+
+
+def _render_tiles(tiles: List[TileZXY], access: AccessSnapshot, workers: int) -> Iterator[Tuple[TileZXY, bytes]]:
+    chunks = [tiles[i:i + RENDER_CHUNK_SIZE] for i in range(0, len(tiles), RENDER_CHUNK_SIZE)]
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))), thread_name_prefix="tile-package") as executor:
+        for rendered in executor.map(lambda chunk: _render_chunk(chunk, access), chunks):
+            yield from rendered
+
+
+def build_mbtiles(
+    path: str,
+    name: str,
+    area: GEOSGeometry,
+    access: AccessSnapshot,
+    min_zoom: int,
+    max_zoom: int,
+    workers: int,
+    heartbeat: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """
+    (Re)build the MBTiles package at path, reusing unchanged tiles of the previous one.
+    heartbeat is called after the reused tiles are copied and every RENDER_CHUNK_SIZE rendered tiles.
+    """
+    heartbeat = heartbeat or (lambda: None)
+    tiles = package_tiles(area, min_zoom, max_zoom)
+    fingerprints = tile_fingerprints(tiles, access.scope)
+    previous = _read_previous_fingerprints(path)
+
+    reused = [tile for tile in tiles if previous.get(tile) == fingerprints[tile]]
+    reused_set = set(reused)
+    to_render = [tile for tile in tiles if tile not in reused_set]
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    db = _create_mbtiles(tmp_path)
+    try:
+        if reused:
+            db.execute("ATTACH DATABASE ? AS previous", (path,))
+            db.execute("CREATE TEMP TABLE reused (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER)")
+            db.executemany(
+                "INSERT INTO reused VALUES (?, ?, ?)",
+                ((z, x, _tms_row(z, y)) for z, x, y in reused),
+            )
+            db.execute("""
+                INSERT INTO tiles
+                SELECT t.zoom_level, t.tile_column, t.tile_row, t.tile_data
+                FROM previous.tiles t
+                JOIN reused r USING (zoom_level, tile_column, tile_row)
+            """)
+            db.commit()
+            db.execute("DETACH DATABASE previous")
+            heartbeat()
+
+        rendered_count = 0
+        empty_count = 0
+        batch = []
+        for (z, x, y), tile in _render_tiles(to_render, access, workers):
+            rendered_count += 1
+            # Empty tiles store nothing but take as long to render: beat on rendered, not stored tiles
+            if rendered_count % RENDER_CHUNK_SIZE == 0:
+                heartbeat()
+            if not tile:
+                # Missing tile = empty tile for MBTiles readers
+                empty_count += 1
+                continue
+            batch.append((z, x, _tms_row(z, y), gzip.compress(tile, compresslevel=6)))
+            if len(batch) >= 500:
+                db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", batch)
+
+        db.executemany(
+            "INSERT INTO tile_fingerprints VALUES (?, ?, ?, ?)",
+            ((z, x, _tms_row(z, y), fingerprints[(z, x, y)]) for z, x, y in tiles),
+        )
+
+        xmin, ymin, xmax, ymax = area.extent
+        metadata = {
+            'name': name,
+            'format': 'pbf',
+            'type': 'overlay',
+            'minzoom': str(min_zoom),
+            'maxzoom': str(max_zoom),
+            'bounds': f"{xmin},{ymin},{xmax},{ymax}",
+            'center': f"{(xmin + xmax) / 2},{(ymin + ymax) / 2},{min_zoom}",
+            'json': _vector_layers_json(min_zoom, max_zoom),
+            'built_at': str(time.time()),
+            'scope': access.scope,
+        }
+        db.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+        db.commit()
+        stored_count = db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+        db.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        db.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return {
+        'tiles': len(tiles),
+        'reused': len(reused),
+        'rendered': rendered_count,
+        'empty': empty_count,
+        'stored': stored_count,
+    }
+
+
+def _vector_layers_json(min_zoom: int, max_zoom: int) -> str:
+    return json.dumps({
+        'vector_layers': [
+            {
+                'id': layer,
+                'fields': {column: 'String' for column in TILE_LAYERS[layer]['columns']},
+                'minzoom': max(min_zoom, TILE_LAYERS[layer]['min_zoom']),
+                'maxzoom': max_zoom,
+            }
+            for layer in PACKAGE_LAYERS
+        ]
+    })
+
+
+# ----------------------------- Package -----------------------------
+
+def build_tile_package(
+    access: AccessSnapshot,
+    province_id: Optional[int] = None,
+    pelak_id: Optional[str] = None,
+    min_zoom: Optional[int] = None,
+    max_zoom: Optional[int] = None,
+    package_format: str = 'mbtiles',
+    workers: Optional[int] = None,
+    heartbeat: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Build (or refresh) the package of a province or a pelak for the given access.
+    Returns {'path', 'format', ...build stats}.
+
+    Raises:
+        TilePackageError: too many tiles / nothing to package
+        TilePackageBusy: package already being built
+        Province.DoesNotExist
+        Pelak.DoesNotExist
+    """
+    min_zoom = settings.TILE_PACKAGES['MIN_ZOOM'] if min_zoom is None else min_zoom
+    max_zoom = settings.TILE_PACKAGES['MAX_ZOOM'] if max_zoom is None else max_zoom
+    workers = workers or settings.TILE_PACKAGES['WORKERS']
+
+    name, area = package_area(province_id=province_id, pelak_id=pelak_id)
+    check_package_size(area, min_zoom, max_zoom)
+
+    mbtiles_path = package_path(name, access.scope, min_zoom, max_zoom, 'mbtiles')
+    lock_key = f"tile_package_lock:{os.path.basename(mbtiles_path)}"
+    if not cache.add(lock_key, 1, timeout=PACKAGE_LOCK_TIMEOUT):
+        raise TilePackageBusy("این بسته در حال ساخت است، کمی بعد دوباره تلاش کنید")
+
+    def keep_lock() -> None:
+        cache.touch(lock_key, PACKAGE_LOCK_TIMEOUT)
+        if heartbeat is not None:
+            heartbeat()
+
+    try:
+        stats = build_mbtiles(
+            path=mbtiles_path,
+            name=name,
+            area=area,
+            access=access,
+            min_zoom=min_zoom,
+            max_zoom=max_zoom,
+            workers=workers,
+            heartbeat=keep_lock,
+        )
+        if not stats['stored']:
+            raise TilePackageError("داده‌ای برای این محدوده یافت نشد")
+
+        path = mbtiles_path
+        if package_format == 'pmtiles':
+            path = package_path(name, access.scope, min_zoom, max_zoom, 'pmtiles')
+            tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+            try:
+                mbtiles_to_pmtiles(mbtiles_path, tmp_path, None)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    finally:
+        cache.delete(lock_key)
+
+    return {'path': path, 'format': package_format, **stats}
+
+
+# ----------------------------- Jobs (API requests) -----------------------------
+
+def request_tile_package(
+    user: User,
+    access: AccessSnapshot,
+    province_id: Optional[int] = None,
+    pelak_id: Optional[str] = None,
+    min_zoom: Optional[int] = None,
+    max_zoom: Optional[int] = None,
+    package_format: str = 'mbtiles',
+) -> TilePackageJob:
+    """
+    Queue the package for the worker. A pending / running job of the same package and access
+    is returned instead of a new one.
+
+    Raises:
+        TilePackageError: too many tiles
+        Province.DoesNotExist
+        Pelak.DoesNotExist
+    """
+    min_zoom = settings.TILE_PACKAGES['MIN_ZOOM'] if min_zoom is None else min_zoom
+    max_zoom = settings.TILE_PACKAGES['MAX_ZOOM'] if max_zoom is None else max_zoom
+    _, area = package_area(province_id=province_id, pelak_id=pelak_id)
+    check_package_size(area, min_zoom, max_zoom)
+
+    fields = {
+        'user': user,
+        'province_id': None if pelak_id is not None else province_id,
+        'pelak_id': pelak_id,
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'package_format': package_format,
+        'scope': access.scope,
+    }
+    job = TilePackageJob.objects.filter(
+        status__in=[TilePackageJob.Status.PENDING, TilePackageJob.Status.RUNNING], **fields
+    ).order_by('-id').first()
+    if job is None:
+        job = TilePackageJob.objects.create(
+            access={'pelak_numbers': access.pelak_numbers, 'province_ids': access.province_ids},
+            **fields,
+        )
+    return job
+
+
+def claim_tile_package_job() -> Optional[TilePackageJob]:
+    """
+    Take the next due job (or a running one whose worker stopped sending heartbeats) in a short
+    transaction. Jobs that already used up their attempts that way are marked failed.
+    """
+    now = timezone.now()
+    stale = Q(status=TilePackageJob.Status.RUNNING, heartbeat_at__lt=now - timedelta(seconds=JOB_LEASE_SECONDS))
+    with transaction.atomic():
+        TilePackageJob.objects.filter(stale, attempts__gte=JOB_MAX_ATTEMPTS).update(
+            status=TilePackageJob.Status.FAILED,
+            error="ساخت بسته متوقف شد",
+            finished_at=now,
+        )
+        job = TilePackageJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=TilePackageJob.Status.PENDING, next_attempt_at__lte=now) | stale
+        ).order_by('id').first()
+        if job is None:
+            return None
+        job.status = TilePackageJob.Status.RUNNING
+        job.attempts += 1
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'heartbeat_at'])
+    return job
+
+
+def run_tile_package_job(job: TilePackageJob, workers: Optional[int] = None) -> None:
+    """Build the package of a claimed job and store the outcome on it"""
+    last_beat = time.monotonic()
+
+    def heartbeat() -> None:
+        nonlocal last_beat
+        if time.monotonic() - last_beat >= JOB_HEARTBEAT_SECONDS:
+            last_beat = time.monotonic()
+            TilePackageJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+    job.error = ""
+    try:
+        result = build_tile_package(
+            access=AccessSnapshot(**job.access),
+            province_id=job.province_id,
+            pelak_id=job.pelak_id,
+            min_zoom=job.min_zoom,
+            max_zoom=job.max_zoom,
+            package_format=job.package_format,
+            workers=workers,
+            heartbeat=heartbeat,
+        )
+    except TilePackageBusy:
+        # Built by someone else right now: the next build reuses its tiles
+        job.status = TilePackageJob.Status.PENDING
+        job.attempts -= 1
+        job.next_attempt_at = timezone.now() + timedelta(seconds=JOB_RETRY_SECONDS)
+    except (TilePackageError, Province.DoesNotExist, Pelak.DoesNotExist) as e:
+        job.status = TilePackageJob.Status.FAILED
+        job.error = str(e) if isinstance(e, TilePackageError) else "محدوده بسته یافت نشد"
+    except Exception as e:
+        print(f"Error in tile package job #{job.pk}: {str(e)}")
+        job.error = "خطا در ساخت بسته آفلاین نقشه"
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job.status = TilePackageJob.Status.FAILED
+        else:
+            job.status = TilePackageJob.Status.PENDING
+            job.next_attempt_at = timezone.now() + timedelta(seconds=JOB_RETRY_SECONDS * job.attempts)
+    else:
+        job.status = TilePackageJob.Status.DONE
+        job.path = result.pop('path')
+        job.stats = result
+
+    if job.status in (TilePackageJob.Status.DONE, TilePackageJob.Status.FAILED):
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'attempts', 'next_attempt_at', 'path', 'stats', 'error', 'finished_at'])
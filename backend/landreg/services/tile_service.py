@@ -0,0 +1,197 @@
+import gzip
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from common.models import Province
+from landreg.models.cadaster import Cadaster
+from landreg.models.flag import Flag
+from landreg.models.generalized import GeneralizedBorder
+from landreg.models.pelak import Pelak
+from landreg.services.access_service import AccessSnapshot
+from landreg.services.generalization_service import generalized_border_sql
+from landreg.services.tile_invalidation_service import get_tile_version
+
+# MVT extent / buffer (in tile pixels) of ST_AsMVTGeom
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+EMPTY_TILE_ETAG = f'"{hashlib.sha1(b"").hexdigest()}"'
+
+# layer -> table, exposed columns (besides the geometry), access filter kind, min zoom,
+# generalized border source (low zooms read the simplified copies, see generalization_service)
+TILE_LAYERS: Dict[str, Dict[str, Any]] = {
+    'cadaster': {
+        'table': Cadaster._meta.db_table,
+        'columns': ['id', 'status', 'uniquecode', 'plak_name', 'plak_asli', 'plak_farei', 'area'],
+        'access': 'intersects',
+        'min_zoom': 10,
+        'generalized': GeneralizedBorder.Source.CADASTER,
+    },
+    'flag': {
+        'table': Flag._meta.db_table,
+        'columns': ['id', 'status', 'cadaster_id'],
+        'access': 'intersects',
+        'min_zoom': 10,
+    },
+    'pelak': {
+        'table': Pelak._meta.db_table,
+        'columns': ['number', 'title', 'verify', 'provinces_id'],
+        'access': 'pelak',
+        'min_zoom': 5,
+        'generalized': GeneralizedBorder.Source.PELAK,
+    },
+    'province': {
+        'table': Province._meta.db_table,
+        'columns': ['id', 'name_fa', 'code'],
+        'access': 'public',
+        'min_zoom': 0,
+        'generalized': GeneralizedBorder.Source.PROVINCE,
+    },
+}
+
+
+def tile_is_valid(z: int, x: int, y: int) -> bool:
+    return (
+        settings.VECTOR_TILES['MIN_ZOOM'] <= z <= settings.VECTOR_TILES['MAX_ZOOM']
+        and 0 <= x < 2 ** z
+        and 0 <= y < 2 ** z
+    )
+
+
+def _access_filter(layer: str, access: AccessSnapshot) -> Tuple[str, List[Any]]:
+    """SQL condition on the feature row `t` (and its parameters) restricting it to the user access"""
+    if access.is_full or TILE_LAYERS[layer]['access'] == 'public':
+        return "TRUE", []
+    if TILE_LAYERS[layer]['access'] == 'pelak':
+        return "(t.number = ANY(%s) OR t.provinces_id = ANY(%s))", [access.pelak_numbers, access.province_ids]
+    # Precomputed, subdivided area of the granted pelaks / provinces
+    return access.area_filter_sql("t.border")
+
+
+def compute_tile(layer: str, z: int, x: int, y: int, access: AccessSnapshot) -> bytes:
+    """
+    One Mapbox Vector Tile built by PostGIS (ST_AsMVTGeom / ST_AsMVT).
+    The bbox filter runs on the 4326 geometry (spatial index), only matched rows are projected.
+    Low zooms project the generalized border of the zoom level instead of the full resolution one.
+    """
+    layer_config = TILE_LAYERS[layer]
+    if z < layer_config['min_zoom']:
+        return b""
+
+    columns = ", ".join(f't."{column}"' for column in layer_config['columns'])
+    geometry_sql, geometry_params, join_sql, join_params = generalized_border_sql(
+        layer_config.get('generalized'), 't', z
+    )
+    access_sql, access_params = _access_filter(layer, access)
+    query = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%s, %s, %s) AS geom_3857,
+                   ST_Transform(ST_TileEnvelope(%s, %s, %s), 4326) AS geom_4326
+        ),
+        mvtgeom AS (
+            SELECT ST_AsMVTGeom(ST_Transform({geometry_sql}, 3857), bounds.geom_3857, %s, %s, true) AS geom,
+                   {columns}
+            FROM bounds, "{layer_config['table']}" t
+            {join_sql}
+            WHERE t.border && bounds.geom_4326
+              AND {access_sql}
+        )
+        SELECT ST_AsMVT(mvtgeom.*, %s, %s, 'geom') FROM mvtgeom WHERE geom IS NOT NULL
+    """
+    params = [
+        z, x, y, z, x, y,
+        *geometry_params, MVT_EXTENT, MVT_BUFFER,
+        *join_params,
+        *access_params,
+        layer, MVT_EXTENT,
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b""
+
+
+def compute_tile_layers(layers: List[str], z: int, x: int, y: int, access: AccessSnapshot) -> bytes:
+    """
+    One tile holding several layers: an MVT tile is a list of layers,
+    so the single layer tiles of ST_AsMVT are simply concatenated
+    """
+    return b"".join(compute_tile(layer, z, x, y, access) for layer in layers)
+
+
+def geojson_features(
+    layer: str,
+    z: int,
+    bbox: Optional[Tuple[float, float, float, float]],
+    access: AccessSnapshot,
+    limit: int,
+) -> Tuple[List[str], bool]:
+    """
+    GeoJSON Feature texts of a layer for a map at zoom z (generalized border of the zoom level),
+    optionally inside an EPSG:4326 bbox. Returns (features, truncated at limit).
+    """
+    layer_config = TILE_LAYERS[layer]
+    if z < layer_config['min_zoom']:
+        return [], False
+
+    pk_column = layer_config['columns'][0]
+    properties = ", ".join(f"'{column}', t.\"{column}\"" for column in layer_config['columns'])
+    geometry_sql, geometry_params, join_sql, join_params = generalized_border_sql(
+        layer_config.get('generalized'), 't', z
+    )
+    access_sql, access_params = _access_filter(layer, access)
+    bbox_sql, bbox_params = "TRUE", []
+    if bbox is not None:
+        bbox_sql, bbox_params = "t.border && ST_MakeEnvelope(%s, %s, %s, %s, 4326)", list(bbox)
+
+    query = f"""
+        SELECT json_build_object(
+            'type', 'Feature',
+            'id', t."{pk_column}",
+            'geometry', ST_AsGeoJSON({geometry_sql}, 6)::json,
+            'properties', json_build_object({properties})
+        )::text
+        FROM "{layer_config['table']}" t
+        {join_sql}
+        WHERE {bbox_sql}
+          AND {access_sql}
+        ORDER BY t."{pk_column}"
+        LIMIT %s
+    """
+    params = [*geometry_params, *join_params, *bbox_params, *access_params, limit + 1]
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        features = [row[0] for row in cursor.fetchall()]
+    return features[:limit], len(features) > limit
+
+
+def build_tile_payload(tile: bytes) -> Dict[str, Any]:
+    """gzip compressed tile + a strong ETag of the uncompressed tile"""
+    if not tile:
+        return {'etag': EMPTY_TILE_ETAG, 'gzip': b""}
+    return {
+        'etag': f'"{hashlib.sha1(tile).hexdigest()}"',
+        'gzip': gzip.compress(tile, compresslevel=6),
+    }
+
+
+def tile_cache_key(layer: str, z: int, x: int, y: int, scope: str, version: str) -> str:
+    return f"mvt:{layer}:{z}/{x}/{y}:{scope}:{version}"
+
+
+def get_tile(layer: str, z: int, x: int, y: int, access: AccessSnapshot) -> Dict[str, Any]:
+    """
+    {'etag': ..., 'gzip': ...} of a tile, cached per (layer, z/x/y, access scope).
+    The key includes the tile version: edits bump only the tiles they cover
+    (see tile_invalidation_service).
+    """
+    cache_key = tile_cache_key(layer, z, x, y, access.scope, get_tile_version(layer, z, x, y))
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = build_tile_payload(compute_tile(layer, z, x, y, access))
+        cache.set(cache_key, payload, timeout=settings.VECTOR_TILES['CACHE_TIMEOUT'])
+    return payload
@@ -1,11 +1,25 @@
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, pre_save, post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.conf import settings
 
+from accounts.models import User, UserPelakPermission
+from common.models import Company, Province
+from landreg.models.cadaster import Cadaster
+from landreg.models.flag import Flag
+from landreg.models.generalized import GeneralizedBorder
+from landreg.models.pelak import Pelak
+from landreg.services.access_service import bump_area_generation_on_commit, invalidate_snapshots_on_commit
+from landreg.services.generalization_service import refresh_generalized_borders_on_commit
+from landreg.services.report_cache_service import invalidate_reports_for_geometry
+from landreg.services.tile_invalidation_service import invalidate_tiles_for_geometry
+from geoserverapp.services.layer_version import bump_layer_version_on_commit
+from geoserverapp.services.tile_cache_service import truncate_tiles_for_geometries
+
 @receiver(post_migrate)
-def publish_pelak_layers_after_migrate(sender, **kwargs):
+def publish_landreg_layers_after_migrate(sender, **kwargs):
     """
-    After migrations run, publish specific PostGIS tables to GeoServer.
+    After migrations run, publish specific PostGIS tables (Pelak, Cadaster, Flag) to GeoServer
+    in one batch (one store check, concurrent publishes).
     """
     # Only run for your app, not every app
     if sender.name != "landreg":
@@ -18,66 +32,168 @@ def publish_pelak_layers_after_migrate(sender, **kwargs):
 
 
     try:
-        gs_result = geoserver_service.pulish_layer(
+        gs_results = geoserver_service.publish_layers(
             workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
             store_name=settings.GEOSERVER['DEFAULT_STORE'],
-            pg_table=Pelak._meta.db_table,
-            title=Pelak._meta.db_table,
+            pg_tables=[Pelak._meta.db_table, Cadaster._meta.db_table, Flag._meta.db_table],
         )
-        print("GeoServer response for Pulish Pelak layer:", gs_result)
+        for gs_result in gs_results:
+            print(f"GeoServer response for Pulish {gs_result['pg_table']} layer:", gs_result)
     except Exception as e:
-        print("Failed to publish layerfor Pulish Pelak layer:", e)
+        print("Failed to publish landreg layers:", e)
 
-@receiver(post_migrate)
-def publish_cadaster_layers_after_migrate(sender, **kwargs):
+
+@receiver([post_save, post_delete], sender=Cadaster)
+def invalidate_reports_on_cadaster_change(sender, instance, **kwargs):
     """
-    After migrations run, publish specific PostGIS tables to GeoServer.
+    A cadaster status/border change (or create/delete) changes the reports of every
+    province it touches. Coalesced per transaction, runs after commit.
     """
-    # Only run for your app, not every app
-    if sender.name != "landreg":
-        return
+    invalidate_reports_for_geometry(instance.border)
 
-    # Import inside to avoid circular imports
-    from geoserverapp.services.geoserver_service import GeoServerService
-    from landreg.models.cadaster import Cadaster
-    geoserver_service = GeoServerService()
+@receiver([post_save, post_delete], sender=Flag)
+def invalidate_reports_on_flag_change(sender, instance, **kwargs):
+    """
+    A flag changes the flag status report of its province and the cadaster/flag diff
+    report of every province its cadaster touches.
+    """
+    geometry = instance.border
+    if Flag.cadaster.is_cached(instance):
+        geometry = instance.cadaster.border
+    else:
+        cadaster_border = Cadaster.objects.filter(pk=instance.cadaster_id).values_list('border', flat=True).first()
+        if cadaster_border is not None:
+            geometry = cadaster_border
+    invalidate_reports_for_geometry(geometry)
 
+@receiver([post_save, post_delete], sender=Pelak)
+@receiver([post_save, post_delete], sender=Cadaster)
+@receiver([post_save, post_delete], sender=Flag)
+def bump_layer_version_on_change(sender, instance, **kwargs):
+    """
+    The published GeoServer layer of this model changed: cached downloads keyed by the old
+    layer version are not reused. Coalesced per transaction, runs after commit.
+    """
+    bump_layer_version_on_commit(settings.GEOSERVER['DEFAULT_WORKSPACE'], sender._meta.db_table)
 
-    try:
-        gs_result = geoserver_service.pulish_layer(
-            workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
-            store_name=settings.GEOSERVER['DEFAULT_STORE'],
-            pg_table=Cadaster._meta.db_table,
-            title=Cadaster._meta.db_table,
-        )
-        print("GeoServer response for Pulish Cadaster layer:", gs_result)
-    except Exception as e:
-        print("Failed to publish layerfor Pulish Cadaster layer:", e)
+@receiver([post_save, post_delete], sender=Cadaster)
+@receiver([post_save, post_delete], sender=Flag)
+def truncate_tiles_on_change(sender, instance, **kwargs):
+    """
+    Cadaster status / flags drive the symbology of the published layers: drop the GeoWebCache
+    tiles of the changed area, old and new place of a moved border (see remember_old_border_for_tiles).
+    Coalesced per transaction, queued in the outbox after commit.
+    """
+    geometries = [instance.border]
+    old_border = getattr(instance, '_tile_old_border', None)
+    if old_border is not None and not old_border.equals_exact(instance.border):
+        geometries.append(old_border)
+    truncate_tiles_for_geometries(sender._meta.db_table, geometries)
 
-@receiver(post_migrate)
-def publish_flag_layers_after_migrate(sender, **kwargs):
+# Vector tile layers drawn from each model. A pelak / province border is also the access area of
+# the cadaster / flag tiles of the users granted that pelak / province.
+TILE_LAYERS_OF_MODEL = {
+    Cadaster: ('cadaster',),
+    Flag: ('flag',),
+    Pelak: ('pelak', 'cadaster', 'flag'),
+    Province: ('province', 'cadaster', 'flag'),
+}
+
+@receiver(pre_save, sender=Province)
+@receiver(pre_save, sender=Pelak)
+@receiver(pre_save, sender=Cadaster)
+@receiver(pre_save, sender=Flag)
+def remember_old_border_for_tiles(sender, instance, update_fields=None, **kwargs):
     """
-    After migrations run, publish specific PostGIS tables to GeoServer.
+    A moved geometry leaves stale tiles at its old place too, an unchanged one needs no new
+    generalized copies (one query, only for border edits)
     """
-    # Only run for your app, not every app
-    if sender.name != "landreg":
+    if instance._state.adding or (update_fields is not None and 'border' not in update_fields):
         return
+    instance._tile_old_border = sender.objects.filter(pk=instance.pk).values_list('border', flat=True).first()
 
-    # Import inside to avoid circular imports
-    from geoserverapp.services.geoserver_service import GeoServerService
-    from landreg.models.flag import Flag
-    geoserver_service = GeoServerService()
+GENERALIZED_SOURCE_OF_MODEL = {
+    Cadaster: GeneralizedBorder.Source.CADASTER,
+    Pelak: GeneralizedBorder.Source.PELAK,
+    Province: GeneralizedBorder.Source.PROVINCE,
+}
 
+# Connected before invalidate_tiles_on_change: on commit the copies of a saved row are rebuilt
+# before its tile versions are bumped, tiles drawn from a stale copy stay under the old version
+@receiver([post_save, post_delete], sender=Province)
+@receiver([post_save, post_delete], sender=Pelak)
+@receiver([post_save, post_delete], sender=Cadaster)
+def refresh_generalized_borders_on_change(sender, instance, created=False, update_fields=None, **kwargs):
+    """Rebuild the generalized copies of a created / deleted / moved border, after commit"""
+    if kwargs['signal'] is post_save and not created and not _border_changed(instance, update_fields):
+        return
+    refresh_generalized_borders_on_commit(GENERALIZED_SOURCE_OF_MODEL[sender], [instance.pk])
 
-    try:
-        gs_result = geoserver_service.pulish_layer(
-            workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
-            store_name=settings.GEOSERVER['DEFAULT_STORE'],
-            pg_table=Flag._meta.db_table,
-            title=Flag._meta.db_table,
+def _border_changed(instance, update_fields) -> bool:
+    """Border of a saved (not created) row changed, see remember_old_border_for_tiles"""
+    if update_fields is not None and 'border' not in update_fields:
+        return False
+    old_border = getattr(instance, '_tile_old_border', None)
+    return old_border is None or not old_border.equals_exact(instance.border)
+
+@receiver([post_save, post_delete], sender=Province)
+@receiver([post_save, post_delete], sender=Pelak)
+@receiver([post_save, post_delete], sender=Cadaster)
+@receiver([post_save, post_delete], sender=Flag)
+def invalidate_tiles_on_change(sender, instance, **kwargs):
+    """
+    Bump the versions of the cached vector tiles covering the old and new geometry.
+    Coalesced per transaction (a bulk import computes its tile set once), runs after commit.
+    """
+    layers = TILE_LAYERS_OF_MODEL[sender]
+    invalidate_tiles_for_geometry(layers, instance.border)
+    old_border = getattr(instance, '_tile_old_border', None)
+    if old_border is not None and not old_border.equals_exact(instance.border):
+        invalidate_tiles_for_geometry(layers, old_border)
+
+# ----------------------------- Access snapshots -----------------------------
+
+@receiver([post_save, post_delete], sender=UserPelakPermission)
+def invalidate_pelak_access_on_grant(sender, instance, **kwargs):
+    """A granted / revoked pelak (also cascaded by a pelak delete) changes the user snapshot"""
+    invalidate_snapshots_on_commit([instance.user_id])
+
+@receiver(m2m_changed, sender=UserPelakPermission)
+def invalidate_pelak_access_on_grants(sender, instance, action, reverse, pk_set, **kwargs):
+    """user.pelaks.add / set / remove / clear (and pelak.authorized_users.*) send no post_save"""
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_snapshots_on_commit([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_snapshots_on_commit(pk_set or [])
+    elif action == 'pre_clear':
+        invalidate_snapshots_on_commit(
+            UserPelakPermission.objects.filter(pelak=instance).values_list('user_id', flat=True)
         )
-        print("GeoServer response for Pulish Flag layer:", gs_result)
-    except Exception as e:
-        print("Failed to publish layerfor Pulish Flag layer:", e)
 
+@receiver(post_save, sender=User)
+def invalidate_pelak_access_on_user(sender, instance, **kwargs):
+    """Superuser flag / company of the user"""
+    invalidate_snapshots_on_commit([instance.pk])
 
+@receiver([post_save, pre_delete], sender=Company)
+def invalidate_pelak_access_on_company(sender, instance, **kwargs):
+    """Supernazer / nazer / moshaver flags of the company"""
+    invalidate_snapshots_on_commit(User.objects.filter(company=instance).values_list('id', flat=True))
+
+@receiver(m2m_changed, sender=Company.provinces.through)
+def invalidate_pelak_access_on_company_provinces(sender, instance, action, reverse, **kwargs):
+    """Provinces of a nazer / moshaver company are part of the access of its users"""
+    if reverse or not action.startswith('post_'):
+        return
+    invalidate_snapshots_on_commit(User.objects.filter(company=instance).values_list('id', flat=True))
+
+@receiver(post_save, sender=Province)
+@receiver(post_save, sender=Pelak)
+def rebuild_access_areas_on_border_change(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    A moved pelak / province border changes the area of every scope granting it. Rare: every area
+    is rebuilt on its next use. A new row is granted to nobody yet.
+    """
+    if not created and _border_changed(instance, update_fields):
+        bump_area_generation_on_commit()
@@ -1,3 +1,751 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.models import Province
+from landreg.models.cadaster import Cadaster
+from landreg.models.flag import Flag
+from landreg.models.pelak import Pelak
+from landreg.models.tilepackage import TilePackageJob
+from landreg.services.export_service import build_export_queryset
+from landreg.models.statushistory import CadasterStatusDailyRollup, CadasterStatusHistory
+from landreg.services.status_history_service import (
+    _apply_rollup_deltas,
+    change_cadaster_status,
+    get_status_trend,
+)
+from landreg.services.report_cache_service import (
+    get_or_compute_report,
+    invalidate_report_scopes,
+)
+from landreg.services.report_warmup_service import (
+    REPORT_REGISTRY,
+    province_report_jobs,
+    national_report_jobs,
+    warm_report,
+)
+from landreg.exceptions import GridRequestError
+from landreg.services.report_service import (
+    GRID_NATIONAL_MAX_ZOOM,
+    build_compressed_payload,
+    compute_diff_cadaster_flag_by_province,
+    compute_grid_aggregation,
+    grid_cell_size_for_zoom,
+    validate_grid_request,
+)
+from landreg.services.access_service import AccessSnapshot, FULL_ACCESS_SCOPE, snapshot_key
+from landreg.services.tile_service import build_tile_payload, tile_is_valid
+from landreg.services.generalization_service import (
+    generalized_border_sql,
+    level_for_zoom,
+    level_tolerance,
+    source_levels,
+)
+from landreg.services.tile_invalidation_service import (
+    get_tile_version,
+    invalidate_tiles,
+    tile_range,
+    tile_version_key,
+    tiles_for_extents,
+)
+from landreg.services.tile_package_service import (
+    JOB_LEASE_SECONDS,
+    TilePackageBusy,
+    build_mbtiles,
+    claim_tile_package_job,
+    package_tiles,
+    request_tile_package,
+    run_tile_package_job,
+)
+
+LOCMEM_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+@override_settings(DEBUG=False, CACHES=LOCMEM_CACHE)
+class ReportCacheServiceTests(SimpleTestCase):
+    """Test cases for the report cache layer"""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def tearDown(self):
+        cache.clear()
+
+    def _compute(self, value):
+        def compute():
+            self.calls += 1
+            return value
+        return compute
+
+    def test_empty_result_is_cached(self):
+        """An empty result is a valid cached value"""
+        self.assertEqual(get_or_compute_report("report_test", "province_1", self._compute({})), {})
+        self.assertEqual(get_or_compute_report("report_test", "province_1", self._compute({})), {})
+        self.assertEqual(self.calls, 1)
+
+    def test_invalidation_recomputes(self):
+        """Bumping the scope generation makes the next read recompute"""
+        get_or_compute_report("report_test", "province_1", self._compute(1))
+        invalidate_report_scopes(["province_1"])
+        value = get_or_compute_report("report_test", "province_1", self._compute(2))
+        self.assertEqual(value, 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_evicted_generation_does_not_revive_entries(self):
+        """A lost generation key is seeded with a new token, old entries stay stale"""
+        get_or_compute_report("report_test", "province_1", self._compute(1))
+        cache.delete("report_generation_province_1")
+        value = get_or_compute_report("report_test", "province_1", self._compute(2))
+        self.assertEqual(value, 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_other_scope_not_invalidated(self):
+        """Invalidating one province keeps the reports of the others"""
+        get_or_compute_report("report_test", "province_1", self._compute(1))
+        invalidate_report_scopes(["province_2"])
+        get_or_compute_report("report_test", "province_1", self._compute(1))
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """While another worker holds the recompute lock, the stale value is served"""
+        get_or_compute_report("report_test", "province_1", self._compute("old"))
+        invalidate_report_scopes(["province_1"])
+        cache.add("report_test__lock", "other-worker", 60)
+
+        value = get_or_compute_report("report_test", "province_1", self._compute("new"))
+
+        self.assertEqual(value, "old")
+        self.assertEqual(self.calls, 1)
+
+
+class GridAggregationTests(SimpleTestCase):
+    """Test cases for grid aggregation helpers"""
+
+    def test_cell_size_halves_per_zoom(self):
+        """Each zoom level halves the cell size"""
+        self.assertAlmostEqual(grid_cell_size_for_zoom(5), grid_cell_size_for_zoom(4) / 2)
+
+    def test_cell_size_zoom_zero(self):
+        """At zoom 0 a cell is 64 pixels of 156543m"""
+        self.assertAlmostEqual(grid_cell_size_for_zoom(0), 64 * 156543.03392804097)
+
+
+    def test_zoom_out_of_range(self):
+        """Zooms outside the grid range are rejected"""
+        with self.assertRaises(GridRequestError):
+            validate_grid_request(15, (51.0, 35.0, 51.1, 35.1))
+
+    def test_national_zoom_without_bbox(self):
+        """Dashboard zooms are served nationwide"""
+        validate_grid_request(GRID_NATIONAL_MAX_ZOOM, None)
+
+    def test_deep_zoom_requires_bbox(self):
+        """Above the national zoom cap a bbox is required"""
+        with self.assertRaises(GridRequestError):
+            validate_grid_request(GRID_NATIONAL_MAX_ZOOM + 1, None)
+        validate_grid_request(14, (51.0, 35.0, 51.1, 35.1))
+
+    def test_bbox_too_large_for_zoom(self):
+        """A country sized bbox at zoom 14 has too many cells"""
+        with self.assertRaises(GridRequestError):
+            validate_grid_request(14, (44.0, 25.0, 63.0, 40.0))
+
+
+class NationalReportPayloadTests(SimpleTestCase):
+    """Test cases for the compressed national report payload"""
+
+    def test_payload_roundtrip(self):
+        """The gzip body decompresses to the original report"""
+        data = {'provinces': [{'province_id': 1, 'province_name': 'تهران'}]}
+        payload = build_compressed_payload(data)
+        self.assertEqual(json.loads(gzip.decompress(payload['gzip'])), data)
+
+    def test_etag_depends_on_content(self):
+        """Same report -> same ETag, changed report -> new ETag"""
+        first = build_compressed_payload({'provinces': []})
+        self.assertEqual(first['etag'], build_compressed_payload({'provinces': []})['etag'])
+        self.assertNotEqual(first['etag'], build_compressed_payload({'provinces': [1]})['etag'])
+
+
+@override_settings(DEBUG=False, CACHES=LOCMEM_CACHE)
+class ReportWarmupTests(SimpleTestCase):
+    """Test cases for the report cache warm-up"""
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_province_jobs(self):
+        """Every province gets its three reports"""
+        jobs = province_report_jobs([1, 2])
+        self.assertEqual(len(jobs), 6)
+        self.assertIn(('diff_cadaster_flag', (2,)), jobs)
+
+    def test_national_jobs_without_grid(self):
+        """Without grid only the national status report is warmed"""
+        self.assertEqual(national_report_jobs(include_grid=False), [('national_status', ())])
+
+    def test_warm_report_stores_value(self):
+        """A warmed key is served without recomputing"""
+        registry = {'test': (lambda pid: f"report_test_{pid}", lambda pid: f"province_{pid}", lambda pid: {'id': pid})}
+        with mock.patch.dict(REPORT_REGISTRY, registry):
+            cache_key, seconds, error = warm_report(('test', (7,)))
+
+        self.assertEqual(cache_key, "report_test_7")
+        self.assertIsNone(error)
+        value = get_or_compute_report("report_test_7", "province_7", lambda: self.fail("recomputed"))
+        self.assertEqual(value, {'id': 7})
+
+    def test_warm_report_returns_error(self):
+        """A failing report is reported, not raised"""
+        def compute(pid):
+            raise RuntimeError("boom")
+        registry = {'test': (lambda pid: f"report_test_{pid}", lambda pid: f"province_{pid}", compute)}
+        with mock.patch.dict(REPORT_REGISTRY, registry):
+            cache_key, seconds, error = warm_report(('test', (7,)))
+        self.assertEqual(error, "boom")
+
+
+@override_settings(VECTOR_TILES={'MIN_ZOOM': 0, 'MAX_ZOOM': 20, 'CACHE_TIMEOUT': 60})
+class VectorTileTests(SimpleTestCase):
+    """Test cases for the vector tile access scope and payload"""
+
+    def test_full_access_scope(self):
+        """Unrestricted users share one scope"""
+        self.assertEqual(AccessSnapshot(pelak_numbers=None, province_ids=[]).scope, FULL_ACCESS_SCOPE)
+
+    def test_scope_ignores_grant_order(self):
+        """Same grants -> same scope, other grants -> other scope"""
+        first = AccessSnapshot(pelak_numbers=['12', '7'], province_ids=[3, 1])
+        second = AccessSnapshot(pelak_numbers=['7', '12'], province_ids=[1, 3])
+        self.assertEqual(first.scope, second.scope)
+        self.assertNotEqual(first.scope, AccessSnapshot(pelak_numbers=['7'], province_ids=[1, 3]).scope)
+        self.assertNotEqual(first.scope, FULL_ACCESS_SCOPE)
+
+    def test_tile_bounds(self):
+        """x / y must exist at the zoom level"""
+        self.assertTrue(tile_is_valid(0, 0, 0))
+        self.assertTrue(tile_is_valid(3, 7, 7))
+        self.assertFalse(tile_is_valid(3, 8, 0))
+        self.assertFalse(tile_is_valid(21, 0, 0))
+
+    def test_tile_payload_roundtrip(self):
+        """The gzip body decompresses to the tile, empty tiles have no body"""
+        payload = build_tile_payload(b'\x1a\x02mvt')
+        self.assertEqual(gzip.decompress(payload['gzip']), b'\x1a\x02mvt')
+        self.assertEqual(build_tile_payload(b'')['gzip'], b'')
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    VECTOR_TILES={'MIN_ZOOM': 0, 'MAX_ZOOM': 14, 'CACHE_TIMEOUT': 60, 'INVALIDATION_MAX_TILES': 16},
+)
+class TileInvalidationTests(SimpleTestCase):
+    """Test cases for the edit -> tile keys invalidation"""
+
+    # A ~100m parcel in Tehran
+    PARCEL = (51.3890, 35.6890, 51.3900, 35.6900)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_tile_range_known_tile(self):
+        """Tehran is tile 10/658/403"""
+        self.assertEqual(tile_range(self.PARCEL, 10), (658, 658, 403, 403))
+
+    def test_whole_world_at_zoom_zero(self):
+        self.assertEqual(tile_range((-180, -90, 180, 90), 0), (0, 0, 0, 0))
+
+    def test_too_many_tiles(self):
+        """An extent larger than the limit gives None (whole zoom level)"""
+        self.assertIsNone(tiles_for_extents([(44.0, 25.0, 63.0, 40.0)], 10, max_tiles=16))
+        self.assertEqual(len(tiles_for_extents([self.PARCEL], 10, max_tiles=16)), 1)
+
+    def test_only_covered_tiles_are_bumped(self):
+        """An edit changes the version of its tiles and leaves the others alone"""
+        edited_before = get_tile_version('cadaster', 14, *tile_range(self.PARCEL, 14)[::2])
+        other_before = get_tile_version('cadaster', 14, 0, 0)
+
+        summary = invalidate_tiles([('cadaster', self.PARCEL)])
+
+        self.assertNotEqual(get_tile_version('cadaster', 14, *tile_range(self.PARCEL, 14)[::2]), edited_before)
+        self.assertEqual(get_tile_version('cadaster', 14, 0, 0), other_before)
+        # cadaster tiles start at zoom 10
+        self.assertEqual(sorted(summary['cadaster']), list(range(10, 15)))
+
+    def test_large_edit_bumps_zoom_generation(self):
+        """An edit over too many tiles invalidates every tile of the zoom level"""
+        before = get_tile_version('pelak', 12, 0, 0)
+        summary = invalidate_tiles([('pelak', (44.0, 25.0, 63.0, 40.0))])
+        self.assertEqual(summary['pelak'][12], -1)
+        self.assertNotEqual(get_tile_version('pelak', 12, 0, 0), before)
+
+
+class GeneralizationTests(SimpleTestCase):
+    """Test cases for the zoom -> generalized border level selection"""
+
+    def test_level_for_zoom(self):
+        """Low zooms get a level, deep zooms the full resolution border"""
+        self.assertEqual(level_for_zoom(0), 0)
+        self.assertEqual(level_for_zoom(7), 1)
+        self.assertEqual(level_for_zoom(11), 2)
+        self.assertIsNone(level_for_zoom(12))
+
+    def test_tolerance_shrinks_with_level(self):
+        self.assertGreater(level_tolerance(0), level_tolerance(1))
+        self.assertGreater(level_tolerance(1), level_tolerance(2))
+
+    def test_levels_start_at_layer_min_zoom(self):
+        """Cadaster tiles start at zoom 10: only the last level is stored for them"""
+        self.assertEqual(source_levels('cadaster'), [2])
+        self.assertEqual(source_levels('province'), [0, 1, 2])
+
+    def test_border_sql(self):
+        """Deep zooms and layers without copies read the source border"""
+        self.assertEqual(generalized_border_sql('cadaster', 't', 15), ("t.border", [], "", []))
+        self.assertEqual(generalized_border_sql(None, 't', 3), ("t.border", [], "", []))
+        geometry_sql, geometry_params, join_sql, join_params = generalized_border_sql('pelak', 't', 3)
+        self.assertIn('g.border', geometry_sql)
+        self.assertEqual(geometry_params, [level_tolerance(0)])
+        self.assertIn('t."number"::text', join_sql)
+        self.assertEqual(join_params, ['pelak', 0])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PELAK_ACCESS={'SNAPSHOT_TIMEOUT': 60, 'AREA_TIMEOUT': 60})
+class AccessSnapshotTests(SimpleTestCase):
+    """Test cases for the cached per-user access snapshot"""
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_has_pelak(self):
+        snapshot = AccessSnapshot(pelak_numbers=['7', '12'], province_ids=[])
+        self.assertTrue(snapshot.has_pelak('12'))
+        self.assertFalse(snapshot.has_pelak('8'))
+        self.assertTrue(AccessSnapshot(pelak_numbers=None, province_ids=[]).has_pelak('8'))
+
+    def test_full_access_needs_no_area(self):
+        self.assertEqual(AccessSnapshot(pelak_numbers=None, province_ids=[]).area_filter_sql('t.border'), ("TRUE", []))
+
+    def test_snapshot_built_once(self):
+        """The second lookup is served from the cache"""
+        user = mock.Mock(pk=5)
+        built = AccessSnapshot(pelak_numbers=['7'], province_ids=[3])
+        with mock.patch.object(AccessSnapshot, 'build', return_value=built) as build:
+            first = AccessSnapshot.for_user(user)
+            second = AccessSnapshot.for_user(user)
+        build.assert_called_once()
+        self.assertEqual(first.scope, second.scope)
+        self.assertEqual(cache.get(snapshot_key(5))['pelak_numbers'], ['7'])
+
+
+def _square(minx, miny, size):
+    return MultiPolygon(Polygon.from_bbox((minx, miny, minx + size, miny + size)), srid=4326)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CadasterStatusHistoryTests(TestCase):
+    """Test cases for the status history log and its daily rollup"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='historyuser', password='testpass123')
+        self.province = Province.objects.create(
+            name_fa='استان آزمایشی', cnter_name_fa='مرکز آزمایشی', code=99, border=_square(50, 30, 2),
+        )
+        self.cadaster = Cadaster.objects.create(jaam_code='1', border=_square(51, 31, 0.01), status=0)
+
+    def _rollup(self, status_code, province_id):
+        return CadasterStatusDailyRollup.objects.get(status=status_code, province_id=province_id)
+
+    def test_status_change_writes_history_and_rollup(self):
+        """One history row, entered +1 on the new status and left +1 on the old one"""
+        change_cadaster_status(self.cadaster, 3, self.user)
+
+        history = CadasterStatusHistory.objects.get(cadaster=self.cadaster)
+        self.assertEqual((history.old_status, history.new_status), (0, 3))
+        self.assertEqual(history.province_id, self.province.id)
+        entered = self._rollup(3, self.province.id)
+        left = self._rollup(0, self.province.id)
+        self.assertEqual((entered.day, entered.entered_count, entered.left_count), (history.changed_at.date(), 1, 0))
+        self.assertEqual((left.entered_count, left.left_count), (0, 1))
+
+        self.cadaster.refresh_from_db()
+        self.assertEqual(self.cadaster.status, 3)
+
+    def test_repeated_change_increments_same_row(self):
+        """A second change of the same day adds to the existing (day, province, status) row"""
+        change_cadaster_status(self.cadaster, 3, self.user)
+        change_cadaster_status(self.cadaster, 0, self.user)
+        change_cadaster_status(self.cadaster, 3, self.user)
+
+        self.assertEqual(CadasterStatusHistory.objects.count(), 3)
+        self.assertEqual(self._rollup(3, self.province.id).entered_count, 2)
+        self.assertEqual(self._rollup(3, self.province.id).left_count, 1)
+
+    def test_old_status_read_from_the_row(self):
+        """A stale instance still records the status the row had"""
+        stale = Cadaster.objects.get(pk=self.cadaster.pk)
+        change_cadaster_status(self.cadaster, 3, self.user)
+        history = change_cadaster_status(stale, 1, self.user)
+
+        self.assertEqual((history.old_status, history.new_status), (3, 1))
+        self.assertEqual(self._rollup(3, self.province.id).left_count, 1)
+        self.assertFalse(CadasterStatusDailyRollup.objects.filter(status=0, entered_count__gt=0).exists())
+
+    def test_unchanged_status_writes_nothing(self):
+        self.assertIsNone(change_cadaster_status(self.cadaster, 0, self.user))
+        self.assertFalse(CadasterStatusHistory.objects.exists())
+        self.assertFalse(CadasterStatusDailyRollup.objects.exists())
+
+    def test_null_province_upserts_into_one_row(self):
+        """Cadasters outside every province share one rollup row per (day, status)"""
+        outside = Cadaster.objects.create(jaam_code='2', border=_square(10, 10, 0.01), status=0)
+        change_cadaster_status(outside, 1, self.user)
+        other = Cadaster.objects.create(jaam_code='3', border=_square(11, 11, 0.01), status=0)
+        change_cadaster_status(other, 1, self.user)
+
+        rows = CadasterStatusDailyRollup.objects.filter(province__isnull=True, status=1)
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual(rows.get().entered_count, 2)
+
+    def test_trend_buckets(self):
+        """Days are summed per ISO week, and kept apart per day"""
+        monday = datetime.date(2025, 1, 6)
+        _apply_rollup_deltas({
+            (monday, self.province.id, 1): [2, 0],
+            (monday + datetime.timedelta(days=2), self.province.id, 1): [3, 1],
+            (monday + datetime.timedelta(days=7), self.province.id, 1): [1, 0],
+        })
+
+        weekly = get_status_trend('week', monday, monday + datetime.timedelta(days=13), self.province.id)
+        self.assertEqual([item['bucket_start'] for item in weekly['results']], ['2025-01-06', '2025-01-13'])
+        first_week = weekly['results'][0]['status_breakdown'][0]
+        self.assertEqual((first_week['entered'], first_week['left'], first_week['net']), (5, 1, 4))
+
+        daily = get_status_trend('day', monday, monday + datetime.timedelta(days=6))
+        self.assertEqual([item['bucket_start'] for item in daily['results']], ['2025-01-06', '2025-01-08'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CadasterExportQuerysetTests(TestCase):
+    """Test cases for the export queryset filters"""
+
+    def setUp(self):
+        cache.clear()
+        province = Province.objects.create(
+            name_fa='استان خروجی', cnter_name_fa='مرکز خروجی', code=98, border=_square(50, 30, 2),
+        )
+        Pelak.objects.create(number='007', provinces=province, border=_square(51, 31, 0.1))
+        self.inside = Cadaster.objects.create(jaam_code='1', border=_square(51.01, 31.01, 0.01))
+        Cadaster.objects.create(jaam_code='2', border=_square(51.5, 31.5, 0.01))
+
+    def test_filter_by_zero_padded_pelak_number(self):
+        """pelak_id is the pelak number (primary key), not an integer id"""
+        rows = list(build_export_queryset(pelak_id='007'))
+        self.assertEqual([row['id'] for row in rows], [self.inside.id])
+        self.assertIn('"MultiPolygon"', rows[0]['geojson'])
+
+    def test_unknown_pelak(self):
+        with self.assertRaises(Pelak.DoesNotExist):
+            build_export_queryset(pelak_id='7')
+
+    def test_owner_personal_data_not_exported(self):
+        row = build_export_queryset(pelak_id='007').first()
+        for field in ('owner_name', 'owner_lastname', 'fathername', 'national_code', 'mobile'):
+            self.assertNotIn(field, row)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, VECTOR_TILES={'MIN_ZOOM': 0, 'MAX_ZOOM': 20, 'CACHE_TIMEOUT': 60})
+class TilePackageBuildTests(SimpleTestCase):
+    """Test cases for the MBTiles build and the reuse of unchanged tiles"""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "province_1.mbtiles")
+        self.area = _square(51, 31, 0.01)
+        self.tiles = package_tiles(self.area, 12, 13)
+        render = mock.patch('landreg.services.tile_package_service.compute_tile_layers', return_value=b"tile")
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+    def _build(self, access=None, heartbeat=None):
+        return build_mbtiles(
+            path=self.path,
+            name="province_1",
+            area=self.area,
+            access=access or AccessSnapshot(pelak_numbers=None, province_ids=[]),
+            min_zoom=12,
+            max_zoom=13,
+            workers=1,
+            heartbeat=heartbeat,
+        )
+
+    def test_first_build_renders_every_tile(self):
+        stats = self._build()
+        self.assertEqual(stats['tiles'], len(self.tiles))
+        self.assertEqual(stats['rendered'], len(self.tiles))
+        self.assertEqual(stats['reused'], 0)
+        self.assertEqual(stats['stored'], len(self.tiles))
+
+    def test_unchanged_tiles_are_reused(self):
+        """A rebuild copies the tiles whose fingerprint did not change"""
+        self._build()
+        heartbeat = mock.Mock()
+        stats = self._build(heartbeat=heartbeat)
+        self.assertEqual(stats['reused'], len(self.tiles))
+        self.assertEqual(stats['rendered'], 0)
+        self.assertEqual(stats['stored'], len(self.tiles))
+        self.assertEqual(self.render.call_count, len(self.tiles))
+        heartbeat.assert_called()
+
+    def test_heartbeat_while_rendering_empty_tiles(self):
+        """An area without data stores no tile but still renders every one of them"""
+        self.render.return_value = b""
+        heartbeat = mock.Mock()
+        with mock.patch('landreg.services.tile_package_service.RENDER_CHUNK_SIZE', 1):
+            stats = self._build(heartbeat=heartbeat)
+        self.assertEqual(stats['stored'], 0)
+        self.assertEqual(heartbeat.call_count, len(self.tiles))
+
+    def test_changed_tile_is_rendered_again(self):
+        self._build()
+        z, x, y = self.tiles[0]
+        cache.set(tile_version_key('cadaster', z, x, y), 2)
+        stats = self._build()
+        self.assertEqual(stats['reused'], len(self.tiles) - 1)
+        self.assertEqual(stats['rendered'], 1)
+
+    def test_other_access_scope_is_not_reused(self):
+        self._build()
+        stats = self._build(access=AccessSnapshot(pelak_numbers=["12"], province_ids=[]))
+        self.assertEqual(stats['reused'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TilePackageJobTests(TestCase):
+    """Test cases for the queued tile package builds"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='packageuser', password='testpass123')
+        self.province = Province.objects.create(
+            name_fa='استان آزمایشی', cnter_name_fa='مرکز آزمایشی', code=99, border=_square(51, 31, 0.01),
+        )
+        self.access = AccessSnapshot(pelak_numbers=None, province_ids=[])
+
+    def _request(self):
+        return request_tile_package(
+            user=self.user, access=self.access, province_id=self.province.id, min_zoom=12, max_zoom=13,
+        )
+
+    def test_same_request_reuses_the_job(self):
+        job = self._request()
+        self.assertEqual(job.status, TilePackageJob.Status.PENDING)
+        self.assertEqual(self._request().pk, job.pk)
+
+    def test_job_is_built_by_the_worker(self):
+        job = self._request()
+        claimed = claim_tile_package_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, TilePackageJob.Status.RUNNING)
+        self.assertIsNone(claim_tile_package_job())
+
+        result = {'path': '/tmp/province.mbtiles', 'format': 'mbtiles', 'tiles': 4, 'reused': 0, 'rendered': 4}
+        with mock.patch('landreg.services.tile_package_service.build_tile_package', return_value=result) as build:
+            run_tile_package_job(claimed)
+        self.assertEqual(build.call_args.kwargs['province_id'], self.province.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TilePackageJob.Status.DONE)
+        self.assertEqual(job.path, '/tmp/province.mbtiles')
+        self.assertEqual(job.stats['rendered'], 4)
+
+    def test_busy_package_is_retried_later(self):
+        """A build of the same package elsewhere does not use up an attempt"""
+        job = self._request()
+        claimed = claim_tile_package_job()
+        with mock.patch('landreg.services.tile_package_service.build_tile_package', side_effect=TilePackageBusy("busy")):
+            run_tile_package_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TilePackageJob.Status.PENDING)
+        self.assertEqual(job.attempts, 0)
+        self.assertGreater(job.next_attempt_at, timezone.now())
+
+    def test_stale_running_job_is_taken_over(self):
+        """A worker killed mid-build leaves a running job that another worker takes over"""
+        job = self._request()
+        claim_tile_package_job()
+        TilePackageJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - datetime.timedelta(seconds=JOB_LEASE_SECONDS + 1)
+        )
+        claimed = claim_tile_package_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TilePackageApiTests(APITestCase):
+    """Test cases for the tile package endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='packageapiuser', password='testpass123')
+        self.client.force_authenticate(self.user)
+        permission = mock.patch('accounts.permissions.HasDynamicPermission.has_permission', return_value=True)
+        permission.start()
+        self.addCleanup(permission.stop)
+        self.province = Province.objects.create(
+            name_fa='استان آزمایشی', cnter_name_fa='مرکز آزمایشی', code=99, border=_square(51, 31, 0.01),
+        )
+
+    def test_request_is_queued(self):
+        """The package is not built on the request path"""
+        with mock.patch('landreg.services.tile_package_service.build_tile_package') as build:
+            response = self.client.post(
+                '/api/landreg/tilepackage/', {'province_id': self.province.id, 'min_zoom': 12, 'max_zoom': 13},
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], TilePackageJob.Status.PENDING)
+        build.assert_not_called()
+
+        response = self.client.get(f"/api/landreg/tilepackage/{response.data['id']}/download/")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_other_users_job_not_found(self):
+        other = get_user_model().objects.create_user(username='otherpackageuser', password='testpass123')
+        job = request_tile_package(
+            user=other, access=AccessSnapshot(pelak_numbers=None, province_ids=[]),
+            province_id=self.province.id, min_zoom=12, max_zoom=13,
+        )
+        response = self.client.get(f'/api/landreg/tilepackage/{job.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PelakUploadTests(APITestCase):
+    """Test cases for the bulk pelak upload"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_superuser(username='pelakuploaduser', password='testpass123')
+        self.client.force_authenticate(self.user)
+        permission = mock.patch('accounts.permissions.HasDynamicPermission.has_permission', return_value=True)
+        permission.start()
+        self.addCleanup(permission.stop)
+        self.province = Province.objects.create(
+            name_fa='استان بارگذاری', cnter_name_fa='مرکز بارگذاری', code=97, border=_square(50, 30, 2),
+        )
+
+    def test_bulk_create_invalidates_like_the_signals(self):
+        """bulk_create sends no post_save: the view invalidates the tiles and layer of the new pelaks"""
+        pelaks = [
+            {'title': 'یک', 'number': '101', 'border': _square(51, 31, 0.1)[0]},
+            {'title': 'دو', 'number': '102', 'border': _square(52, 31, 0.1)[0]},
+        ]
+        upload = SimpleUploadedFile('pelaks.zip', b'zip', content_type='application/zip')
+        with mock.patch('landreg.views.pelakviews.process_pelak_border', return_value=(True, pelaks, '')), \
+                mock.patch('landreg.views.pelakviews.invalidate_tiles_for_geometry') as invalidate, \
+                mock.patch('landreg.views.pelakviews.bump_layer_version_on_commit') as bump, \
+                mock.patch('landreg.views.pelakviews.truncate_tiles_for_geometries') as truncate:
+            response = self.client.post(
+                '/api/landreg/pelak/', {'file': upload, 'province_selected_id': self.province.id},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(invalidate.call_count, 2)
+        self.assertEqual(invalidate.call_args.args[0], ('pelak', 'cadaster', 'flag'))
+        bump.assert_called_once_with(mock.ANY, Pelak._meta.db_table)
+        truncate.assert_called_once()
+        self.assertEqual(truncate.call_args.args[0], Pelak._meta.db_table)
+        self.assertEqual(len(truncate.call_args.args[1]), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DiffCadasterFlagReportTests(TestCase):
+    """Test cases for the cadaster / flag status diff report"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_superuser(username='diffuser', password='testpass123')
+        self.province = Province.objects.create(
+            name_fa='استان آزمایشی', cnter_name_fa='مرکز آزمایشی', code=99, border=_square(50, 30, 2),
+        )
+
+    def _flag(self, cadaster, status_code):
+        return Flag(cadaster=cadaster, createdby=self.user, status=status_code, border=cadaster.border.centroid)
+
+    def test_cadaster_with_several_flags_counts_once(self):
+        """matched_count counts cadasters, not flags"""
+        first = Cadaster.objects.create(jaam_code='1', border=_square(51, 31, 0.01), status=1)
+        second = Cadaster.objects.create(jaam_code='2', border=_square(51.1, 31.1, 0.01), status=2)
+        Cadaster.objects.create(jaam_code='3', border=_square(51.2, 31.2, 0.01), status=1)
+        Flag.objects.bulk_create([
+            self._flag(first, 1),
+            self._flag(first, 3),
+            self._flag(first, 4),
+            self._flag(second, 2),
+        ])
+
+        report = compute_diff_cadaster_flag_by_province(self.province.id)
+        self.assertEqual(report['total_cadasters_in_province'], 3)
+        self.assertEqual(report['total_cadasters_with_flags'], 2)
+        self.assertEqual(report['total_mismatched'], 2)
+        self.assertEqual(report['matched_count'], 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class GridAggregationQueryTests(TestCase):
+    """Test cases running the grid aggregation SQL"""
+
+    def setUp(self):
+        cache.clear()
+        Cadaster.objects.create(jaam_code='1', border=_square(51, 31, 0.001), status=1)
+        Cadaster.objects.create(jaam_code='2', border=_square(51.0002, 31.0002, 0.001), status=2)
+        Cadaster.objects.create(jaam_code='3', border=_square(55, 35, 0.001), status=1)
+
+    def _check_grid(self, grid):
+        self.assertEqual(sum(cell['properties']['total'] for cell in grid['features']), 3)
+        for cell in grid['features']:
+            self.assertEqual(cell['geometry']['type'], 'Polygon')
+            lon, lat = cell['geometry']['coordinates'][0][0]
+            self.assertTrue(40 < lon < 70 and 20 < lat < 45)
+
+    def test_square_grid(self):
+        grid = compute_grid_aggregation('cadaster', 'square', 6)
+        self._check_grid(grid)
+        self.assertEqual(len(grid['features']), 2)
+
+    def test_hex_grid(self):
+        self._check_grid(compute_grid_aggregation('cadaster', 'hex', 6))
+
+    def test_bbox_filter(self):
+        grid = compute_grid_aggregation('cadaster', 'square', 10, bbox=(50.9, 30.9, 51.1, 31.1))
+        self.assertEqual(sum(cell['properties']['total'] for cell in grid['features']), 2)
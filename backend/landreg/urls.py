@@ -20,11 +20,23 @@ from landreg.views.cadasterviews import (
     TableColumnNamesAPIView,
     CadasterColumnMappingValidateAPIView,
     CadasterImportAPIView,
+    CadasterExportApiView,
+)
+from landreg.views.tileviews import (
+    VectorTileApiView,
+    GeneralizedBorderGeoJsonApiView,
+    TilePackageApiView,
+    TilePackageJobApiView,
+    TilePackageDownloadApiView,
 )
 from landreg.views.reportviews import (
     CadaterStatusByProvince,
     FlagStatusByProvince,
-    DiffCadasterAndFlagStatusByProvince
+    DiffCadasterAndFlagStatusByProvince,
+    DiffCadasterAndFlagRecordsByProvince,
+    GridAggregationReport,
+    CadasterStatusTrendReport,
+    NationalStatusReport,
 )
 
 
@@ -33,6 +45,12 @@ urlpatterns = [
 
     path('flag/<int:cadasterid>/',FlagListApiView.as_view(),name="flag-list"),
 
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', VectorTileApiView.as_view(), name="vector-tile"),
+    path('borders/<str:layer>/', GeneralizedBorderGeoJsonApiView.as_view(), name="generalized-borders"),
+    path('tilepackage/', TilePackageApiView.as_view(), name="tile-package"),
+    path('tilepackage/<int:jobid>/', TilePackageJobApiView.as_view(), name="tile-package-job"),
+    path('tilepackage/<int:jobid>/download/', TilePackageDownloadApiView.as_view(), name="tile-package-download"),
+
     path('cadaster/<int:cadasterid>/' , CadasterDetailsApiView.as_view() , name="cadaster-details"),
 
     path('uploadoldcadasterfromshapefile/' , UploadOldCadasterFromShapefileApiView.as_view() , name="upload-oldcadasterdata-shp"),
@@ -47,9 +65,14 @@ urlpatterns = [
     path('tablecolumnnames/' , TableColumnNamesAPIView.as_view() , name="oldcadasterdata-tablename"),
     path('colmapvalidate/', CadasterColumnMappingValidateAPIView.as_view(), name='cadaster-column-mapping-validate'),
     path('cadasterimport/', CadasterImportAPIView.as_view(), name='cadaster-import'),
+    path('cadasterexport/', CadasterExportApiView.as_view(), name='cadaster-export'),
 
     path('cadaterstatusbyprovince/<int:provinceid>/', CadaterStatusByProvince.as_view(), name='report-cadastersatus-by-province'),    
     path('flagstatusbyprovince/<int:provinceid>/', FlagStatusByProvince.as_view(), name='report-flagsatus-by-province'),    
     path('diffcadasterflagstatusbyprovince/<int:provinceid>/', DiffCadasterAndFlagStatusByProvince.as_view(), name='report-cadasterflag-diff-satus-by-province'),    
+    path('diffcadasterflagstatusbyprovince/<int:provinceid>/records/', DiffCadasterAndFlagRecordsByProvince.as_view(), name='report-cadasterflag-diff-records-by-province'),    
+    path('gridaggregation/<str:layer>/<int:zoom>/', GridAggregationReport.as_view(), name='report-grid-aggregation'),    
+    path('cadasterstatustrend/', CadasterStatusTrendReport.as_view(), name='report-cadaster-status-trend'),    
+    path('nationalstatus/', NationalStatusReport.as_view(), name='report-national-status'),    
     
 ]
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 import zipfile
 from django.utils import timezone
 from typing import cast, Dict, Any , List
@@ -28,7 +29,15 @@ from landreg.services.convert_service import (
     get_status_code,
     import_cadaster_data,
 )
-from geoserverapp.services.geoserver_service import GeoServerService
+from landreg.services.status_history_service import change_cadaster_status
+from landreg.services.access_service import AccessSnapshot
+from landreg.services.export_service import (
+    EXPORT_FORMATS,
+    build_export_queryset,
+    iter_geojsonseq,
+    write_export_file,
+)
+from geoserverapp.services.outbox_service import enqueue_publish_layers, enqueue_delete_layer
 from landreg.exceptions import (
     TableNotFoundError,
     GeoDatabaseValidationError,
@@ -37,10 +46,12 @@ from landreg.exceptions import (
 from django.conf import settings
 from landreg.models.flag import Flag
 from landreg.models.cadaster import Cadaster , OldCadasterData
+from landreg.models.pelak import Pelak
 from common.models import Company , Province
 from accounts.models import User
 from landreg.services.database_service import get_table_columns 
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.http import FileResponse, StreamingHttpResponse
 
 
 class UploadOldCadasterFromShapefileApiView(APIView):
@@ -120,7 +131,7 @@ class UploadOldCadasterFromShapefileApiView(APIView):
 
     def post(self , request:Request) -> Response:
         created_oldcadasterdata : List[OldCadasterData] = []
-        published_tablename : List[str] = []
+        created_tablename : List[str] = []
 
         try:
             user:User = request.user
@@ -149,38 +160,37 @@ class UploadOldCadasterFromShapefileApiView(APIView):
                 shpzipfile=validated_data['file']
             )
 
-            for res in result:
-                oldcadasterdata_new_instance = OldCadasterData.objects.create(
-                    table_name = res["table_name"],
-                    created_by = user,
-                    province = province_instance,
-                )
-                created_oldcadasterdata.append(oldcadasterdata_new_instance)
-
-            geoserver_service = GeoServerService()
-            if len(created_oldcadasterdata) > 0:
-                for c_old in created_oldcadasterdata:
-                    pub_res = geoserver_service.pulish_layer(
-                        workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
-                        store_name=settings.GEOSERVER['DEFAULT_STORE'],
-                        pg_table=c_old.table_name,
-                        title=c_old.table_name,
+            created_tablename.extend(res["table_name"] for res in result)
+
+            # Records + their GeoServer publish operations commit together,
+            # the outbox dispatcher publishes the layers in the background
+            with transaction.atomic():
+                for res in result:
+                    oldcadasterdata_new_instance = OldCadasterData.objects.create(
+                        table_name = res["table_name"],
+                        created_by = user,
+                        province = province_instance,
                     )
-                    if pub_res.get("status",400) == 201:
-                        published_tablename.append(c_old.table_name)
+                    created_oldcadasterdata.append(oldcadasterdata_new_instance)
+
+                enqueue_publish_layers(
+                    pg_tables=[c_old.table_name for c_old in created_oldcadasterdata],
+                )
+            # Committed: the tables belong to their OldCadasterData records now, never drop them below
+            created_tablename.clear()
 
 
             output_serializer = self.UploadOldCadasterFromShapefileOutputSerializer(created_oldcadasterdata,many=True)
             return Response(output_serializer.data , status=status.HTTP_201_CREATED)
             
         except GeoDatabaseValidationError as gdderr:
-            self._cleanup(tablenames = published_tablename)
+            self._cleanup(tablenames = created_tablename)
             return Response({"detail": f"{str(gdderr)}"}, status=status.HTTP_400_BAD_REQUEST)
         except FileNotFoundError as ferr:
-            self._cleanup(tablenames = published_tablename)
+            self._cleanup(tablenames = created_tablename)
             return Response({"detail": f"{str(ferr)}"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            self._cleanup(tablenames = published_tablename)
+            self._cleanup(tablenames = created_tablename)
             print(f"Error creating cadaster via shpfile: {str(e)}")
             return Response(
                 {"detail": "خطا در بارگذاری دیتای قدیمی "}, 
@@ -277,7 +287,7 @@ class UploadOldCadasterFromGdbApiView(APIView):
         
     def post(self, request:Request) -> Response:
         created_oldcadasterdata : List[OldCadasterData] = []
-        published_tablename : List[str] = []
+        created_tablename : List[str] = []
         try:
             user:User = request.user
             
@@ -307,25 +317,24 @@ class UploadOldCadasterFromGdbApiView(APIView):
             )
             
 
-            for res in result:
-                oldcadasterdata_new_instance = OldCadasterData.objects.create(
-                    table_name = res["table_name"],
-                    created_by = user,
-                    province = province_instance,
-                )
-                created_oldcadasterdata.append(oldcadasterdata_new_instance)
-
-            geoserver_service = GeoServerService()
-            if len(created_oldcadasterdata) > 0:
-                for c_old in created_oldcadasterdata:
-                    pub_res = geoserver_service.pulish_layer(
-                        workspace=settings.GEOSERVER['DEFAULT_WORKSPACE'],
-                        store_name=settings.GEOSERVER['DEFAULT_STORE'],
-                        pg_table=c_old.table_name,
-                        title=c_old.table_name,
+            created_tablename.extend(res["table_name"] for res in result)
+
+            # Records + their GeoServer publish operations commit together,
+            # the outbox dispatcher publishes the layers in the background
+            with transaction.atomic():
+                for res in result:
+                    oldcadasterdata_new_instance = OldCadasterData.objects.create(
+                        table_name = res["table_name"],
+                        created_by = user,
+                        province = province_instance,
                     )
-                    if pub_res.get("status",400) == 201:
-                        published_tablename.append(c_old.table_name)
+                    created_oldcadasterdata.append(oldcadasterdata_new_instance)
+
+                enqueue_publish_layers(
+                    pg_tables=[c_old.table_name for c_old in created_oldcadasterdata],
+                )
+            # Committed: the tables belong to their OldCadasterData records now, never drop them below
+            created_tablename.clear()
 
             output_serializer = self.UploadOldCadasterFromGdbOutputSerializer(created_oldcadasterdata,many=True)
             return Response(output_serializer.data , status=status.HTTP_201_CREATED)
@@ -334,10 +343,10 @@ class UploadOldCadasterFromGdbApiView(APIView):
             return Response({"detail": f"{str(gdderr)}"}, status=status.HTTP_400_BAD_REQUEST)
 
         except FileNotFoundError as ferr:
-            self._cleanup(tablenames = published_tablename)
+            self._cleanup(tablenames = created_tablename)
             return Response({"detail": f"{str(ferr)}"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            self._cleanup(tablenames = published_tablename)
+            self._cleanup(tablenames = created_tablename)
             print(f"Error creating cadaster via Geodatabase: {str(e)}")
             return Response(
                 {"detail": "خطا در بارگذاری دیتای قدیمی "}, 
@@ -519,8 +528,10 @@ class OldCadasterDetailsApiView(APIView):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
 
-            # Delete the database record
-            oldcadasterdata_instance.delete()
+            # Delete the database record + queue removal of its GeoServer layer
+            with transaction.atomic():
+                oldcadasterdata_instance.delete()
+                enqueue_delete_layer(layername=table_name)
 
             return Response(
                 {"detail": "دیتای کاداستر قدیمی با موفقیت حذف شد"}, 
@@ -540,7 +551,7 @@ class OldCadasterDetailsApiView(APIView):
 
 class CadasterListApiView(APIView):
     """
-        - GET (Read from Vector Tile Service Not Handle by Django)
+        - GET (Read from the vector tile endpoint: landreg/tiles/cadaster/<z>/<x>/<y>.mvt)
        - POST (Create new Cadaster Instance)     
     """
     pass 
@@ -700,12 +711,15 @@ class ChangeCadsterStatusApiView(APIView):
                     status=status.HTTP_200_OK
                 )
             
-            # Update the cadaster instance
-            old_status = cadaster_instance.status
-            cadaster_instance.status = new_status
-            cadaster_instance.change_status_date = timezone.now()
-            cadaster_instance.change_status_by = request.user
-            cadaster_instance.save()
+            # Update the cadaster instance + append to status history (same transaction)
+            history = change_cadaster_status(cadaster_instance, new_status, request.user)
+            if history is None:
+                # Changed to the same status by a concurrent request
+                return Response(
+                    {"message": "وضعیت تغییر داده شده با وضعیت فعلی تفاوتی ندارد"},
+                    status=status.HTTP_200_OK
+                )
+            old_status = history.old_status
             
             # # Get status display names for response
             status_dict = dict(Cadaster.cadaster_status)
@@ -907,6 +921,8 @@ class CadasterImportAPIView(APIView):
                 source_table_name,
                 source_table_schema,
                 matched_fields,
+                province_id=old_cadaster_instance.province_id,
+                user=request.user,
             )
             
             # Check if import was successful
@@ -960,3 +976,72 @@ class CadasterImportAPIView(APIView):
                 {"error": f"خطای غیرمنتظره: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class CadasterExportApiView(APIView):
+    #permission is dynamic
+    """
+        - Export Cadasters without GeoServer
+        - ?format=geojsonseq (default) | fgb (FlatGeobuf + spatial index) | gpkg
+        - Filters: province_id, pelak_id, status, bbox=minx,miny,maxx,maxy (EPSG:4326)
+        - Only cadasters inside the access area of the user (granted pelaks / company provinces)
+        - Rows are read through a server-side cursor: geojsonseq is streamed as it is read,
+          fgb/gpkg are written to a temporary file in batches and then streamed from disk
+    """
+
+    class CadasterExportInputSerializer(serializers.Serializer):
+        format = serializers.ChoiceField(choices=list(EXPORT_FORMATS.keys()), default='geojsonseq')
+        province_id = serializers.IntegerField(required=False)
+        pelak_id = serializers.CharField(required=False, max_length=100)
+        status = serializers.ChoiceField(choices=[choice[0] for choice in Cadaster.cadaster_status], required=False)
+        bbox = serializers.CharField(required=False)
+
+        def validate_bbox(self, value):
+            try:
+                bbox = [float(v) for v in value.split(',')]
+            except ValueError:
+                raise serializers.ValidationError("bbox باید به صورت minx,miny,maxx,maxy باشد")
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                raise serializers.ValidationError("bbox باید به صورت minx,miny,maxx,maxy باشد")
+            return bbox
+
+    def get(self, request: Request):
+        input_serializer = self.CadasterExportInputSerializer(data=request.query_params)
+        if not input_serializer.is_valid():
+            return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = input_serializer.validated_data
+        export_format = data['format']
+        _, content_type, extension, _ = EXPORT_FORMATS[export_format]
+        filename = f"cadaster_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+        try:
+            queryset = build_export_queryset(
+                province_id=data.get('province_id'),
+                pelak_id=data.get('pelak_id'),
+                status=data.get('status'),
+                bbox=data.get('bbox'),
+                access=AccessSnapshot.for_user(request.user),
+            )
+
+            if export_format == 'geojsonseq':
+                response = StreamingHttpResponse(iter_geojsonseq(queryset), content_type=content_type)
+                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                return response
+
+            path = write_export_file(queryset, export_format)
+            export_file = open(path, 'rb')
+            # The open handle keeps the data readable, nothing is left behind on disk
+            os.remove(path)
+            return FileResponse(export_file, as_attachment=True, filename=filename, content_type=content_type)
+
+        except Province.DoesNotExist:
+            return Response({"detail": "استانی با این آیدی یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        except Pelak.DoesNotExist:
+            return Response({"detail": "پلاکی با این آیدی یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            print(f"Error in cadaster export: {str(e)}")
+            return Response(
+                {"detail": "خطا در خروجی گرفتن از کاداسترها"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -17,6 +17,7 @@ from django.db import IntegrityError
 from landreg.services.gis import process_pelak_border
 from landreg.models.flag import Flag
 from landreg.models.cadaster import Cadaster
+from landreg.services.access_service import AccessSnapshot
 from common.models import Company , Province
 from accounts.models import User
 from django.core.exceptions import ValidationError as DjangoValidationError
@@ -123,7 +124,9 @@ class FlagListApiView(APIView):
             if not has_permission:
                 return Response({"detail": error_msg}, status=status.HTTP_403_FORBIDDEN)
             
-            cadaster_instance = Cadaster.objects.get(pk=cadasterid)
+            cadaster_instance = Cadaster.objects.only('id', 'border').get(pk=cadasterid)
+            if not AccessSnapshot.for_user(user).intersects_area(cadaster_instance.border):
+                return Response({"detail": "شما به این کاداستر دسترسی ندارید"}, status=status.HTTP_403_FORBIDDEN)
             all_flags = Flag.objects.filter(cadaster=cadaster_instance)
             paginator = CustomPagination()
             paginated_queryset = paginator.paginate_queryset(all_flags, request)
@@ -11,10 +11,17 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.urls import reverse
 from django.db import transaction
+from django.conf import settings
 from django.contrib.gis.geos import MultiPolygon
 from django.db import IntegrityError
 from landreg.services.gis import process_pelak_border
 from landreg.models.pelak import Pelak
+from landreg.models.generalized import GeneralizedBorder
+from landreg.services.generalization_service import refresh_generalized_borders_on_commit
+from landreg.services.tile_invalidation_service import invalidate_tiles_for_geometry
+from landreg.signals import TILE_LAYERS_OF_MODEL
+from geoserverapp.services.layer_version import bump_layer_version_on_commit
+from geoserverapp.services.tile_cache_service import truncate_tiles_for_geometries
 from common.models import Company , Province
 from accounts.models import User
 
@@ -139,6 +146,16 @@ class PelakListApiViews(APIView):
             # Use bulk_create for better performance
             try:
                 Pelak.objects.bulk_create(pelak_objects)
+                # bulk_create sends no post_save: do what the signals do for a single save
+                refresh_generalized_borders_on_commit(
+                    GeneralizedBorder.Source.PELAK,
+                    [pelak_object.number for pelak_object in pelak_objects],
+                )
+                borders = [pelak_object.border for pelak_object in pelak_objects]
+                for border in borders:
+                    invalidate_tiles_for_geometry(TILE_LAYERS_OF_MODEL[Pelak], border)
+                bump_layer_version_on_commit(settings.GEOSERVER['DEFAULT_WORKSPACE'], Pelak._meta.db_table)
+                truncate_tiles_for_geometries(Pelak._meta.db_table, borders)
                 return Response(
                     {"detail": f"تعداد {len(pelak_objects)} پلاک با موفقیت بارگذاری شد"}, 
                     status=status.HTTP_201_CREATED
@@ -1,21 +1,28 @@
-from typing import cast, Dict, Any
+import gzip
+from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework.request import Request
 from rest_framework import serializers
-from common.pagination import CustomPagination
+from common.pagination import CustomCursorPagination
 from rest_framework.views import APIView
-from rest_framework.response import Response
 from rest_framework import status
-from django.core.cache import cache
-from django.db.models import Prefetch,Count,Case,When, Q,F, OuterRef, Subquery, IntegerField
-from django.db.models.functions import Coalesce
+from django.db.models import F
 
-from django.conf import settings
-from landreg.models.cadaster import Cadaster
 from landreg.models.flag import Flag
-from common.models import Company , Province
-from accounts.models import User
-
+from common.models import Province
+from landreg.exceptions import GridRequestError
+from landreg.services.report_service import (
+    CADASTER_STATUS_LABELS,
+    FLAG_STATUS_LABELS,
+    get_cadaster_status_by_province,
+    get_flag_status_by_province,
+    get_diff_cadaster_flag_by_province,
+    get_grid_aggregation,
+    get_national_status_report,
+    GRID_LAYERS,
+    GRID_SHAPES,
+)
+from landreg.services.status_history_service import get_status_trend, TREND_BUCKETS
 
 
 class CadaterStatusByProvince(APIView):
@@ -25,55 +32,12 @@ class CadaterStatusByProvince(APIView):
         - Get the proviance
         - Intersect the province.border with all Cadaster.border instances
         - Return status count of all founded Cadasters
+        - Cached until a cadaster/flag in this province changes (see report_cache_service)
     """
 
     def post(self, request: Request, provinceid) -> Response:
         try:
-            # Check cache first (cache for 5 minutes)
-            cache_key = f'report_cadaster_by_province_status_{provinceid}'
-            
-            if not settings.DEBUG: # in debug mode do not use cache
-                cached_result = cache.get(cache_key)
-                if cached_result:
-                    return Response(cached_result, status=status.HTTP_200_OK)
-
-            # Use only() to fetch only required fields
-            province_instance = Province.objects.only('id', 'name_fa', 'border').get(pk=provinceid)
-
-            # Single query with conditional aggregation for all statuses
-            status_aggregation = {
-                f'status_{code}': Count(
-                    Case(When(status=code, then=1), output_field=IntegerField())
-                )
-                for code, _ in Cadaster.cadaster_status
-            }
-
-            # Execute single aggregation query
-            counts = Cadaster.objects.filter(
-                border__intersects=province_instance.border
-            ).aggregate(
-                total=Count('id'),
-                **status_aggregation
-            )
-
-            # Build response
-            result = {
-                'province_id': provinceid,
-                'province_name': province_instance.name_fa,
-                'total_cadasters': counts['total'],
-                'status_breakdown': [
-                    {
-                        'status_code': status_code,
-                        'status_label': status_label,
-                        'count': counts[f'status_{status_code}']
-                    }
-                    for status_code, status_label in Cadaster.cadaster_status
-                ]
-            }
-
-            if not settings.DEBUG:# in Debug mode do not Cache the result
-                cache.set(cache_key, result, 300)  # cache fot 5 minutes
-
+            result = get_cadaster_status_by_province(provinceid)
             return Response(result, status=status.HTTP_200_OK)
         
         except Province.DoesNotExist:
@@ -91,55 +55,12 @@ class FlagStatusByProvince(APIView):
         - Get the proviance
         - Intersect the province.border with all flag.border (its point) instances
         - Return status count of all founded Cadasters
+        - Cached until a cadaster/flag in this province changes (see report_cache_service)
     """
 
     def post(self, request: Request, provinceid) -> Response:
         try:
-            # Check cache first (cache for 5 minutes)
-            cache_key = f'report_flag_by_province_status_{provinceid}'
-            
-            if not settings.DEBUG: # in debug mode do not use cache
-                cached_result = cache.get(cache_key)
-                if cached_result:
-                    return Response(cached_result, status=status.HTTP_200_OK)
-
-            # Use only() to fetch only required fields
-            province_instance = Province.objects.only('id', 'name_fa', 'border').get(pk=provinceid)
-
-            # Single query with conditional aggregation for all statuses
-            status_aggregation = {
-                f'status_{code}': Count(
-                    Case(When(status=code, then=1), output_field=IntegerField())
-                )
-                for code, _ in Flag.FLAG_STATUS_CHOICES
-            }
-
-            # Execute single aggregation query
-            counts = Flag.objects.filter(
-                border__intersects=province_instance.border
-            ).aggregate(
-                total=Count('id'),
-                **status_aggregation
-            )
-
-            # Build response
-            result = {
-                'province_id': provinceid,
-                'province_name': province_instance.name_fa,
-                'total_flags': counts['total'],
-                'status_breakdown': [
-                    {
-                        'status_code': status_code,
-                        'status_label': status_label,
-                        'count': counts[f'status_{status_code}']
-                    }
-                    for status_code, status_label in Flag.FLAG_STATUS_CHOICES
-                ]
-            }
-
-            if not settings.DEBUG:# in Debug mode do not Cache the result
-                cache.set(cache_key, result, 300)  # cache fot 5 minutes
-
+            result = get_flag_status_by_province(provinceid)
             return Response(result, status=status.HTTP_200_OK)
         
         except Province.DoesNotExist:
@@ -155,63 +76,14 @@ class DiffCadasterAndFlagStatusByProvince(APIView):
     """
         - Get a id of province from url 
         - Get the proviance
-        - Get all Cadaster Instances in this province
-        - Filter Cadaters that have flag
-        - Filter Cadaster that have different status code with own Flag
-        - 
+        - Count Cadasters in this province, those with flags and flags whose status differs from own Cadaster
+        - All totals are computed in a single SQL join with aggregates
+        - The mismatched records are served by DiffCadasterAndFlagRecordsByProvince (cursor paginated)
+        - Cached until a cadaster/flag in this province changes (see report_cache_service)
     """
     def post(self, request: Request, provinceid) -> Response:
         try:
-            cache_key = f'report_diff__cadasterflag_by_province_status_{provinceid}'
-            if not settings.DEBUG:
-                cached_result = cache.get(cache_key)
-                if cached_result:
-                    return Response(cached_result, status=status.HTTP_200_OK)
-
-            province_instance = Province.objects.only('id', 'name_fa', 'border').get(pk=provinceid)
-
-            cadasters_in_province = Cadaster.objects.filter(
-                border__intersects=province_instance.border
-            ).prefetch_related(
-                Prefetch(
-                    'flags',
-                    queryset=Flag.objects.all().order_by('created_at')  # optional ordering
-                )
-            )
-
-            total_cadasters_in_province = cadasters_in_province.count()
-
-            mismatch_records = []
-
-            for cadaster in cadasters_in_province:
-                for flag in cadaster.flags.all():
-                    if flag.status != cadaster.status:
-                        mismatch_records.append({
-                            'cadaster_id': cadaster.id,
-                            'cadaster_uniquecode': cadaster.uniquecode,
-                            'cadaster_status_code': cadaster.status,
-                            'cadaster_status_label': dict(Cadaster.cadaster_status).get(cadaster.status, 'نامشخص'),
-                            'flag_id': flag.id,
-                            'flag_status_code': flag.status,
-                            'flag_status_label': dict(Flag.FLAG_STATUS_CHOICES).get(flag.status, 'نامشخص'),
-                        })
-
-            total_with_flags = sum(1 for cad in cadasters_in_province if cad.flags.exists())
-            total_mismatched = len(mismatch_records)
-
-            result = {
-                'province_id': provinceid,
-                'province_name': province_instance.name_fa,
-                'total_cadasters_in_province': total_cadasters_in_province,
-                'total_cadasters_with_flags': total_with_flags,
-                'total_mismatched': total_mismatched,
-                'matched_count': total_with_flags - total_mismatched,
-                'mismatched_records': mismatch_records
-            }
-
-            if not settings.DEBUG:
-                cache.set(cache_key, result, 60)
-
+            result = get_diff_cadaster_flag_by_province(provinceid)
             return Response(result, status=status.HTTP_200_OK)
 
         except Province.DoesNotExist:
@@ -221,4 +93,182 @@ class DiffCadasterAndFlagStatusByProvince(APIView):
             return Response(
                 {"detail": "خطا در آمار وضعیت کاداسترهای متفاوت با فلگ بر اساس استان"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class DiffCadasterAndFlagRecordsByProvince(APIView):
+    #permission is dynamic (same base url as DiffCadasterAndFlagStatusByProvince)
+    """
+        - Get a id of province from url 
+        - Stream Flags (with own Cadaster) that have a different status code with own Cadaster
+        - Cursor paginated on flag id (?cursor=...&page_size=...)
+    """
+    def post(self, request: Request, provinceid) -> Response:
+        try:
+            province_instance = Province.objects.only('id', 'border').get(pk=provinceid)
+
+            mismatched_flags = Flag.objects.filter(
+                cadaster__border__intersects=province_instance.border
+            ).exclude(
+                status=F('cadaster__status')
+            ).values(
+                'id',
+                'status',
+                'cadaster_id',
+                'cadaster__uniquecode',
+                'cadaster__status',
+            )
+
+            paginator = CustomCursorPagination()
+            page = paginator.paginate_queryset(mismatched_flags, request, view=self)
+
+            mismatch_records = [
+                {
+                    'cadaster_id': row['cadaster_id'],
+                    'cadaster_uniquecode': row['cadaster__uniquecode'],
+                    'cadaster_status_code': row['cadaster__status'],
+                    'cadaster_status_label': CADASTER_STATUS_LABELS.get(row['cadaster__status'], 'نامشخص'),
+                    'flag_id': row['id'],
+                    'flag_status_code': row['status'],
+                    'flag_status_label': FLAG_STATUS_LABELS.get(row['status'], 'نامشخص'),
+                }
+                for row in page
+            ]
+            return paginator.get_paginated_response(mismatch_records)
+
+        except Province.DoesNotExist:
+            return Response({"detail": "استانی با این آیدی یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            print(f"Error in flag status records report: {str(e)}")
+            return Response(
+                {"detail": "خطا در خواندن کاداسترهای متفاوت با فلگ بر اساس استان"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class GridAggregationReport(APIView):
+    #permission is dynamic
+    """
+        - Get a layer (cadaster | flag) and a web map zoom level from url
+        - ?shape=hex (default) | square
+        - ?bbox=minx,miny,maxx,maxy (EPSG:4326), required above zoom GRID_NATIONAL_MAX_ZOOM
+        - Return per cell (zoom dependent cell size) counts by status as a GeoJSON FeatureCollection
+        - National grids are precomputed per (layer, shape, zoom) in the report cache (warm_report_cache), 
+          invalidated when any cadaster/flag changes; bbox grids are computed on demand
+    """
+    def post(self, request: Request, layer: str, zoom: int) -> Response:
+        shape = request.query_params.get('shape', 'hex')
+        bbox = None
+        if request.query_params.get('bbox'):
+            try:
+                bbox = tuple(float(part) for part in request.query_params['bbox'].split(','))
+            except ValueError:
+                bbox = ()
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                return Response(
+                    {"detail": "bbox باید به صورت minx,miny,maxx,maxy باشد"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if layer not in GRID_LAYERS:
+            return Response(
+                {"detail": f"لایه نامعتبر است. لایه‌های مجاز: {list(GRID_LAYERS.keys())}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if shape not in GRID_SHAPES:
+            return Response(
+                {"detail": f"نوع سلول نامعتبر است. مقادیر مجاز: {list(GRID_SHAPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            result = get_grid_aggregation(layer=layer, shape=shape, zoom=zoom, bbox=bbox)
+            return Response(result, status=status.HTTP_200_OK)
+        except GridRequestError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"Error in grid aggregation report: {str(e)}")
+            return Response(
+                {"detail": "خطا در آمار شبکه‌ای وضعیت‌ها"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CadasterStatusTrendReport(APIView):
+    #permission is dynamic
+    """
+        - Entered / left counts of cadaster statuses per day or week
+        - Optional province filter, date range [date_from, date_to]
+        - Read from the incrementally maintained daily rollup (no scan of cadasters or history)
+    """
+
+    class CadasterStatusTrendInputSerializer(serializers.Serializer):
+        province_id = serializers.IntegerField(required=False, allow_null=True)
+        bucket = serializers.ChoiceField(choices=list(TREND_BUCKETS.keys()), default='day')
+        date_from = serializers.DateField()
+        date_to = serializers.DateField()
+
+        def validate(self, attrs):
+            if attrs['date_from'] > attrs['date_to']:
+                raise serializers.ValidationError("تاریخ شروع باید قبل از تاریخ پایان باشد")
+            return attrs
+
+    def post(self, request: Request) -> Response:
+        input_serializer = self.CadasterStatusTrendInputSerializer(data=request.data)
+        if not input_serializer.is_valid():
+            return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = input_serializer.validated_data
+        try:
+            province_id = data.get('province_id')
+            if province_id is not None and not Province.objects.filter(pk=province_id).exists():
+                return Response({"detail": "استانی با این آیدی یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+
+            result = get_status_trend(
+                bucket=data['bucket'],
+                date_from=data['date_from'],
+                date_to=data['date_to'],
+                province_id=province_id,
+            )
+            return Response(result, status=status.HTTP_200_OK)
+        except Exception as e:
+            print(f"Error in cadaster status trend report: {str(e)}")
+            return Response(
+                {"detail": "خطا در آمار روند تغییر وضعیت کاداسترها"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class NationalStatusReport(APIView):
+    #permission is dynamic
+    """
+        - Cadaster and flag status breakdowns of ALL provinces in one response
+          (replaces 31 x cadaterstatusbyprovince + 31 x flagstatusbyprovince calls of the dashboard)
+        - Computed by one grouped query, cached as a single gzip payload with an ETag
+        - If-None-Match -> 304, Accept-Encoding: gzip -> compressed body is sent as is
+    """
+
+    def get(self, request: Request) -> HttpResponse:
+        try:
+            payload = get_national_status_report()
+
+            if request.headers.get('If-None-Match') == payload['etag']:
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = payload['etag']
+                return response
+
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(payload['gzip'], content_type='application/json; charset=utf-8')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(payload['gzip']), content_type='application/json; charset=utf-8')
+
+            response['ETag'] = payload['etag']
+            response['Vary'] = 'Accept-Encoding'
+            return response
+        except Exception as e:
+            print(f"Error in national status report: {str(e)}")
+            return Response(
+                {"detail": "خطا در آمار وضعیت کاداسترها و فلگ ها در سطح کشور"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def post(self, request: Request) -> HttpResponse:
+        return self.get(request)
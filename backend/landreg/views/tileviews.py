@@ -0,0 +1,244 @@
+import gzip
+import os
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework import serializers
+from rest_framework import status
+
+from accounts.models import User
+from common.models import Province
+from landreg.models.pelak import Pelak
+from landreg.models.tilepackage import TilePackageJob
+from landreg.services.access_service import AccessSnapshot
+from landreg.services.tile_service import (
+    TILE_LAYERS,
+    geojson_features,
+    get_tile,
+    tile_is_valid,
+)
+from landreg.services.tile_package_service import (
+    PACKAGE_FORMATS,
+    TilePackageError,
+    request_tile_package,
+)
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+
+class VectorTileApiView(APIView):
+    #permission is dynamic
+    """
+        - Mapbox Vector Tile of a layer (cadaster | flag | pelak | province) at z/x/y (web mercator XYZ scheme)
+        - Built by PostGIS (ST_AsMVT), filtered in SQL to what the user may see
+          (granted pelaks, company provinces, everything for superuser / supernazer)
+        - Low zooms are drawn from the generalized borders of the zoom level
+        - Cached per (layer, z/x/y, access scope), If-None-Match -> 304,
+          Accept-Encoding: gzip -> compressed tile is sent as is
+    """
+
+    def get(self, request: Request, layer: str, z: int, x: int, y: int) -> HttpResponse:
+        if layer not in TILE_LAYERS:
+            return Response(
+                {"detail": f"لایه نامعتبر است. لایه‌های مجاز: {list(TILE_LAYERS.keys())}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not tile_is_valid(z, x, y):
+            return Response({"detail": "شماره تایل نامعتبر است"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            user: User = request.user
+            payload = get_tile(layer=layer, z=z, x=x, y=y, access=AccessSnapshot.for_user(user))
+
+            if request.headers.get('If-None-Match') == payload['etag']:
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            elif not payload['gzip']:
+                response = HttpResponse(b"", content_type=MVT_CONTENT_TYPE)
+            elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(payload['gzip'], content_type=MVT_CONTENT_TYPE)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(payload['gzip']), content_type=MVT_CONTENT_TYPE)
+
+            response['ETag'] = payload['etag']
+            # Tiles depend on who asks: browsers may keep them but must revalidate
+            response['Cache-Control'] = 'private, no-cache'
+            response['Vary'] = 'Accept-Encoding, Authorization'
+            return response
+        except Exception as e:
+            print(f"Error in vector tile {layer}/{z}/{x}/{y}: {str(e)}")
+            return Response(
+                {"detail": "خطا در ساخت تایل"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class GeneralizedBorderGeoJsonApiView(APIView):
+    #permission is dynamic
+    """
+        - GeoJSON FeatureCollection of a layer (cadaster | pelak | province) for a map at ?zoom=
+        - Borders are read from the generalized copy of the zoom level (full resolution on deep zooms)
+        - Optional ?bbox=minx,miny,maxx,maxy (EPSG:4326), filtered to what the user may see,
+          at most VECTOR_TILES GEOJSON_MAX_FEATURES features ("truncated": true when cut)
+    """
+
+    class GeneralizedBorderInputSerializer(serializers.Serializer):
+        zoom = serializers.IntegerField(required=True, min_value=0, max_value=22)
+        bbox = serializers.CharField(required=False)
+
+        def validate_bbox(self, value):
+            try:
+                bbox = tuple(float(part) for part in value.split(','))
+            except ValueError:
+                raise serializers.ValidationError("bbox باید شامل چهار عدد باشد")
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                raise serializers.ValidationError("bbox باید به صورت minx,miny,maxx,maxy باشد")
+            return bbox
+
+    def get(self, request: Request, layer: str) -> HttpResponse:
+        geojson_layers = [name for name, config in TILE_LAYERS.items() if config.get('generalized')]
+        if layer not in geojson_layers:
+            return Response(
+                {"detail": f"لایه نامعتبر است. لایه‌های مجاز: {geojson_layers}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        input_serializer = self.GeneralizedBorderInputSerializer(data=request.query_params)
+        if not input_serializer.is_valid():
+            return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = input_serializer.validated_data
+        try:
+            user: User = request.user
+            features, truncated = geojson_features(
+                layer=layer,
+                z=data['zoom'],
+                bbox=data.get('bbox'),
+                access=AccessSnapshot.for_user(user),
+                limit=settings.VECTOR_TILES['GEOJSON_MAX_FEATURES'],
+            )
+            body = (
+                '{"type":"FeatureCollection","features":[' + ','.join(features) + ']'
+                + (',"truncated":true' if truncated else '') + '}'
+            )
+            response = HttpResponse(body, content_type='application/geo+json')
+            response['Vary'] = 'Authorization'
+            return response
+        except Exception as e:
+            print(f"Error in generalized borders of {layer}: {str(e)}")
+            return Response(
+                {"detail": "خطا در خواندن مرزها"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class TilePackageJobOutputSerializer(serializers.ModelSerializer):
+    format = serializers.CharField(source='package_format')
+
+    class Meta:
+        model = TilePackageJob
+        fields = [
+            'id', 'status', 'format', 'province', 'pelak', 'min_zoom', 'max_zoom',
+            'stats', 'error', 'created_at', 'finished_at',
+        ]
+
+
+class TilePackageApiView(APIView):
+    #permission is dynamic
+    """
+        - Request an offline package (MBTiles | PMTiles) of the pelak / cadaster / flag vector tiles
+          of a province or a pelak, for field work without connectivity
+        - province_id | pelak_id, format, min_zoom, max_zoom
+        - Built in the background with the access of the caller (manage.py tile_package_worker):
+          202 with the job, poll tilepackage/<jobid>/ and download tilepackage/<jobid>/download/ when done
+    """
+
+    class TilePackageInputSerializer(serializers.Serializer):
+        province_id = serializers.IntegerField(required=False)
+        pelak_id = serializers.CharField(required=False, max_length=100)
+        format = serializers.ChoiceField(choices=list(PACKAGE_FORMATS), default='mbtiles')
+        min_zoom = serializers.IntegerField(required=False, min_value=0, max_value=22)
+        max_zoom = serializers.IntegerField(required=False, min_value=0, max_value=22)
+
+        def validate(self, attrs):
+            if ('province_id' in attrs) == ('pelak_id' in attrs):
+                raise serializers.ValidationError("دقیقا یکی از province_id یا pelak_id را وارد کنید")
+            min_zoom = attrs.get('min_zoom', settings.TILE_PACKAGES['MIN_ZOOM'])
+            max_zoom = attrs.get('max_zoom', settings.TILE_PACKAGES['MAX_ZOOM'])
+            if min_zoom > max_zoom:
+                raise serializers.ValidationError("حداقل زوم نباید از حداکثر زوم بیشتر باشد")
+            return attrs
+
+    def post(self, request: Request):
+        input_serializer = self.TilePackageInputSerializer(data=request.data)
+        if not input_serializer.is_valid():
+            return Response(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = input_serializer.validated_data
+        try:
+            user: User = request.user
+            job = request_tile_package(
+                user=user,
+                access=AccessSnapshot.for_user(user),
+                province_id=data.get('province_id'),
+                pelak_id=data.get('pelak_id'),
+                min_zoom=data.get('min_zoom'),
+                max_zoom=data.get('max_zoom'),
+                package_format=data['format'],
+            )
+            return Response(TilePackageJobOutputSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        except Province.DoesNotExist:
+            return Response({"detail": "استانی با این آیدی یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        except Pelak.DoesNotExist:
+            return Response({"detail": "پلاکی با این شماره یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        except TilePackageError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"Error in tile package request: {str(e)}")
+            return Response(
+                {"detail": "خطا در ثبت درخواست بسته آفلاین نقشه"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class TilePackageJobApiView(APIView):
+    #permission is dynamic
+    """
+        - Status of a tile package job of the caller (pending | running | done | failed)
+    """
+
+    def get(self, request: Request, jobid: int):
+        job = TilePackageJob.objects.filter(pk=jobid, user=request.user).first()
+        if job is None:
+            return Response({"detail": "درخواست بسته یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(TilePackageJobOutputSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class TilePackageDownloadApiView(APIView):
+    #permission is dynamic
+    """
+        - File of a finished tile package job of the caller
+    """
+
+    def get(self, request: Request, jobid: int):
+        job = TilePackageJob.objects.filter(pk=jobid, user=request.user).first()
+        if job is None:
+            return Response({"detail": "درخواست بسته یافت نشد"}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != TilePackageJob.Status.DONE:
+            return Response({"detail": "بسته هنوز آماده نیست"}, status=status.HTTP_409_CONFLICT)
+        try:
+            package_file = open(job.path, 'rb')
+        except FileNotFoundError:
+            return Response({"detail": "فایل بسته یافت نشد، دوباره درخواست دهید"}, status=status.HTTP_410_GONE)
+
+        response = FileResponse(
+            package_file,
+            as_attachment=True,
+            filename=os.path.basename(job.path),
+            content_type='application/octet-stream' if job.package_format == 'pmtiles' else 'application/vnd.sqlite3',
+        )
+        response['X-Tile-Package-Reused'] = str(job.stats.get('reused', 0))
+        response['X-Tile-Package-Rendered'] = str(job.stats.get('rendered', 0))
+        return response